@@ -0,0 +1,163 @@
+# IPC.Client (常駐の worker thread) と, 以前の送信と受信ごとに thread を作る方式の
+# 1 秒あたりのメッセージ数と遅延 (p50 / p99) を比べる
+#
+#   python benchmarks/bench_client_throughput.py [--count N] [--window N] [--url URL]
+#
+# pynng が必要. Viewer の代わりに同じプロセス内の echo サーバーに送る
+import argparse
+import os
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "srd_for_blender"))
+
+import IPC  # noqa: E402
+import pynng  # noqa: E402
+
+
+class EchoServer:
+    # 受け取ったメッセージをそのまま返す. context ごとの thread で並行に応答する
+    def __init__(self, url: str, concurrency: int = 8):
+        self.m_socket = pynng.Rep0(listen=url)
+        self.m_contexts = [self.m_socket.new_context() for _ in range(concurrency)]
+        self.m_threads = [
+            threading.Thread(target=self.Main, args=(ctx,), daemon=True) for ctx in self.m_contexts
+        ]
+        for thread in self.m_threads:
+            thread.start()
+
+    def Close(self) -> None:
+        # context はソケットより先に閉じる
+        for ctx in self.m_contexts:
+            ctx.close()
+        for thread in self.m_threads:
+            thread.join(1.0)
+        self.m_socket.close()
+
+    def Main(self, ctx: pynng.Context) -> None:
+        while True:
+            try:
+                ctx.send(ctx.recv())
+            except Exception:
+                return
+
+
+class ThreadPerOpClient:
+    # 以前の IPC.Client と同じく send と recv のたびに thread を作って context を操作する
+    def __init__(self, url: str):
+        self.m_socket = pynng.Req0(dial=url, send_timeout=5000, recv_timeout=5000)
+
+    def Close(self) -> None:
+        self.m_socket.close()
+
+    def Send(self, message: bytes, replyCB) -> None:
+        ctx = self.m_socket.new_context()
+
+        def recv():
+            try:
+                msg = ctx.recv()
+                replyCB(True, msg)
+            except Exception:
+                replyCB(False, b"")
+            finally:
+                ctx.close()
+
+        def send():
+            try:
+                ctx.send(message)
+            except Exception:
+                ctx.close()
+                replyCB(False, b"")
+                return
+            threading.Thread(target=recv, daemon=True).start()
+
+        threading.Thread(target=send, daemon=True).start()
+
+
+def Percentile(values: list[float], percentile: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percentile / 100.0))]
+
+
+def Run(label: str, send, count: int, window: int) -> None:
+    # window 個まで応答を待たずに送り, 全体の時間と要求ごとの往復時間を測る
+    latencies: list[float] = []
+    failed = 0
+    done = threading.Semaphore(0)
+    mutex = threading.Lock()
+
+    def onReply(success: bool, sendTime: float) -> None:
+        nonlocal failed
+        with mutex:
+            if success:
+                latencies.append(time.perf_counter() - sendTime)
+            else:
+                failed += 1
+        done.release()
+
+    startTime = time.perf_counter()
+    for i in range(count):
+        if i >= window:
+            done.acquire()
+        sendTime = time.perf_counter()
+        send(b"x" * 128, lambda success, sendTime=sendTime: onReply(success, sendTime))
+    for _ in range(min(count, window)):
+        done.acquire()
+    elapsed = time.perf_counter() - startTime
+
+    print(
+        f"{label:<16} {count / elapsed:10.0f} msg/s"
+        f"  p50 {Percentile(latencies, 50) * 1e6:8.0f} usec"
+        f"  p99 {Percentile(latencies, 99) * 1e6:8.0f} usec"
+        f"  failed {failed}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--window", type=int, default=8)
+    parser.add_argument("--url", default=f"ipc:///tmp/srd_bench_{uuid.uuid4().hex}")
+    args = parser.parse_args()
+
+    server = EchoServer(args.url)
+    try:
+        old = ThreadPerOpClient(args.url)
+        time.sleep(0.2)
+        try:
+            Run(
+                "thread-per-op",
+                lambda msg, cb: old.Send(msg, lambda success, _: cb(success)),
+                args.count,
+                args.window,
+            )
+        finally:
+            old.Close()
+
+        client = IPC.Client()
+        client.SetSendTimeout(5000)
+        client.SetReceiveTimeout(5000)
+        client.SetInFlightLimit(IPC.Client.Lane.State, 0)
+        client.Start(args.url)
+        deadline = time.monotonic() + 5.0
+        while not client.IsConnected() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        try:
+            Run(
+                "persistent",
+                lambda msg, cb: client.Send(
+                    msg, lambda type, ret, _: cb(type == IPC.Client.ReplyCBType.Recv and ret == 0)
+                ),
+                args.count,
+                args.window,
+            )
+        finally:
+            client.Stop()
+    finally:
+        server.Close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# MessageCompressor の方式ごとの圧縮率と圧縮, 展開の時間を代表的なメッセージで比べる
+#
+#   python benchmarks/bench_compression.py [--number N]
+#
+# flatbuffers と mathutils が必要. zstandard, lz4 が無い方式は省く
+import argparse
+import math
+import os
+import random
+import struct
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "srd_for_blender"))
+
+import flatbuffers  # noqa: E402
+import Viewer  # noqa: E402
+from IPCViewerCommand import MessageCompressor  # noqa: E402
+from mathutils import Matrix  # noqa: E402
+
+Compression = MessageCompressor.Compression
+
+
+def TransformBatch(count: int) -> bytes:
+    # 1 tick 分の Transform の更新
+    rng = random.Random(0)
+    output = bytearray()
+    for i in range(count):
+        cmd = Viewer.SetObjectTransformCommand(Viewer.Viewer())
+        cmd.SetTransformName(f"Armature.Bone.{i:03d}")
+        cmd.SetTransform(Matrix([[rng.uniform(-10.0, 10.0) for _ in range(4)] for _ in range(4)]))
+        builder = flatbuffers.Builder(0)
+        cmd.Serialize(builder)
+        output += builder.Output()
+    return bytes(output)
+
+
+def AnimationTrack(frames: int, channels: int) -> bytes:
+    # ベイクしたアニメーションの float32 のカーブ
+    values = [
+        math.sin(frame * 0.05 + channel) * (channel + 1)
+        for frame in range(frames)
+        for channel in range(channels)
+    ]
+    return struct.pack(f"<{len(values)}f", *values)
+
+
+def SceneOptions(count: int) -> bytes:
+    return "".join(
+        f"--option object_{i}=C:/Users/srd/Documents/scene/textures/tex_{i % 17}.png;"
+        for i in range(count)
+    ).encode("utf-8")
+
+
+PAYLOADS = [
+    ("transform x64", lambda: TransformBatch(64)),
+    ("anim track 256KB", lambda: AnimationTrack(2048, 32)),
+    ("scene options", lambda: SceneOptions(512)),
+    ("random 64KB", lambda: os.urandom(64 * 1024)),
+]
+
+CODECS = [
+    ("zlib", Compression.Zlib),
+    ("zstd", Compression.Zstd),
+    ("lz4", Compression.Lz4),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args()
+
+    compressor = MessageCompressor()
+    print(
+        f"{'payload':<18} {'codec':<6} {'size':>9} {'ratio':>7}"
+        f" {'compress':>12} {'decompress':>12}"
+    )
+    for label, make in PAYLOADS:
+        data = make()
+        for codec, compression in CODECS:
+            if not MessageCompressor.IsSupported(compression):
+                continue
+            payload = compressor.CompressPayload(compression, data)
+            compressSec = min(
+                timeit.repeat(
+                    lambda compression=compression, data=data: compressor.CompressPayload(
+                        compression, data
+                    ),
+                    number=args.number,
+                    repeat=3,
+                )
+            )
+            decompressSec = min(
+                timeit.repeat(
+                    lambda compression=compression, payload=payload: (
+                        MessageCompressor.DecompressPayload(compression, payload)
+                    ),
+                    number=args.number,
+                    repeat=3,
+                )
+            )
+            print(
+                f"{label:<18} {codec:<6} {len(data):9d} {len(data) / len(payload):7.2f}"
+                f" {compressSec / args.number * 1e6:9.0f} us"
+                f" {decompressSec / args.number * 1e6:9.0f} us"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# SetObjectTransformCommand の Transform を 16 回の PrependFloat32 で書く場合と
+# struct でまとめて書く場合 (mathutils.Matrix, numpy.ndarray) の Serialize() の時間を比べる
+#
+#   python benchmarks/bench_transform_encoder.py [--number N]
+#
+# flatbuffers と mathutils (Blender の Python か pip の mathutils) が必要
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "srd_for_blender"))
+
+import fbs.Viewer.fbs.SetObjectTransformCommand as FbsSetObjectTransformCommand  # noqa: E402
+import fbs.Viewer.fbs.Transform as Transform  # noqa: E402
+import flatbuffers  # noqa: E402
+import Viewer  # noqa: E402
+from mathutils import Matrix  # noqa: E402
+from Viewer.SetObjectTransformCommand import np  # noqa: E402
+
+
+def SerializeWithBuilder(
+    builder: flatbuffers.Builder, cmd: Viewer.SetObjectTransformCommand
+) -> None:
+    name = builder.CreateString(cmd.GetTransformName(), encoding="utf-8")
+    FbsSetObjectTransformCommand.Start(builder)
+    FbsSetObjectTransformCommand.AddName(builder, name)
+    m = cmd.m_transform
+    mx = [m.row[r][c] for c in range(4) for r in range(4)]
+    FbsSetObjectTransformCommand.AddTransform(builder, Transform.CreateTransform(builder, mx))
+    builder.Finish(FbsSetObjectTransformCommand.End(builder))
+
+
+def Serialize(builder: flatbuffers.Builder, cmd: Viewer.SetObjectTransformCommand) -> None:
+    cmd.Serialize(builder)
+
+
+def Measure(label: str, serialize, cmd, number: int) -> float:
+    builder = flatbuffers.Builder(1024)
+
+    def run():
+        builder.Clear()
+        serialize(builder, cmd)
+
+    sec = min(timeit.repeat(run, number=number, repeat=5))
+    print(f"{label:<24} {sec / number * 1e6:8.2f} usec/op")
+    return sec
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    rows = [[rng.uniform(-100.0, 100.0) for _ in range(4)] for _ in range(4)]
+
+    cmd = Viewer.SetObjectTransformCommand(Viewer.Viewer())
+    cmd.SetTransformName("Cube")
+    cmd.SetTransform(Matrix(rows))
+
+    base = Measure("PrependFloat32 x16", SerializeWithBuilder, cmd, args.number)
+    sec = Measure("struct (Matrix)", Serialize, cmd, args.number)
+    print(f"{'':<24} {base / sec:8.2f} x")
+
+    if np is not None:
+        npCmd = Viewer.SetObjectTransformCommand(Viewer.Viewer())
+        npCmd.SetTransformName("Cube")
+        npCmd.SetTransform(np.array(rows, dtype=np.float32))
+        sec = Measure("struct (numpy)", Serialize, npCmd, args.number)
+        print(f"{'':<24} {base / sec:8.2f} x")
+
+
+if __name__ == "__main__":
+    main()
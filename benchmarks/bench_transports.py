@@ -0,0 +1,65 @@
+# IPC.Client の transport (ipc / tcp / inproc) ごとの遅延とスループットを比べる
+# 遅延は応答を待ってから次を送る場合, スループットは window 個まで応答を待たずに送る場合
+#
+#   python benchmarks/bench_transports.py [--count N] [--window N] [--size BYTES ...]
+#
+# pynng が必要. tcp は loopback なので別ノードの場合の目安にはならない
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "srd_for_blender"))
+
+import IPC  # noqa: E402
+from bench_client_throughput import EchoServer, Run  # noqa: E402
+
+
+def Measure(url: str, count: int, window: int, size: int) -> None:
+    server = EchoServer(url)
+    client = IPC.Client()
+    client.SetSendTimeout(5000)
+    client.SetReceiveTimeout(5000)
+    client.SetInFlightLimit(IPC.Client.Lane.State, 0)
+    try:
+        client.Start(url)
+        deadline = time.monotonic() + 5.0
+        while not client.IsConnected() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        def send(msg: bytes, cb) -> None:
+            client.Send(
+                msg[:1] * size,
+                lambda type, ret, _: cb(type == IPC.Client.ReplyCBType.Recv and ret == 0),
+            )
+
+        scheme = url.partition("://")[0]
+        Run(f"{scheme} {size}B x1", send, count, 1)
+        Run(f"{scheme} {size}B x{window}", send, count, window)
+    finally:
+        client.Stop()
+        server.Close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=3000)
+    parser.add_argument("--window", type=int, default=16)
+    parser.add_argument("--size", type=int, nargs="+", default=[128, 65536])
+    parser.add_argument("--port", type=int, default=35120)
+    args = parser.parse_args()
+
+    name = uuid.uuid4().hex
+    urls = [
+        f"ipc:///tmp/srd_bench_{name}",
+        f"tcp://127.0.0.1:{args.port}",
+        f"inproc://srd_bench_{name}",
+    ]
+    for size in args.size:
+        for url in urls:
+            Measure(url, args.count, args.window, size)
+
+
+if __name__ == "__main__":
+    main()
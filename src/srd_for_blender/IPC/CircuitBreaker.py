@@ -0,0 +1,119 @@
+import enum
+import threading
+import time
+from collections import deque
+from typing import Deque
+
+
+class CircuitBreaker:
+    # Viewer が応答しない間は要求を止めて, 数回のタイムアウト待ちで Blender が重くなるのを防ぐ
+    # Closed: 通常, Open: 要求を止める, HalfOpen: 試しの要求の結果で Closed か Open に戻す
+    class State(enum.IntEnum):
+        Closed = enum.auto()
+        Open = enum.auto()
+        HalfOpen = enum.auto()
+
+    def __init__(self):
+        self.m_state = CircuitBreaker.State.Closed
+        self.m_mutex = threading.Lock()
+        self.m_results: Deque[bool] = deque([])
+        self.m_windowSize = 20
+        self.m_minSamples = 10
+        self.m_errorRateThreshold = 0.5
+        self.m_consecutiveTimeouts = 0
+        self.m_timeoutThreshold = 3
+        self.m_openInterval = 1.0
+        self.m_openedTime = 0.0
+        self.m_tripCount = 0
+
+    def SetErrorRateThreshold(self, rate: float, windowSize: int = 20, minSamples: int = 10):
+        # 直近 windowSize 件のうち失敗の割合が rate 以上になると Open にする
+        with self.m_mutex:
+            self.m_errorRateThreshold = rate
+            self.m_windowSize = max(1, windowSize)
+            self.m_minSamples = max(1, min(minSamples, self.m_windowSize))
+            while len(self.m_results) > self.m_windowSize:
+                self.m_results.popleft()
+
+    def SetTimeoutThreshold(self, count: int):
+        # 連続して count 回タイムアウトすると Open にする
+        self.m_timeoutThreshold = max(1, count)
+
+    def SetOpenInterval(self, interval: float):
+        # Open にしてから HalfOpen で試すまでの秒数
+        self.m_openInterval = interval
+
+    def GetState(self) -> State:
+        return self.m_state
+
+    def GetTripCount(self) -> int:
+        return self.m_tripCount
+
+    def GetProbeWait(self) -> float:
+        # HalfOpen で試すまでの残り秒数. Open 以外では None
+        if self.m_state != CircuitBreaker.State.Open:
+            return None
+        return max(0.0, self.m_openedTime + self.m_openInterval - time.monotonic())
+
+    def TryHalfOpen(self) -> bool:
+        # 試しの要求を送る時期になっていれば HalfOpen にして True を返す
+        with self.m_mutex:
+            if self.m_state != CircuitBreaker.State.Open:
+                return False
+            if time.monotonic() - self.m_openedTime < self.m_openInterval:
+                return False
+            self.m_state = CircuitBreaker.State.HalfOpen
+            return True
+
+    def Reset(self) -> None:
+        with self.m_mutex:
+            self.m_state = CircuitBreaker.State.Closed
+            self.m_results.clear()
+            self.m_consecutiveTimeouts = 0
+
+    def RecordSuccess(self) -> State:
+        # 状態が変わった場合は新しい状態を返す. 変わらない場合は None
+        with self.m_mutex:
+            self.m_consecutiveTimeouts = 0
+            if self.m_state != CircuitBreaker.State.Closed:
+                # 応答が得られたので Viewer は復帰している
+                self.m_state = CircuitBreaker.State.Closed
+                self.m_results.clear()
+                return self.m_state
+            self.AddResult(True)
+            return None
+
+    def RecordFailure(self, timeout: bool) -> State:
+        # 状態が変わった場合は新しい状態を返す. 変わらない場合は None
+        with self.m_mutex:
+            if self.m_state == CircuitBreaker.State.HalfOpen:
+                return self.Trip()
+            if self.m_state == CircuitBreaker.State.Open:
+                return None
+
+            if timeout:
+                self.m_consecutiveTimeouts += 1
+            else:
+                self.m_consecutiveTimeouts = 0
+            self.AddResult(False)
+
+            if self.m_consecutiveTimeouts >= self.m_timeoutThreshold:
+                return self.Trip()
+            if len(self.m_results) >= self.m_minSamples:
+                errorRate = self.m_results.count(False) / len(self.m_results)
+                if errorRate >= self.m_errorRateThreshold:
+                    return self.Trip()
+            return None
+
+    def AddResult(self, success: bool) -> None:
+        self.m_results.append(success)
+        if len(self.m_results) > self.m_windowSize:
+            self.m_results.popleft()
+
+    def Trip(self) -> State:
+        self.m_state = CircuitBreaker.State.Open
+        self.m_openedTime = time.monotonic()
+        self.m_consecutiveTimeouts = 0
+        self.m_results.clear()
+        self.m_tripCount += 1
+        return self.m_state
@@ -1,13 +1,22 @@
-import ctypes
+import asyncio
 import enum
+import heapq
+import itertools
+import random
 import threading
+import time
 from collections import deque
-from threading import Thread
-from typing import Callable, Deque
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, Deque, Hashable, Tuple, Union
 
 import pynng
 
+from .CircuitBreaker import CircuitBreaker
+from .CongestionControl import CongestionControl
 from .LogCallback import LogCallback
+from .Metrics import Metrics
+from .ReplyDispatcher import ReplyDispatcher
+from .Transport import Transport
 
 
 class Client:
@@ -18,10 +27,59 @@ class Client:
         self.m_works: list[Client.Work] = []
         self.m_freeWorks: Deque[Client.Work] = deque([])
         self.m_freeWorksMutex = threading.Lock()
+        self.m_freeWorksCond = threading.Condition(self.m_freeWorksMutex)
+        self.m_maxContexts = 8
+        self.m_contextIdleTimeout = 30.0
+        # Lane ごとの送信待ちの要求. 優先度の高い Lane から取り出す
+        self.m_requests: dict[Client.Lane, Deque[Client.Request]] = {
+            lane: deque([]) for lane in Client.Lane
+        }
+        self.m_inFlight: dict[Client.Lane, int] = {lane: 0 for lane in Client.Lane}
+        # 送受信中の要求の key. 同じ key の要求は前のものが完了するまで送らない
+        self.m_inFlightKeys: set[Hashable] = set()
+        # 0 は制限なし. 低優先度の Lane が全ての worker を占有しないように制限する
+        self.m_inFlightLimits: dict[Client.Lane, int] = {
+            Client.Lane.Control: 0,
+            Client.Lane.State: 2,
+            Client.Lane.Stream: 1,
+        }
+        self.m_requestsMutex = threading.RLock()
+        self.m_requestsCond = threading.Condition(self.m_requestsMutex)
+        self.m_requestsSpaceCond = threading.Condition(self.m_requestsMutex)
+        self.m_maxPendingRequests = 1024
+        self.m_backpressurePolicies: dict[Client.Lane, Client.Backpressure] = {
+            lane: Client.Backpressure.Block for lane in Client.Lane
+        }
+        self.m_pendingRequests: dict[int, Client.Request] = {}
+        # 期限付きの要求の (期限, request id). 送信待ちのまま期限切れになったものを完了させる
+        self.m_deadlines: list[Tuple[float, int]] = []
+        self.m_activeWorks: dict[int, Client.Work] = {}
+        self.m_requestIds = itertools.count(1)
+        self.m_workers: list[threading.Thread] = []
+        self.m_workerCount = 4
         self.m_log = LogCallback()
         self.m_sendTimeout = -1
         self.m_receiveTimeout = -1
         self.m_errorCount = 0
+        self.m_transport: Transport = None
+        self.m_connectionState = Client.ConnectionState.Disconnected
+        self.m_connectionCond = threading.Condition(self.m_requestsMutex)
+        self.m_connectionThread: threading.Thread = None
+        self.m_hasConnected = False
+        # 接続中の pipe. 削除時の callback の時点では socket.pipes に削除中の pipe が残っている
+        self.m_pipes: set[int] = set()
+        self.m_reconnectMinInterval = 0.1
+        self.m_reconnectMaxInterval = 5.0
+        self.m_replayMessages: dict[Hashable, bytes] = {}
+        self.m_metrics = Metrics()
+        self.m_circuitBreaker = CircuitBreaker()
+        self.m_probeMessage: bytes = None
+        self.m_probeTag = 0
+        self.m_congestion = CongestionControl()
+        self.m_congestionEnabled = False
+        self.m_replyDispatcher: ReplyDispatcher = None
+        self.m_connectionCB: Callable[[Client.ConnectionState], None] = None
+        self.m_messageEncoder: Callable[[bytes], bytes] = None
 
     def __del__(self):
         self.Stop()
@@ -29,172 +87,614 @@ class Client:
     def SetLogCallback(self, logCB: LogCallback):
         self.m_log = logCB
 
+    def SetReplyDispatcher(self, dispatcher: ReplyDispatcher):
+        # 設定すると replyCB は worker thread ではなく dispatcher を処理する thread から呼ばれる
+        self.m_replyDispatcher = dispatcher
+
+    def GetReplyDispatcher(self) -> ReplyDispatcher:
+        return self.m_replyDispatcher
+
+    def SetMessageEncoder(self, encoder: Callable[[bytes], bytes]):
+        # 送信直前に worker thread から呼ばれ, 戻り値を送信する (圧縮など)
+        # 再送用のメッセージは変換前のまま保持するので, 変換方法は接続ごとに変えてよい
+        self.m_messageEncoder = encoder
+
+    def EncodeMessage(self, message: bytes) -> bytes:
+        if self.m_messageEncoder is None:
+            return message
+        try:
+            return self.m_messageEncoder(message)
+        except Exception:
+            self.m_log.Error("IPCClient failed to encode message")
+            return message
+
+    def GetMetrics(self) -> Metrics:
+        # 既定では無効. GetMetrics().SetEnabled(True) で記録を開始する
+        return self.m_metrics
+
+    def GetCircuitBreaker(self) -> CircuitBreaker:
+        return self.m_circuitBreaker
+
+    def GetCircuitState(self) -> CircuitBreaker.State:
+        return self.m_circuitBreaker.GetState()
+
+    def SetProbeMessage(self, message: bytes, tag: int = 0):
+        # CircuitBreaker が Open の間に Viewer の復帰を確認するために送るメッセージ
+        self.m_probeMessage = message
+        self.m_probeTag = tag
+
+    def EnableCongestionControl(self, enable: bool):
+        # 有効時は期限を指定しない要求の timeout を RTT から決め,
+        # Lane.Stream の同時送受信数を CongestionControl の window に従わせる
+        self.m_congestionEnabled = enable
+
+    def IsCongestionControlEnabled(self) -> bool:
+        return self.m_congestionEnabled
+
+    def GetCongestionControl(self) -> CongestionControl:
+        return self.m_congestion
+
     def SetSendTimeout(self, timeout: int):
         self.m_sendTimeout = timeout
 
     def SetReceiveTimeout(self, timeout: int):
         self.m_receiveTimeout = timeout
 
+    def SetWorkerCount(self, count: int):
+        # Start() 前に設定すること
+        self.m_workerCount = max(1, count)
+
+    def SetMaxContexts(self, count: int):
+        self.m_maxContexts = max(1, count)
+
+    def SetContextIdleTimeout(self, timeout: float):
+        # 指定秒数以上使われなかった context は閉じる
+        self.m_contextIdleTimeout = timeout
+
+    class Lane(enum.IntEnum):
+        # 値が小さいほど優先度が高い
+        Control = 0  # シーンの切り替えや終了など
+        State = enum.auto()  # 最新の値だけが意味を持つ状態の更新
+        Stream = enum.auto()  # Transform などの高頻度の更新
+
+    def SetInFlightLimit(self, lane: Lane, count: int):
+        # lane の要求を同時に送受信する数の上限. 0 は制限なし
+        with self.m_requestsMutex:
+            self.m_inFlightLimits[lane] = max(0, count)
+            self.m_requestsCond.notify_all()
+
+    class Backpressure(enum.IntEnum):
+        Block = enum.auto()  # 空きが出るまで Send() を待たせる
+        FailFast = enum.auto()  # Send() は None を返す
+        DropOldest = enum.auto()  # 最も古い未送信の要求を捨てる
+        Coalesce = enum.auto()  # 同じ key の未送信の要求を置き換える
+
+    def SetMaxPendingRequests(self, count: int):
+        self.m_maxPendingRequests = max(1, count)
+
+    def SetBackpressurePolicy(self, policy: Backpressure, lane: Lane = None):
+        # lane を省略した場合は State と Stream に設定する
+        # Control の要求は捨てないので DropOldest, Coalesce は指定できない (Block か FailFast)
+        if lane is None:
+            lanes = (Client.Lane.State, Client.Lane.Stream)
+        else:
+            lanes = (lane,)
+        if Client.Lane.Control in lanes and policy in (
+            Client.Backpressure.DropOldest,
+            Client.Backpressure.Coalesce,
+        ):
+            raise ValueError(f"Backpressure.{policy.name} is not allowed for Lane.Control")
+        for lane in lanes:
+            self.m_backpressurePolicies[lane] = policy
+
+    def GetBackpressurePolicy(self, lane: Lane) -> Backpressure:
+        return self.m_backpressurePolicies[lane]
+
+    def SetReconnectInterval(self, minInterval: float, maxInterval: float):
+        # 再接続の待ち時間はこの範囲で指数的に伸ばす
+        self.m_reconnectMinInterval = minInterval
+        self.m_reconnectMaxInterval = max(minInterval, maxInterval)
+
+    class ConnectionState(enum.IntEnum):
+        Disconnected = enum.auto()
+        Connecting = enum.auto()
+        Connected = enum.auto()
+
     def Start(self, url: str) -> bool:
+        # 接続できなかった場合も開始扱いとし, バックグラウンドで再接続する
         self.Stop()
         self.m_log.Info("Start IPCClient")
         self.m_errorCount = 0
 
+        try:
+            self.m_transport = Transport(url)
+        except ValueError as e:
+            self.m_log.Error("%s", e)
+            return False
+
         try:
             self.m_socket = pynng.Req0(
                 recv_timeout=self.m_receiveTimeout, send_timeout=self.m_sendTimeout
             )
+            self.m_transport.Configure(self.m_socket)
+            self.m_socket.add_post_pipe_connect_cb(self.OnPipeConnected)
+            self.m_socket.add_post_pipe_remove_cb(self.OnPipeRemoved)
         except Exception:
             self.m_log.Error("Failed nng_req0_open()")
             return False
 
-        try:
-            self.m_dialer = self.m_socket.dial(url, block=True)
-        except Exception:
-            self.m_log.Error("Failed nng_dialer_create()")
-            self.m_socket.close()
-            return False
-
+        self.m_connectionState = Client.ConnectionState.Connecting
+        self.m_hasConnected = False
+        self.m_pipes.clear()
+        self.m_replayMessages.clear()
+        self.m_circuitBreaker.Reset()
+        self.m_congestion.Reset()
         self.m_started = True
+
+        if not self.Dial():
+            self.m_log.Warn("IPCClient retry dialing in background")
+
+        # I/O は常駐する worker thread で処理する
+        for i in range(self.m_workerCount):
+            worker = threading.Thread(target=self.WorkerMain, name=f"IPCClient-{i}", daemon=True)
+            self.m_workers.append(worker)
+            worker.start()
+
+        self.m_connectionThread = threading.Thread(
+            target=self.ConnectionMain, name="IPCClient-Connection", daemon=True
+        )
+        self.m_connectionThread.start()
+
         self.m_log.Info("Successful IPCClient start")
         return True
 
     def Stop(self):
         if self.m_started:
-            # nng_ctx_closeを明示的に実行
-            for work in self.m_works:
-                work.Close()
-            for work in self.m_freeWorks:
-                work.Close()
-            self.m_works.clear()
+            with self.m_requestsMutex:
+                self.m_started = False
+                for requests in self.m_requests.values():
+                    requests.clear()
+                for lane in self.m_inFlight:
+                    self.m_inFlight[lane] = 0
+                self.m_inFlightKeys.clear()
+                self.m_deadlines.clear()
+                pendingRequests = list(self.m_pendingRequests.values())
+                self.m_pendingRequests.clear()
+                self.m_activeWorks.clear()
+                self.m_connectionState = Client.ConnectionState.Disconnected
+                self.m_replayMessages.clear()
+                self.m_requestsCond.notify_all()
+                self.m_requestsSpaceCond.notify_all()
+                self.m_connectionCond.notify_all()
+
+            # 応答待ちの Future は待機側が抜けられるようにキャンセルする
+            for request in pendingRequests:
+                if request.m_sendTime and self.m_metrics.m_enabled:
+                    self.m_metrics.OnCancel(request.m_tag)
+                request.cancel()
 
-            self.m_freeWorks.clear()
+            # nng_ctx_closeを明示的に実行 (ブロック中の send/recv もここで抜ける)
+            with self.m_freeWorksMutex:
+                for work in self.m_works:
+                    work.Close()
+                self.m_works.clear()
+                self.m_freeWorks.clear()
+                self.m_freeWorksCond.notify_all()
 
             try:
-                self.m_dialer.close()
+                if self.m_dialer:
+                    self.m_dialer.close()
                 self.m_socket.close()
             except Exception:
                 pass
-            self.m_started = False
+            self.m_dialer = None
+
+            for worker in self.m_workers + [self.m_connectionThread]:
+                if worker and worker is not threading.current_thread():
+                    worker.join(1.0)
+            self.m_workers.clear()
+            self.m_connectionThread = None
+
             self.m_log.Info("Stop IPC Client")
 
     def IsStarted(self) -> bool:
         return self.m_started
 
+    def IsConnected(self) -> bool:
+        return self.m_connectionState == Client.ConnectionState.Connected
+
+    def GetConnectionState(self) -> ConnectionState:
+        return self.m_connectionState
+
+    def SetConnectionCallback(self, connectionCB: Callable[[ConnectionState], None]):
+        # 接続状態が変わった時に接続用の thread から呼ばれる. Stop() による切断では呼ばれない
+        self.m_connectionCB = connectionCB
+
+    def GetTransport(self) -> Transport:
+        return self.m_transport
+
     def GetErrorCount(self) -> int:
         return self.m_errorCount
 
+    def GetContextCount(self) -> int:
+        return len(self.m_works)
+
+    def GetQueuedRequestCount(self, lane: Lane = None) -> int:
+        if lane is not None:
+            return len(self.m_requests[lane])
+        return sum(len(requests) for requests in self.m_requests.values())
+
+    def GetInFlightCount(self, lane: Lane) -> int:
+        return self.m_inFlight[lane]
+
+    class ErrorCode(enum.IntEnum):
+        Success = 0
+        Failed = -1
+        Dropped = -2  # Backpressure.DropOldest で破棄された
+        Coalesced = -3  # Backpressure.Coalesce で新しい要求に置き換えられた
+        Timeout = -4  # 期限までに応答が無かった
+        Cancelled = -5  # Cancel() で中断された
+
     class ReplyCBType(enum.IntEnum):
         Send = enum.auto()
         Recv = enum.auto()
 
-    def Send(self, message: bytes, replyCB: Callable[[ReplyCBType, int, bytes], None]):
-        self.m_log.Trace("Client::Send()")
+    def Send(
+        self,
+        message: bytes,
+        replyCB: Callable[[ReplyCBType, int, bytes], None] = None,
+        decoder: Callable[[bytes], Any] = None,
+        key: Hashable = None,
+        replayKey: Hashable = None,
+        timeout: int = None,
+        tag: int = 0,
+        lane: Lane = Lane.State,
+    ) -> "Client.Request":
+        # 失敗時は None を返す
+        # lane ごとに送信待ちの上限と同時送受信数の上限を持ち, 優先度の高い lane から送る
+        # timeout [msec] を指定した場合は Send() からの期限とし, 全体のタイムアウトより優先する
+        # tag は Metrics の集計単位
+        # key が同じ要求は Send() した順に 1 つずつ送受信する
+        # lane をまたいだ順番は保たない. 後から Send() した Control が先に送られることがある
+        # また Backpressure.Coalesce で置き換え対象を判断するのに使用する
+        # replayKey を指定した最新のメッセージは再接続時に再送する
+        self.m_log.Trace("Client::Send() tag=%d size=%d", tag, len(message))
 
         if not self.m_started:
-            return False
+            return None
 
-        try:
-            self.m_freeWorksMutex.acquire()
+        if self.IsShedding(lane):
+            # Viewer が応答しない間は送らず, 復帰した時に最新の状態だけを送る
+            if replayKey is not None:
+                self.SetReplayMessage(replayKey, message)
+            return None
 
-            work = None
+        droppedRequests: list[Client.Request] = []
+        with self.m_requestsMutex:
+            if not self.m_started:
+                return None
+            request = Client.Request(next(self.m_requestIds), message, replyCB, decoder, key)
+            request.m_client = self
+            request.m_tag = tag
+            request.m_lane = lane
+            if timeout is not None:
+                request.m_deadline = time.monotonic() + timeout / 1000
+                heapq.heappush(self.m_deadlines, (request.m_deadline, request.m_requestId))
 
-            if len(self.m_freeWorks) != 0:
-                work = self.m_freeWorks.popleft()
-            else:
-                try:
-                    ctx = self.m_socket.new_context()
-                except Exception:
-                    self.m_log.Error("Failed nng_ctx_open()")
-                    return False
-                p = Client.Work()
-                p.m_ctx = ctx
+            requests = self.m_requests[lane]
+            replaced = False
+            while not replaced and len(requests) >= self.m_maxPendingRequests:
+                policy = self.m_backpressurePolicies[lane]
+                if policy == Client.Backpressure.Block:
+                    self.m_requestsSpaceCond.wait()
+                    if not self.m_started:
+                        return None
+                elif policy == Client.Backpressure.FailFast:
+                    if lane == Client.Lane.Control:
+                        self.m_log.Error("IPCClient control request queue is full")
+                    else:
+                        self.m_log.Warn("IPCClient request queue is full")
+                    return None
+                else:
+                    index = None
+                    if policy == Client.Backpressure.Coalesce and key is not None:
+                        index = self.FindQueuedRequest(requests, key)
+                    if index is not None:
+                        # 同じ key の要求を順番を変えずに置き換える
+                        droppedRequests.append(requests[index])
+                        requests[index] = request
+                        replaced = True
+                    else:
+                        droppedRequests.append(requests.popleft())
 
-                p.m_aio = Client.AIO(Client.WorkCB, p)
+            if not replaced:
+                requests.append(request)
+            if replayKey is not None:
+                self.SetReplayMessage(replayKey, message)
+            self.m_pendingRequests[request.m_requestId] = request
+            self.m_requestsCond.notify()
 
-                p.m_client = self
+        for dropped in droppedRequests:
+            code = Client.ErrorCode.Dropped
+            if dropped.m_key is not None and dropped.m_key == key:
+                code = Client.ErrorCode.Coalesced
+            self.Complete(dropped.m_requestId, Client.ReplyCBType.Send, code, None)
 
-                work = p
-                self.m_works.append(work)
+        return request
 
-            work.m_msg = message
+    def IsShedding(self, lane: Lane) -> bool:
+        # CircuitBreaker が Closed 以外の間は Control 以外の lane の送信を止める
+        # 別チャネルで送る場合も同じ判断を使う
+        return (
+            lane != Client.Lane.Control
+            and self.m_circuitBreaker.GetState() != CircuitBreaker.State.Closed
+        )
 
-            work.m_aio.message = work.m_msg
-            work.m_msg = None
+    def SetReplayMessage(self, replayKey: Hashable, message: Union[bytes, Callable[[], bytes]]) -> None:
+        # 別チャネルで送ったメッセージも再接続時の再送対象にできる
+        # message に関数を渡すと再送する時まで生成を遅らせる
+        with self.m_requestsMutex:
+            # 最後に更新したものが後ろに来るように入れ直す
+            self.m_replayMessages.pop(replayKey, None)
+            self.m_replayMessages[replayKey] = message
 
-            work.m_replyCB = replyCB
+    def FindQueuedRequest(self, requests: Deque["Client.Request"], key: Hashable) -> int:
+        for i in range(len(requests) - 1, -1, -1):
+            if requests[i].m_key == key:
+                return i
+        return None
 
-            work.m_state = Client.State.Send
+    def Dial(self) -> bool:
+        if self.m_dialer:
+            try:
+                self.m_dialer.close()
+            except Exception:
+                pass
+            self.m_dialer = None
 
-            work.m_aio.Send(work.m_ctx)
-        finally:
-            if self.m_freeWorksMutex.locked():
-                self.m_freeWorksMutex.release()
+        try:
+            self.m_dialer = self.m_socket.dial(self.m_transport.GetUrl(), block=True)
+        except Exception:
+            self.m_log.Error("Failed nng_dialer_create()")
+            return False
 
+        self.SetConnectionState(Client.ConnectionState.Connected)
         return True
 
-    # pynngはaioのコールバックが未実装なので独自に定義
-    class AIO:
-        class WorkThread(Thread):
-            def __init__(self, task, callback):
-                super().__init__(daemon=True)
-                self.task = task
-                self.callback = callback
-
-            def run(self):
-                result = self.task()
-                self.callback(result)
-
-            def kill(self):
-                if self.is_alive():
-                    ret = ctypes.pythonapi.PyThreadState_SetAsyncExc(
-                        self.native_id, ctypes.py_object(SystemExit)
-                    )
-                    if ret > 1:
-                        ctypes.pythonapi.PyThreadState_SetAsyncExc(self.native_id, None)
+    def OnPipeConnected(self, pipe: pynng.Pipe) -> None:
+        with self.m_requestsMutex:
+            self.m_pipes.add(pipe.id)
+        if self.m_started:
+            self.SetConnectionState(Client.ConnectionState.Connected)
 
-        def __init__(self, workCB, work):
-            self.workCB = workCB
-            self.work = work
-            self.message = None
-            self.thread = None
-            self.result = -1
+    def OnPipeRemoved(self, pipe: pynng.Pipe) -> None:
+        with self.m_requestsMutex:
+            self.m_pipes.discard(pipe.id)
+            if not self.m_started or len(self.m_pipes) != 0:
+                return
+        self.SetConnectionState(Client.ConnectionState.Disconnected)
 
-        def SendTask(self, ctx: pynng.Context):
-            try:
-                ctx.send(self.message)
-                return 0
-            except Exception:
-                return -1
+    def SetConnectionState(self, state: ConnectionState) -> None:
+        with self.m_requestsMutex:
+            if self.m_connectionState == state:
+                return
+            self.m_connectionState = state
+
+            if state == Client.ConnectionState.Connected:
+                # 接続し直した Viewer は改めて判定する
+                self.m_circuitBreaker.Reset()
+                if self.m_hasConnected:
+                    self.EnqueueReplayMessages()
+                self.m_hasConnected = True
+
+            self.m_requestsCond.notify_all()
+            self.m_connectionCond.notify_all()
+
+        self.m_log.Info("IPCClient connection state: %s", state.name)
+        if self.m_connectionCB:
+            self.m_connectionCB(state)
+
+    def EnqueueReplayMessages(self) -> None:
+        # 再接続時は最新の状態を未送信の要求より先に送り直す
+        for replayKey, message in reversed(list(self.m_replayMessages.items())):
+            if callable(message):
+                message = message()
+            request = Client.Request(next(self.m_requestIds), message, None, None, replayKey)
+            self.m_pendingRequests[request.m_requestId] = request
+            self.m_requests[Client.Lane.State].appendleft(request)
+        if len(self.m_replayMessages) != 0:
+            self.m_log.Info("IPCClient replay %d messages", len(self.m_replayMessages))
+
+    def ConnectionMain(self) -> None:
+        interval = self.m_reconnectMinInterval
+        while True:
+            probe = False
+            with self.m_requestsMutex:
+                while self.m_started and self.m_connectionState == Client.ConnectionState.Connected:
+                    # 接続中は CircuitBreaker が Open の場合に復帰の確認を行う
+                    probe = self.m_circuitBreaker.TryHalfOpen()
+                    if probe:
+                        break
+                    self.m_connectionCond.wait(self.m_circuitBreaker.GetProbeWait())
+                    interval = self.m_reconnectMinInterval
+                if not self.m_started:
+                    return
+                if not probe:
+                    self.m_connectionState = Client.ConnectionState.Connecting
 
-        def RecvTask(self, ctx: pynng.Context):
+            if probe:
+                self.SendProbe()
+                continue
+
+            if self.Dial():
+                continue
+
+            # 複数のクライアントが同時に再接続しないようにジッターを入れる
+            wait = interval * random.uniform(0.5, 1.0)
+            interval = min(interval * 2, self.m_reconnectMaxInterval)
+            with self.m_requestsMutex:
+                if self.m_started and self.m_connectionState != Client.ConnectionState.Connected:
+                    self.m_connectionCond.wait(wait)
+
+    def SendProbe(self) -> None:
+        if self.m_probeMessage is None:
+            # 確認する手段が無いので Closed に戻して通常の要求の結果で判断する
+            self.OnCircuitStateChanged(self.m_circuitBreaker.RecordSuccess())
+            return
+
+        self.m_log.Info("IPCClient probe viewer")
+        if self.Send(self.m_probeMessage, lane=Client.Lane.Control, tag=self.m_probeTag) is None:
+            self.OnCircuitStateChanged(self.m_circuitBreaker.RecordFailure(False))
+
+    def RecordResult(self, ret: int, rtt: float) -> None:
+        # 実際に送受信した要求の結果だけを CircuitBreaker, CongestionControl に記録する
+        if self.m_congestionEnabled:
+            if ret == Client.ErrorCode.Success:
+                self.m_congestion.OnSample(rtt)
+            elif ret == Client.ErrorCode.Timeout:
+                self.m_congestion.OnTimeout()
+            elif ret == Client.ErrorCode.Failed:
+                self.m_congestion.OnError()
+
+        if ret == Client.ErrorCode.Success:
+            state = self.m_circuitBreaker.RecordSuccess()
+        elif ret in (Client.ErrorCode.Failed, Client.ErrorCode.Timeout):
+            state = self.m_circuitBreaker.RecordFailure(ret == Client.ErrorCode.Timeout)
+        else:
+            return
+        self.OnCircuitStateChanged(state)
+
+    def OnCircuitStateChanged(self, state: CircuitBreaker.State) -> None:
+        if state is None:
+            return
+
+        droppedRequests: list[Client.Request] = []
+        with self.m_requestsMutex:
+            if state == CircuitBreaker.State.Open:
+                # 送信待ちの更新は捨てる. 最新の状態は復帰時に送り直す
+                for lane in (Client.Lane.State, Client.Lane.Stream):
+                    droppedRequests.extend(self.m_requests[lane])
+                    self.m_requests[lane].clear()
+                self.m_requestsSpaceCond.notify_all()
+            elif (
+                state == CircuitBreaker.State.Closed
+                and self.m_started
+                and self.m_connectionState == Client.ConnectionState.Connected
+            ):
+                # 止めていた間の最新の状態を送り直す
+                self.EnqueueReplayMessages()
+                self.m_requestsCond.notify_all()
+            # Open の場合は復帰の確認の時刻を設定し直す
+            self.m_connectionCond.notify_all()
+
+        for dropped in droppedRequests:
+            self.Complete(dropped.m_requestId, Client.ReplyCBType.Send, Client.ErrorCode.Dropped, None)
+
+        self.m_log.Info("IPCClient circuit state: %s", state.name)
+
+    def Cancel(self, request: "Client.Request") -> bool:
+        # 完了済みの場合は False を返す
+        work = None
+        with self.m_requestsMutex:
+            if request.m_requestId not in self.m_pendingRequests:
+                return False
             try:
-                self.message = ctx.recv()
-                return 0
-            except Exception:
-                return -1
+                self.m_requests[request.m_lane].remove(request)
+                self.m_requestsSpaceCond.notify_all()
+            except ValueError:
+                work = self.m_activeWorks.get(request.m_requestId)
+                if work:
+                    # ReleaseWork() で free list に戻さないようにする
+                    work.m_cancelled = True
 
-        def SendCallback(self, result):
-            self.result = result
-            if self.workCB:
-                self.workCB(self.work)
+        if work:
+            # ブロック中の send/recv を直ちに抜けさせる
+            work.Close()
 
-        def RecvCallback(self, result):
-            self.result = result
-            if self.workCB:
-                self.workCB(self.work)
+        self.Complete(request.m_requestId, Client.ReplyCBType.Send, Client.ErrorCode.Cancelled, None)
+        return True
 
-        def Send(self, context: pynng.Context):
-            self.thread = Client.AIO.WorkThread(lambda: self.SendTask(context), self.SendCallback)
-            self.thread.start()
+    async def SendAsync(
+        self,
+        message: bytes,
+        timeout: int = None,
+        tag: int = 0,
+        key: Hashable = None,
+        replayKey: Hashable = None,
+        lane: Lane = Lane.State,
+    ) -> Tuple[ReplyCBType, int, bytes]:
+        # Send() と同じ送信待ちの queue に積み, 完了を event loop から待つ
+        # lane, key による順序や Backpressure, CircuitBreaker も Send() と同じく適用される
+        # キャンセルは asyncio.Task.cancel() を使用する. 送信待ち, 応答待ちのどちらでも中断する
+        request = self.Send(
+            message, key=key, replayKey=replayKey, timeout=timeout, tag=tag, lane=lane
+        )
+        if request is None:
+            return (Client.ReplyCBType.Send, Client.ErrorCode.Failed, "".encode("utf-8"))
 
-        def Recv(self, context: pynng.Context):
-            self.thread = Client.AIO.WorkThread(lambda: self.RecvTask(context), self.RecvCallback)
-            self.thread.start()
+        result: Client.Result = await asyncio.wrap_future(request)
+        return (result.GetType(), result.GetErrorCode(), result.GetMessage())
 
-        def Close(self):
-            if self.thread:
-                self.workCB = None
+    class Result:
+        def __init__(self, requestId: int, type, code: int, message: bytes, reply, rtt: float):
+            self.m_requestId = requestId
+            self.m_type: Client.ReplyCBType = type
+            self.m_code = code
+            self.m_message = message
+            self.m_reply = reply
+            self.m_roundTripTime = rtt
+
+        def GetRequestId(self) -> int:
+            return self.m_requestId
+
+        def GetType(self) -> "Client.ReplyCBType":
+            return self.m_type
+
+        def GetErrorCode(self) -> int:
+            return self.m_code
+
+        def GetMessage(self) -> bytes:
+            return self.m_message
+
+        def GetReply(self):
+            # decoder を指定した場合のデコード結果
+            return self.m_reply
+
+        def GetRoundTripTime(self) -> float:
+            return self.m_roundTripTime
+
+        def IsSuccess(self) -> bool:
+            return self.m_type == Client.ReplyCBType.Recv and self.m_code == 0
+
+    class Request(Future):
+        def __init__(self, requestId: int, message: bytes, replyCB, decoder, key):
+            super().__init__()
+            self.m_requestId = requestId
+            self.m_msg = message
+            self.m_key: Hashable = key
+            self.m_replyCB: Callable[[Client.ReplyCBType, int, bytes], None] = replyCB
+            self.m_decoder: Callable[[bytes], Any] = decoder
+            self.m_sendTime = 0.0
+            self.m_deadline = 0.0
+            self.m_tag = 0
+            self.m_lane = Client.Lane.State
+            self.m_client: Client = None
+
+        def GetRequestId(self) -> int:
+            return self.m_requestId
+
+        def cancel(self) -> bool:
+            # 送信待ち, 応答待ちのどちらでも context を解放して中断する
+            if self.m_client and self.m_client.Cancel(self):
+                return True
+            return super().cancel()
+
+        def Wait(self, timeout: float = None) -> "Client.Result":
+            # タイムアウトもしくはキャンセル時は None を返す
+            try:
+                return self.result(timeout)
+            except Exception:
+                return None
 
     class State(enum.IntEnum):
         Init = enum.auto()
@@ -205,72 +705,349 @@ class Client:
         def __init__(self):
             self.m_state = Client.State.Init
             self.m_ctx: pynng.Context = None
-            self.m_aio: Client.AIO = None
-            self.m_msg: str = None
-            self.m_replyCB: Callable[[Client.ReplyCBType, int, bytes], None] = None
+            self.m_msg: bytes = None
+            self.m_requestId = 0
+            self.m_deadline = 0.0
+            self.m_lastUsed = 0.0
+            self.m_sendTimeout = -1
+            self.m_receiveTimeout = -1
+            self.m_cancelled = False
             self.m_client: Client = None
 
+        def SetTimeouts(self, sendTimeout: int, receiveTimeout: int):
+            # context は再利用するので値が変わる時だけ設定する
+            if self.m_sendTimeout != sendTimeout:
+                self.m_ctx.send_timeout = sendTimeout
+                self.m_sendTimeout = sendTimeout
+            if self.m_receiveTimeout != receiveTimeout:
+                self.m_ctx.recv_timeout = receiveTimeout
+                self.m_receiveTimeout = receiveTimeout
+
         def Close(self):
-            # 自身のwork threadを強制終了させる
-            if self.m_aio:
-                self.m_aio.Close()
             try:
                 if self.m_ctx:
                     self.m_ctx.close()
             except Exception:
                 pass
 
+    def AcquireWork(self, block: bool = True) -> Work:
+        with self.m_freeWorksCond:
+            while True:
+                if not self.m_started:
+                    return None
+
+                if len(self.m_freeWorks) != 0:
+                    # 直近に使用した context から再利用し, 使われない context を回収対象にする
+                    return self.m_freeWorks.pop()
+
+                if len(self.m_works) < self.m_maxContexts:
+                    break
+
+                if not block:
+                    self.m_log.Warn("IPCClient context pool is exhausted")
+                    return None
+                self.m_freeWorksCond.wait()
+
+            try:
+                ctx = self.m_socket.new_context()
+            except Exception:
+                self.m_log.Error("Failed nng_ctx_open()")
+                return None
+            work = Client.Work()
+            work.m_ctx = ctx
+            work.m_sendTimeout = self.m_sendTimeout
+            work.m_receiveTimeout = self.m_receiveTimeout
+            work.m_client = self
+            self.m_works.append(work)
+            return work
+
+    def ReleaseWork(self, work: Work) -> None:
+        with self.m_freeWorksCond:
+            work.m_state = Client.State.Init
+            work.m_msg = None
+            work.m_requestId = 0
+            work.m_deadline = 0.0
+            work.m_lastUsed = time.monotonic()
+            if self.m_started and work in self.m_works and not work.m_cancelled:
+                # 送受信の成否に関わらず context は再利用する
+                self.m_freeWorks.append(work)
+            else:
+                # キャンセルで閉じた context は破棄して枠を空ける
+                if work in self.m_works:
+                    self.m_works.remove(work)
+                work.Close()
+            self.m_freeWorksCond.notify()
+        self.ReapIdleWorks()
+
+    def ReapIdleWorks(self) -> None:
+        with self.m_freeWorksCond:
+            now = time.monotonic()
+            while (
+                len(self.m_freeWorks) != 0
+                and now - self.m_freeWorks[0].m_lastUsed > self.m_contextIdleTimeout
+            ):
+                work = self.m_freeWorks.popleft()
+                self.m_works.remove(work)
+                work.Close()
+
+    def ExpireRequests(self) -> list["Client.Request"]:
+        # m_requestsMutex を取得した状態で呼ぶこと
+        # 送信待ちのまま期限切れになった要求を queue から取り除いて返す
+        expiredRequests: list[Client.Request] = []
+        now = time.monotonic()
+        while len(self.m_deadlines) != 0 and self.m_deadlines[0][0] <= now:
+            _, requestId = heapq.heappop(self.m_deadlines)
+            request = self.m_pendingRequests.get(requestId)
+            if request is None:
+                continue
+            try:
+                self.m_requests[request.m_lane].remove(request)
+            except ValueError:
+                # 送受信中. 期限は ApplyTimeout() で扱う
+                continue
+            expiredRequests.append(request)
+        return expiredRequests
+
+    def GetRequestWait(self) -> float:
+        # m_requestsMutex を取得した状態で呼ぶこと
+        if len(self.m_deadlines) == 0:
+            return self.m_contextIdleTimeout
+        wait = self.m_deadlines[0][0] - time.monotonic()
+        return max(0.0, min(wait, self.m_contextIdleTimeout))
+
+    def WorkerMain(self) -> None:
+        while True:
+            with self.m_requestsMutex:
+                request = None
+                expiredRequests: list[Client.Request] = []
+                while self.m_started:
+                    # 切断中も期限切れの要求は完了させる
+                    expiredRequests = self.ExpireRequests()
+                    if expiredRequests:
+                        break
+                    # 切断中の要求は再接続まで保持する
+                    if self.m_connectionState == Client.ConnectionState.Connected:
+                        request = self.PopRequest()
+                        if request:
+                            break
+                    if not self.m_requestsCond.wait(self.GetRequestWait()):
+                        self.ReapIdleWorks()
+                if not self.m_started:
+                    return
+                # Lane ごとに待っている Send() があるので全て起こす
+                self.m_requestsSpaceCond.notify_all()
+
+            # 送っていないので CircuitBreaker, CongestionControl には記録しない
+            for expired in expiredRequests:
+                self.Complete(
+                    expired.m_requestId, Client.ReplyCBType.Send, Client.ErrorCode.Timeout, None
+                )
+            if request is None:
+                continue
+
+            work = self.AcquireWork()
+            if work is None:
+                self.ReleaseRequest(request)
+                if self.m_started:
+                    self.m_errorCount += 1
+                    self.Complete(
+                        request.m_requestId, Client.ReplyCBType.Send, Client.ErrorCode.Failed, None
+                    )
+                continue
+
+            with self.m_requestsMutex:
+                cancelled = request.m_requestId not in self.m_pendingRequests
+                expired = request.m_deadline and time.monotonic() >= request.m_deadline
+                if not cancelled and not expired:
+                    self.m_activeWorks[request.m_requestId] = work
+            if cancelled or expired:
+                # context を待っている間にキャンセルもしくは期限切れになった
+                self.ReleaseRequest(request)
+                self.ReleaseWork(work)
+                if not cancelled:
+                    self.Complete(
+                        request.m_requestId, Client.ReplyCBType.Send, Client.ErrorCode.Timeout, None
+                    )
+                continue
+
+            message = self.EncodeMessage(request.m_msg)
+            if self.m_metrics.m_enabled:
+                self.m_metrics.OnSend(request.m_tag, len(message))
+            request.m_sendTime = time.perf_counter()
+            work.m_requestId = request.m_requestId
+            work.m_deadline = request.m_deadline
+            work.m_msg = message
+            work.m_state = Client.State.Send
+            self.StepWork(work)
+
+            with self.m_requestsMutex:
+                self.m_activeWorks.pop(request.m_requestId, None)
+            self.ReleaseRequest(request)
+            self.ReleaseWork(work)
+
+    def PopRequest(self) -> "Client.Request":
+        # m_requestsMutex を取得した状態で呼ぶこと
+        # 同時送受信数の上限に達していない Lane のうち優先度の高いものから取り出す
+        # 同じ key の要求が送受信中のものは飛ばし, key ごとの順番を保つ
+        for lane in Client.Lane:
+            requests = self.m_requests[lane]
+            if len(requests) == 0:
+                continue
+            limit = self.m_inFlightLimits[lane]
+            if lane == Client.Lane.Stream and self.m_congestionEnabled:
+                limit = self.m_congestion.GetWindow()
+            if limit and self.m_inFlight[lane] >= limit:
+                continue
+            for index, request in enumerate(requests):
+                if request.m_key is None or request.m_key not in self.m_inFlightKeys:
+                    break
+            else:
+                continue
+            del requests[index]
+            self.m_inFlight[lane] += 1
+            if request.m_key is not None:
+                self.m_inFlightKeys.add(request.m_key)
+            return request
+        return None
+
+    def ReleaseRequest(self, request: "Client.Request") -> None:
+        with self.m_requestsMutex:
+            if self.m_inFlight[request.m_lane] > 0:
+                self.m_inFlight[request.m_lane] -= 1
+            self.m_inFlightKeys.discard(request.m_key)
+            # 上限や key で止まっていた要求を送れるようにする
+            self.m_requestsCond.notify_all()
+
+    def ApplyTimeout(self, work: Work) -> bool:
+        # 期限切れの場合は False を返す
+        if not work.m_deadline:
+            if self.m_congestionEnabled:
+                # 計測した RTT からの期限は設定値より短くしない. 時間のかかるコマンドを打ち切らないため
+                timeout = self.m_congestion.GetTimeout()
+                work.SetTimeouts(
+                    Client.ClampTimeout(timeout, self.m_sendTimeout),
+                    Client.ClampTimeout(timeout, self.m_receiveTimeout),
+                )
+            else:
+                work.SetTimeouts(self.m_sendTimeout, self.m_receiveTimeout)
+            return True
+
+        remain = int((work.m_deadline - time.monotonic()) * 1000)
+        if remain <= 0:
+            return False
+        work.SetTimeouts(remain, remain)
+        return True
+
     @staticmethod
-    def WorkCB(work: Work) -> None:
-        if work is None:
-            return
-        work.m_client.StepWork(work)
+    def ClampTimeout(timeout: int, configured: int) -> int:
+        # configured が負 (無制限) の場合は timeout をそのまま使用する
+        if configured < 0:
+            return timeout
+        return max(timeout, configured)
 
     def StepWork(self, work: Work) -> None:
-        try:
-            ret = 0
-            if work.m_state == Client.State.Init:
-                pass
-            elif work.m_state == Client.State.Send:
-                self.m_log.Trace("IPCClient State::Send")
-                ret = work.m_aio.result
+        while work.m_state != Client.State.Init:
+            if work.m_state == Client.State.Send:
+                self.m_log.Trace("IPCClient State::Send [%d]", work.m_requestId)
+                try:
+                    if not self.ApplyTimeout(work):
+                        ret = Client.ErrorCode.Timeout
+                    else:
+                        work.m_ctx.send(work.m_msg)
+                        ret = Client.ErrorCode.Success
+                except pynng.Timeout:
+                    ret = Client.ErrorCode.Timeout
+                except Exception:
+                    ret = Client.ErrorCode.Failed
+
                 if ret == 0:
                     work.m_state = Client.State.Recv
-                    work.m_aio.Recv(work.m_ctx)
-
                 else:
-                    self.m_errorCount += 1
-                    self.m_log.Error(f"IPCClient Failed State::Send[{ret}]")
-
-                    if work.m_replyCB:
-                        # 送信失敗時は空のリプライを返す
-                        work.m_replyCB(Client.ReplyCBType.Send, ret, "".encode("utf-8"))
-                    work.m_replyCB = None
-                    # 送信に失敗したら m_freeWorks に追加しておく
-                    self.m_freeWorksMutex.acquire()
                     work.m_state = Client.State.Init
-                    self.m_freeWorks.append(work)
+                    if not self.m_started or work.m_cancelled:
+                        # Stop() や Cancel() による中断は完了済み
+                        return
+                    self.m_errorCount += 1
+                    self.m_log.Error("IPCClient Failed State::Send[%d] [%d]", ret, work.m_requestId)
+
+                    # 送信失敗時は空のリプライを返す
+                    self.Complete(work.m_requestId, Client.ReplyCBType.Send, ret, None)
             elif work.m_state == Client.State.Recv:
-                self.m_log.Trace("IPCClient State::Recv")
-                ret = work.m_aio.result
+                self.m_log.Trace("IPCClient State::Recv [%d]", work.m_requestId)
+                try:
+                    if not self.ApplyTimeout(work):
+                        ret = Client.ErrorCode.Timeout
+                    else:
+                        work.m_msg = work.m_ctx.recv()
+                        ret = Client.ErrorCode.Success
+                except pynng.Timeout:
+                    ret = Client.ErrorCode.Timeout
+                except Exception:
+                    ret = Client.ErrorCode.Failed
+
+                work.m_state = Client.State.Init
+                if not self.m_started or work.m_cancelled:
+                    return
                 if ret == 0:
                     # エラーカウントをリセットする
                     self.m_errorCount = 0
-
-                    work.m_msg = work.m_aio.message
-                    if work.m_replyCB:
-                        work.m_replyCB(Client.ReplyCBType.Recv, ret, work.m_msg)
+                    self.Complete(work.m_requestId, Client.ReplyCBType.Recv, ret, work.m_msg)
                 else:
                     # エラーカウントを上げる
                     self.m_errorCount += 1
-                    self.m_log.Error(f"IPCClient Failed State::Recv[{ret}]")
-                    if work.m_replyCB:
-                        work.m_replyCB(Client.ReplyCBType.Recv, ret, "".encode("utf-8"))
-                    work.m_replyCB = None
-                    # m_freeWorks に追加しておく
-                    self.m_freeWorksMutex.acquire()
-                    work.m_state = Client.State.Init
-                    self.m_freeWorks.append(work)
-        finally:
-            if self.m_freeWorksMutex.locked():
-                self.m_freeWorksMutex.release()
+                    self.m_log.Error("IPCClient Failed State::Recv[%d] [%d]", ret, work.m_requestId)
+                    self.Complete(work.m_requestId, Client.ReplyCBType.Recv, ret, None)
+
+    def Complete(self, requestId: int, type: ReplyCBType, ret: int, msg: bytes) -> None:
+        # request id で送信元の Request を特定する (context の取り違えを防ぐ)
+        with self.m_requestsMutex:
+            request = self.m_pendingRequests.pop(requestId, None)
+        if request is None:
+            self.m_log.Warn("IPCClient unknown request id [%d]", requestId)
+            return
+
+        if msg is None:
+            msg = "".encode("utf-8")
+
+        rtt = 0.0
+        if request.m_sendTime and ret == Client.ErrorCode.Cancelled:
+            rtt = time.perf_counter() - request.m_sendTime
+            if self.m_metrics.m_enabled:
+                self.m_metrics.OnCancel(request.m_tag)
+        elif request.m_sendTime:
+            rtt = time.perf_counter() - request.m_sendTime
+            self.RecordResult(ret, rtt)
+            if self.m_metrics.m_enabled:
+                self.m_metrics.OnComplete(
+                    request.m_tag,
+                    type == Client.ReplyCBType.Recv and ret == Client.ErrorCode.Success,
+                    ret == Client.ErrorCode.Timeout,
+                    len(msg),
+                    rtt,
+                )
+
+        reply = None
+        if request.m_decoder and type == Client.ReplyCBType.Recv and ret == 0:
+            try:
+                reply = request.m_decoder(msg)
+            except Exception:
+                self.m_log.Error("IPCClient Failed decode reply [%d]", requestId)
+
+        if request.m_replyCB and self.m_replyDispatcher:
+            self.m_replyDispatcher.Post(request.m_replyCB, type, ret, msg)
+        elif request.m_replyCB:
+            try:
+                request.m_replyCB(type, ret, msg)
+            except Exception as e:
+                # worker thread を止めないようにコールバックの例外はここで止める
+                self.m_log.Error("IPCClient Exception in reply callback [%s]", e)
+
+        if ret == Client.ErrorCode.Cancelled:
+            Future.cancel(request)
+            return
+
+        try:
+            request.set_result(Client.Result(requestId, type, ret, msg, reply, rtt))
+        except InvalidStateError:
+            # 呼び出し側でキャンセル済み
+            pass
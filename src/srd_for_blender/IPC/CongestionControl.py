@@ -0,0 +1,107 @@
+import threading
+import time
+
+
+class CongestionControl:
+    # TCP (RFC 6298) と同様に RTT の平滑値と分散から要求の期限を決める
+    # 同時送受信数の window は応答が返るたびに加算し, タイムアウトや遅延の増加で半減する (AIMD)
+    def __init__(self):
+        self.m_mutex = threading.Lock()
+        self.m_minTimeout = 0.1
+        self.m_maxTimeout = 2.0
+        self.m_initialTimeout = 0.3
+        self.m_minWindow = 1.0
+        self.m_maxWindow = 3.0
+        self.m_initialWindow = 2.0
+        # RTT が最小値のこの倍数を超えたら混雑しているとみなす
+        self.m_latencyFactor = 4.0
+        self.m_basePeriod = 0.1
+        self.m_minPeriod = 1 / 60
+        self.m_maxPeriod = 1.0
+        self.Reset()
+
+    def Reset(self) -> None:
+        with self.m_mutex:
+            self.m_srtt = 0.0
+            self.m_rttvar = 0.0
+            self.m_minRtt = 0.0
+            self.m_timeout = self.m_initialTimeout
+            self.m_backoff = 1
+            self.m_window = self.m_initialWindow
+            self.m_lastDecrease = 0.0
+
+    def SetTimeoutRange(self, initial: float, minimum: float, maximum: float) -> None:
+        # 単位は秒. 計測値が無い間は initial を使用する
+        self.m_initialTimeout = initial
+        self.m_minTimeout = minimum
+        self.m_maxTimeout = max(minimum, maximum)
+
+    def SetWindowRange(self, initial: float, minimum: float, maximum: float) -> None:
+        self.m_minWindow = max(1.0, minimum)
+        self.m_maxWindow = max(self.m_minWindow, maximum)
+        self.m_initialWindow = min(max(initial, self.m_minWindow), self.m_maxWindow)
+        with self.m_mutex:
+            self.m_window = min(max(self.m_window, self.m_minWindow), self.m_maxWindow)
+
+    def SetFlushPeriodRange(self, base: float, minimum: float, maximum: float) -> None:
+        # window が初期値の時に base, window に反比例させて minimum から maximum の間に収める
+        self.m_basePeriod = base
+        self.m_minPeriod = minimum
+        self.m_maxPeriod = max(minimum, maximum)
+
+    def GetSmoothedRtt(self) -> float:
+        return self.m_srtt
+
+    def GetRttVariance(self) -> float:
+        return self.m_rttvar
+
+    def GetTimeout(self) -> int:
+        # 要求の期限 [msec]
+        return int(min(self.m_timeout * self.m_backoff, self.m_maxTimeout) * 1000)
+
+    def GetWindow(self) -> int:
+        return int(self.m_window)
+
+    def GetFlushPeriod(self) -> float:
+        period = self.m_basePeriod * self.m_initialWindow / self.m_window
+        return min(max(period, self.m_minPeriod), self.m_maxPeriod)
+
+    def OnSample(self, rtt: float) -> None:
+        # 応答が返った要求の RTT [sec]
+        with self.m_mutex:
+            if self.m_srtt == 0.0:
+                self.m_srtt = rtt
+                self.m_rttvar = rtt / 2
+                self.m_minRtt = rtt
+            else:
+                self.m_rttvar = 0.75 * self.m_rttvar + 0.25 * abs(self.m_srtt - rtt)
+                self.m_srtt = 0.875 * self.m_srtt + 0.125 * rtt
+                self.m_minRtt = min(self.m_minRtt, rtt)
+            timeout = self.m_srtt + max(4 * self.m_rttvar, 0.001)
+            self.m_timeout = min(max(timeout, self.m_minTimeout), self.m_maxTimeout)
+            self.m_backoff = 1
+
+            if rtt > self.m_minRtt * self.m_latencyFactor and rtt > self.m_minTimeout / 2:
+                self.Decrease()
+            else:
+                # window 1 つ分の応答で 1 増やす
+                self.m_window = min(self.m_window + 1 / self.m_window, self.m_maxWindow)
+
+    def OnTimeout(self) -> None:
+        with self.m_mutex:
+            # 次の期限は倍にして Viewer が重い間に失敗が続かないようにする
+            if self.m_timeout * self.m_backoff < self.m_maxTimeout:
+                self.m_backoff *= 2
+            self.Decrease()
+
+    def OnError(self) -> None:
+        with self.m_mutex:
+            self.Decrease()
+
+    def Decrease(self) -> None:
+        # 同じ混雑で何度も半減しないように 1 RTT に 1 回までとする
+        now = time.monotonic()
+        if now - self.m_lastDecrease < max(self.m_srtt, self.m_minTimeout):
+            return
+        self.m_lastDecrease = now
+        self.m_window = max(self.m_window / 2, self.m_minWindow)
@@ -0,0 +1,59 @@
+import asyncio
+from typing import Callable, Coroutine
+
+
+class EventLoop:
+    # Blender のメインスレッドから bpy.app.timers で少しずつ回す asyncio ループ
+    def __init__(self):
+        self.m_loop = asyncio.new_event_loop()
+        self.m_period = 0.01
+        self.m_submitCB: Callable[[], None] = None
+
+    def __del__(self):
+        self.Close()
+
+    def SetPeriod(self, period: float) -> None:
+        self.m_period = period
+
+    def GetLoop(self) -> asyncio.AbstractEventLoop:
+        return self.m_loop
+
+    def SetSubmitCB(self, submitCB: Callable[[], None]) -> None:
+        # task を積んだ時に呼ぶ. 回す timer はここで登録し, task が無い間は登録しない
+        self.m_submitCB = submitCB
+
+    def HasTasks(self) -> bool:
+        if self.m_loop.is_closed():
+            return False
+        return len(asyncio.all_tasks(self.m_loop)) > 0
+
+    def Submit(self, coro: Coroutine) -> asyncio.Task:
+        task = self.m_loop.create_task(coro)
+        if self.m_submitCB:
+            self.m_submitCB()
+        return task
+
+    def Step(self) -> None:
+        if self.m_loop.is_closed() or self.m_loop.is_running():
+            return
+        # 実行可能なコールバックを一巡だけ処理して戻る
+        self.m_loop.call_soon(self.m_loop.stop)
+        self.m_loop.run_forever()
+
+    def TimerCB(self) -> float:
+        self.Step()
+        # 残りの task が無ければ timer を止める. 次の Submit() で再登録される
+        if not self.HasTasks():
+            return None
+        return self.m_period
+
+    def Close(self) -> None:
+        if self.m_loop.is_closed():
+            return
+        # キャンセルした task が終わるまで回してから閉じる. 途中で閉じると task が破棄される
+        tasks = asyncio.all_tasks(self.m_loop)
+        for task in tasks:
+            task.cancel()
+        if tasks and not self.m_loop.is_running():
+            self.m_loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.m_loop.close()
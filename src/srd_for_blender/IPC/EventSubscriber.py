@@ -0,0 +1,122 @@
+import threading
+from typing import Callable
+
+import pynng
+
+from .LogCallback import LogCallback
+from .Transport import Transport
+
+
+class EventSubscriber:
+    # Viewer が Pub0 で通知するメッセージを Sub0 で受け取る
+    # 受信したメッセージは Subscribe() した callback に受信用の thread から渡す
+    def __init__(self):
+        self.m_started = False
+        self.m_socket: pynng.Socket = None
+        self.m_dialer: pynng.Dialer = None
+        self.m_transport: Transport = None
+        self.m_thread: threading.Thread = None
+        self.m_mutex = threading.Lock()
+        self.m_log = LogCallback()
+        self.m_topics: list[bytes] = [b""]
+        self.m_callbacks: list[Callable[[bytes], None]] = []
+        self.m_receivedCount = 0
+
+    def __del__(self):
+        self.Stop()
+
+    def SetLogCallback(self, logCB: LogCallback):
+        self.m_log = logCB
+
+    def SetTopics(self, topics: list[bytes]):
+        # 先頭が一致するメッセージだけを受け取る. 既定では全て受け取る. Start() 前に設定すること
+        self.m_topics = list(topics)
+
+    def Subscribe(self, callback: Callable[[bytes], None]) -> None:
+        with self.m_mutex:
+            if callback not in self.m_callbacks:
+                self.m_callbacks.append(callback)
+
+    def Unsubscribe(self, callback: Callable[[bytes], None]) -> None:
+        with self.m_mutex:
+            if callback in self.m_callbacks:
+                self.m_callbacks.remove(callback)
+
+    def GetReceivedCount(self) -> int:
+        return self.m_receivedCount
+
+    def Start(self, url: str) -> bool:
+        self.Stop()
+        self.m_log.Info("Start IPCEventSubscriber")
+        self.m_receivedCount = 0
+
+        try:
+            self.m_transport = Transport(url)
+        except ValueError as e:
+            self.m_log.Error("%s", e)
+            return False
+
+        try:
+            self.m_socket = pynng.Sub0()
+            self.m_transport.Configure(self.m_socket)
+            for topic in self.m_topics:
+                self.m_socket.subscribe(topic)
+        except Exception:
+            self.m_log.Error("Failed nng_sub0_open()")
+            return False
+
+        try:
+            # 相手がいなくても nng がバックグラウンドで接続を続ける
+            self.m_dialer = self.m_socket.dial(url, block=False)
+        except Exception:
+            self.m_log.Error("Failed nng_dialer_create()")
+            self.m_socket.close()
+            return False
+
+        self.m_started = True
+        self.m_thread = threading.Thread(
+            target=self.ThreadMain, name="IPCEventSubscriber", daemon=True
+        )
+        self.m_thread.start()
+
+        self.m_log.Info("Successful IPCEventSubscriber start")
+        return True
+
+    def Stop(self):
+        if self.m_started:
+            self.m_started = False
+            try:
+                if self.m_dialer:
+                    self.m_dialer.close()
+                # ブロック中の recv もここで抜ける
+                self.m_socket.close()
+            except Exception:
+                pass
+            self.m_dialer = None
+
+            if self.m_thread and self.m_thread is not threading.current_thread():
+                self.m_thread.join(1.0)
+            self.m_thread = None
+            self.m_log.Info("Stop IPCEventSubscriber")
+
+    def IsStarted(self) -> bool:
+        return self.m_started
+
+    def ThreadMain(self) -> None:
+        while self.m_started:
+            try:
+                msg = self.m_socket.recv()
+            except Exception:
+                if not self.m_started:
+                    return
+                self.m_log.Error("IPCEventSubscriber Failed recv")
+                continue
+
+            self.m_receivedCount += 1
+            with self.m_mutex:
+                callbacks = list(self.m_callbacks)
+            for callback in callbacks:
+                try:
+                    callback(msg)
+                except Exception as e:
+                    self.m_log.Error("IPCEventSubscriber Exception in callback [%s]", e)
@@ -0,0 +1,185 @@
+import enum
+import threading
+import time
+from typing import Callable
+
+import pynng
+
+from .LogCallback import LogCallback
+from .Transport import Transport
+
+
+class ViewerHealth(enum.IntEnum):
+    Alive = enum.auto()  # ping に応答している
+    Degraded = enum.auto()  # 応答が遅れている
+    Hung = enum.auto()  # プロセスはあるが応答しない
+    Dead = enum.auto()  # 接続が切れた
+
+
+class Heartbeat:
+    # コマンド用とは別の socket で定期的に ping を送り, 応答の有無から ViewerHealth を判定する
+    # Viewer が対応していない場合に誤判定しないよう, 最初の応答があるまでは Alive のままとする
+    PING = b"\x01"
+
+    def __init__(self):
+        self.m_started = False
+        self.m_socket: pynng.Socket = None
+        self.m_dialer: pynng.Dialer = None
+        self.m_transport: Transport = None
+        self.m_thread: threading.Thread = None
+        self.m_stopEvent = threading.Event()
+        self.m_mutex = threading.Lock()
+        self.m_log = LogCallback()
+        self.m_interval = 0.25
+        self.m_degradedThreshold = 1
+        self.m_hungThreshold = 4
+        self.m_health = ViewerHealth.Alive
+        self.m_missCount = 0
+        self.m_hasPong = False
+        self.m_lastRtt = 0.0
+        self.m_subscribers: list[Callable[[ViewerHealth], None]] = []
+
+    def __del__(self):
+        self.Stop()
+
+    def SetLogCallback(self, logCB: LogCallback):
+        self.m_log = logCB
+
+    def SetInterval(self, interval: float):
+        # ping の間隔 [sec]. 応答の期限も同じ値とする. Start() 前に設定すること
+        self.m_interval = max(0.01, interval)
+
+    def SetMissThresholds(self, degraded: int, hung: int):
+        # 連続して応答が無かった回数で Degraded, Hung にする
+        self.m_degradedThreshold = max(1, degraded)
+        self.m_hungThreshold = max(self.m_degradedThreshold, hung)
+
+    def Subscribe(self, callback: Callable[[ViewerHealth], None]) -> None:
+        # callback は heartbeat の thread から呼ばれる
+        with self.m_mutex:
+            if callback not in self.m_subscribers:
+                self.m_subscribers.append(callback)
+
+    def Unsubscribe(self, callback: Callable[[ViewerHealth], None]) -> None:
+        with self.m_mutex:
+            if callback in self.m_subscribers:
+                self.m_subscribers.remove(callback)
+
+    def GetHealth(self) -> ViewerHealth:
+        return self.m_health
+
+    def GetMissCount(self) -> int:
+        return self.m_missCount
+
+    def GetLastRtt(self) -> float:
+        return self.m_lastRtt
+
+    def Start(self, url: str) -> bool:
+        self.Stop()
+        self.m_log.Info("Start IPCHeartbeat")
+        self.m_missCount = 0
+        self.m_hasPong = False
+        self.SetHealth(ViewerHealth.Alive)
+
+        try:
+            self.m_transport = Transport(url)
+        except ValueError as e:
+            self.m_log.Error("%s", e)
+            return False
+
+        timeout = int(self.m_interval * 1000)
+        try:
+            self.m_socket = pynng.Req0(send_timeout=timeout, recv_timeout=timeout)
+            self.m_transport.Configure(self.m_socket)
+            self.m_socket.add_post_pipe_remove_cb(self.OnPipeRemoved)
+        except Exception:
+            self.m_log.Error("Failed nng_req0_open()")
+            return False
+
+        try:
+            # 相手がいなくても nng がバックグラウンドで接続を続ける
+            self.m_dialer = self.m_socket.dial(url, block=False)
+        except Exception:
+            self.m_log.Error("Failed nng_dialer_create()")
+            self.m_socket.close()
+            return False
+
+        self.m_started = True
+        self.m_stopEvent.clear()
+        self.m_thread = threading.Thread(
+            target=self.ThreadMain, name="IPCHeartbeat", daemon=True
+        )
+        self.m_thread.start()
+
+        self.m_log.Info("Successful IPCHeartbeat start")
+        return True
+
+    def Stop(self):
+        if self.m_started:
+            self.m_started = False
+            self.m_stopEvent.set()
+            try:
+                if self.m_dialer:
+                    self.m_dialer.close()
+                self.m_socket.close()
+            except Exception:
+                pass
+            self.m_dialer = None
+
+            if self.m_thread and self.m_thread is not threading.current_thread():
+                self.m_thread.join(1.0)
+            self.m_thread = None
+            self.m_log.Info("Stop IPCHeartbeat")
+
+    def IsStarted(self) -> bool:
+        return self.m_started
+
+    def ThreadMain(self) -> None:
+        while self.m_started:
+            startTime = time.monotonic()
+            try:
+                self.m_socket.send(Heartbeat.PING)
+                self.m_socket.recv()
+                self.OnPong(time.monotonic() - startTime)
+            except Exception:
+                if not self.m_started:
+                    return
+                self.OnMiss()
+
+            wait = self.m_interval - (time.monotonic() - startTime)
+            if self.m_stopEvent.wait(max(0.0, wait)):
+                return
+
+    def OnPong(self, rtt: float) -> None:
+        self.m_lastRtt = rtt
+        self.m_missCount = 0
+        self.m_hasPong = True
+        self.SetHealth(ViewerHealth.Alive)
+
+    def OnMiss(self) -> None:
+        self.m_missCount += 1
+        if not self.m_hasPong or self.m_health == ViewerHealth.Dead:
+            return
+        if self.m_missCount >= self.m_hungThreshold:
+            self.SetHealth(ViewerHealth.Hung)
+        elif self.m_missCount >= self.m_degradedThreshold:
+            self.SetHealth(ViewerHealth.Degraded)
+
+    def OnPipeRemoved(self, pipe: pynng.Pipe) -> None:
+        # 応答していた Viewer が socket を閉じた
+        if self.m_started and self.m_hasPong:
+            self.SetHealth(ViewerHealth.Dead)
+
+    def SetHealth(self, health: ViewerHealth) -> None:
+        with self.m_mutex:
+            if self.m_health == health:
+                return
+            self.m_health = health
+            subscribers = list(self.m_subscribers)
+
+        self.m_log.Info("IPCHeartbeat viewer health: %s", health.name)
+        for callback in subscribers:
+            try:
+                callback(health)
+            except Exception as e:
+                self.m_log.Error("IPCHeartbeat Exception in subscriber [%s]", e)
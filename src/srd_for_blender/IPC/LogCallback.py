@@ -1,27 +1,110 @@
+import enum
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Tuple
+
+
 class LogCallback:
+    # massage は % 形式の書式で, args がある場合だけ出力する時に整形する
+    # 出力先もリングバッファも無いレベルは何もしないので, 呼び出し側で整形しないこと
+    class Level(enum.IntEnum):
+        Error = enum.auto()
+        Warn = enum.auto()
+        Info = enum.auto()
+        Debug = enum.auto()
+        Trace = enum.auto()
+
     def __init__(self):
         self.m_error = None
         self.m_warn = None
         self.m_info = None
         self.m_debug = None
         self.m_trace = None
+        # (time, level, thread name, massage, args) を記録する
+        self.m_records: Deque[Tuple[float, int, str, str, tuple]] = None
+        self.m_recordLevel = LogCallback.Level.Debug
+        self.m_dumpOnError: Callable[[str], None] = None
+        self.m_dumpMutex = threading.Lock()
+
+    def EnableRingBuffer(self, size: int = 4096, level: Level = Level.Debug) -> None:
+        # 出力先が無くても直近 size 件を記録しておき, Dump() で取り出す
+        self.m_recordLevel = level
+        self.m_records = deque(maxlen=max(1, size))
+
+    def DisableRingBuffer(self) -> None:
+        self.m_records = None
+
+    def SetDumpOnError(self, sink: Callable[[str], None]) -> None:
+        # Error を記録した時にリングバッファの内容を sink に出力する
+        self.m_dumpOnError = sink
+
+    def IsEnabled(self, level: Level) -> bool:
+        sink = (self.m_error, self.m_warn, self.m_info, self.m_debug, self.m_trace)[level - 1]
+        return sink is not None or (self.m_records is not None and level <= self.m_recordLevel)
+
+    def Record(self, level: Level, massage: str, args: tuple) -> None:
+        if level <= self.m_recordLevel:
+            self.m_records.append(
+                (time.time(), level, threading.current_thread().name, massage, args)
+            )
+
+    @staticmethod
+    def Format(massage: str, args: tuple) -> str:
+        if not args:
+            return massage
+        try:
+            return massage % args
+        except Exception:
+            return f"{massage} {args}"
+
+    def Dump(self, sink: Callable[[str], None] = None) -> list[str]:
+        # 記録した内容を古い順に整形して返す. sink を指定した場合は 1 行ずつ渡す
+        records = self.m_records
+        if records is None:
+            return []
+        lines = []
+        for recordTime, level, threadName, massage, args in list(records):
+            timestamp = time.strftime("%H:%M:%S", time.localtime(recordTime))
+            line = (
+                f"{timestamp}.{int(recordTime % 1 * 1000):03d} "
+                f"[{LogCallback.Level(level).name}] [{threadName}] "
+                f"{LogCallback.Format(massage, args)}"
+            )
+            lines.append(line)
+            if sink:
+                sink(line)
+        return lines
 
-    def Error(self, massage: str) -> None:
+    def Error(self, massage: str, *args) -> None:
         if self.m_error:
-            self.m_error(massage)
+            self.m_error(LogCallback.Format(massage, args))
+        if self.m_records is not None:
+            self.Record(LogCallback.Level.Error, massage, args)
+            if self.m_dumpOnError:
+                with self.m_dumpMutex:
+                    self.Dump(self.m_dumpOnError)
 
-    def Warn(self, massage: str) -> None:
+    def Warn(self, massage: str, *args) -> None:
         if self.m_warn:
-            self.m_warn(massage)
+            self.m_warn(LogCallback.Format(massage, args))
+        if self.m_records is not None:
+            self.Record(LogCallback.Level.Warn, massage, args)
 
-    def Info(self, massage: str) -> None:
+    def Info(self, massage: str, *args) -> None:
         if self.m_info:
-            self.m_info(massage)
+            self.m_info(LogCallback.Format(massage, args))
+        if self.m_records is not None:
+            self.Record(LogCallback.Level.Info, massage, args)
 
-    def Debug(self, massage: str) -> None:
+    def Debug(self, massage: str, *args) -> None:
         if self.m_debug:
-            self.m_debug(massage)
+            self.m_debug(LogCallback.Format(massage, args))
+        if self.m_records is not None:
+            self.Record(LogCallback.Level.Debug, massage, args)
 
-    def Trace(self, massage: str) -> None:
+    def Trace(self, massage: str, *args) -> None:
         if self.m_trace:
-            self.m_trace(massage)
+            self.m_trace(LogCallback.Format(massage, args))
+        if self.m_records is not None:
+            self.Record(LogCallback.Level.Trace, massage, args)
@@ -0,0 +1,154 @@
+import threading
+
+
+class LatencyHistogram:
+    # HDR Histogram と同様に 2 の冪ごとの区間を線形に分割して記録する (単位 usec)
+    # 各区間を 2^subBucketBits に分けるので相対誤差は 1 / 2^subBucketBits 以内
+    def __init__(self, subBucketBits: int = 4, maxShift: int = 24):
+        self.m_subBucketBits = subBucketBits
+        self.m_subBucketCount = 1 << subBucketBits
+        self.m_maxShift = maxShift
+        self.m_buckets = [0] * (self.m_subBucketCount * (maxShift + 2))
+        self.m_count = 0
+        self.m_max = 0
+
+    def GetIndex(self, value: int) -> int:
+        if value < self.m_subBucketCount:
+            return value
+        shift = min(value.bit_length() - 1 - self.m_subBucketBits, self.m_maxShift)
+        mantissa = min(value >> shift, 2 * self.m_subBucketCount - 1)
+        return self.m_subBucketCount * (shift + 1) + (mantissa - self.m_subBucketCount)
+
+    def GetUpperValue(self, index: int) -> int:
+        if index < self.m_subBucketCount:
+            return index
+        shift = index // self.m_subBucketCount - 1
+        mantissa = self.m_subBucketCount + index % self.m_subBucketCount
+        return ((mantissa + 1) << shift) - 1
+
+    def Record(self, value: int) -> None:
+        value = max(0, int(value))
+        self.m_buckets[self.GetIndex(value)] += 1
+        self.m_count += 1
+        if value > self.m_max:
+            self.m_max = value
+
+    def GetCount(self) -> int:
+        return self.m_count
+
+    def GetMax(self) -> int:
+        return self.m_max
+
+    def GetPercentile(self, percentile: float) -> int:
+        if self.m_count == 0:
+            return 0
+        target = max(1, int(self.m_count * percentile / 100.0 + 0.5))
+        total = 0
+        for index, count in enumerate(self.m_buckets):
+            total += count
+            if total >= target:
+                return min(self.GetUpperValue(index), self.m_max)
+        return self.m_max
+
+    def Reset(self) -> None:
+        self.m_buckets = [0] * len(self.m_buckets)
+        self.m_count = 0
+        self.m_max = 0
+
+
+class CommandMetrics:
+    def __init__(self):
+        self.m_sendCount = 0
+        self.m_bytesOut = 0
+        self.m_bytesIn = 0
+        self.m_inFlight = 0
+        self.m_timeouts = 0
+        self.m_errors = 0
+        self.m_cancelled = 0
+        self.m_latency = LatencyHistogram()
+
+    def Snapshot(self) -> dict:
+        return {
+            "send_count": self.m_sendCount,
+            "bytes_out": self.m_bytesOut,
+            "bytes_in": self.m_bytesIn,
+            "in_flight": self.m_inFlight,
+            "timeouts": self.m_timeouts,
+            "errors": self.m_errors,
+            "cancelled": self.m_cancelled,
+            "latency_count": self.m_latency.GetCount(),
+            "latency_p50_us": self.m_latency.GetPercentile(50),
+            "latency_p95_us": self.m_latency.GetPercentile(95),
+            "latency_p99_us": self.m_latency.GetPercentile(99),
+            "latency_max_us": self.m_latency.GetMax(),
+        }
+
+
+class Metrics:
+    # tag (ViewerCommand.Id など) ごとの送受信の統計
+    # 無効時は呼び出し側で IsEnabled() を確認して記録処理自体を省く
+    def __init__(self):
+        self.m_enabled = False
+        self.m_mutex = threading.Lock()
+        self.m_commands: dict[int, CommandMetrics] = {}
+
+    def SetEnabled(self, enable: bool) -> None:
+        self.m_enabled = enable
+
+    def IsEnabled(self) -> bool:
+        return self.m_enabled
+
+    def GetCommandMetrics(self, tag: int) -> CommandMetrics:
+        metrics = self.m_commands.get(tag)
+        if metrics is None:
+            metrics = CommandMetrics()
+            self.m_commands[tag] = metrics
+        return metrics
+
+    def OnSend(self, tag: int, size: int) -> None:
+        with self.m_mutex:
+            metrics = self.GetCommandMetrics(tag)
+            metrics.m_sendCount += 1
+            metrics.m_bytesOut += size
+            metrics.m_inFlight += 1
+
+    def OnComplete(self, tag: int, success: bool, timeout: bool, size: int, rtt: float) -> None:
+        with self.m_mutex:
+            metrics = self.GetCommandMetrics(tag)
+            metrics.m_inFlight = max(0, metrics.m_inFlight - 1)
+            metrics.m_bytesIn += size
+            if success:
+                metrics.m_latency.Record(rtt * 1000000)
+            elif timeout:
+                metrics.m_timeouts += 1
+            else:
+                metrics.m_errors += 1
+
+    def OnStreamSend(self, tag: int, size: int, success: bool) -> None:
+        # 応答の無い stream チャネルの送信. 応答待ちや遅延は記録しない
+        with self.m_mutex:
+            metrics = self.GetCommandMetrics(tag)
+            if success:
+                metrics.m_sendCount += 1
+                metrics.m_bytesOut += size
+            else:
+                metrics.m_errors += 1
+
+    def OnCancel(self, tag: int) -> None:
+        # 送信後に応答を待たずに打ち切ったもの. 遅延, エラーには含めない
+        with self.m_mutex:
+            metrics = self.GetCommandMetrics(tag)
+            metrics.m_inFlight = max(0, metrics.m_inFlight - 1)
+            metrics.m_cancelled += 1
+
+    def Snapshot(self) -> dict[int, dict]:
+        with self.m_mutex:
+            return {tag: metrics.Snapshot() for tag, metrics in self.m_commands.items()}
+
+    def Reset(self) -> None:
+        with self.m_mutex:
+            for metrics in self.m_commands.values():
+                inFlight = metrics.m_inFlight
+                metrics.__init__()
+                # 応答待ちのものは完了時に減算されるので残しておく
+                metrics.m_inFlight = inFlight
@@ -0,0 +1,64 @@
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Tuple
+
+from .LogCallback import LogCallback
+
+
+class ReplyDispatcher:
+    # worker thread からの応答の通知を受け取り, Blender のメインスレッドでまとめて処理する
+    # Post() はどの thread からも呼べる. Dispatch() / TimerCB() は 1 つの thread から呼ぶこと
+    def __init__(self):
+        self.m_inbox: Deque[Tuple[Callable[..., None], tuple]] = deque([])
+        self.m_log = LogCallback()
+        self.m_budget = 0.005
+        self.m_period = 0.02
+        self.m_dispatchedCount = 0
+
+    def SetLogCallback(self, logCB: LogCallback):
+        self.m_log = logCB
+
+    def SetBudget(self, budget: float) -> None:
+        # 1 回の Dispatch() で処理に使う時間の上限 [sec]. 最低 1 件は処理する
+        self.m_budget = budget
+
+    def SetPeriod(self, period: float) -> None:
+        # 処理待ちが無い時の TimerCB() の間隔 [sec]
+        self.m_period = period
+
+    def Post(self, callback: Callable[..., None], *args: Any) -> None:
+        self.m_inbox.append((callback, args))
+
+    def GetPendingCount(self) -> int:
+        return len(self.m_inbox)
+
+    def GetDispatchedCount(self) -> int:
+        return self.m_dispatchedCount
+
+    def Dispatch(self, budget: float = None) -> int:
+        # 処理した件数を返す
+        if budget is None:
+            budget = self.m_budget
+        deadline = time.perf_counter() + budget
+        count = 0
+        while len(self.m_inbox) != 0:
+            callback, args = self.m_inbox.popleft()
+            try:
+                callback(*args)
+            except Exception as e:
+                self.m_log.Error("IPCReplyDispatcher Exception in callback [%s]", e)
+            count += 1
+            if time.perf_counter() >= deadline:
+                break
+        self.m_dispatchedCount += count
+        return count
+
+    def TimerCB(self) -> float:
+        self.Dispatch()
+        # 処理しきれなかった分は次の tick ですぐに処理する
+        if len(self.m_inbox) != 0:
+            return 0.001
+        return self.m_period
+
+    def Clear(self) -> None:
+        self.m_inbox.clear()
@@ -0,0 +1,97 @@
+import threading
+
+import pynng
+
+from .LogCallback import LogCallback
+from .Transport import Transport
+
+
+class StreamClient:
+    # 応答を待たない一方向の送信チャネル (Push0)
+    # 最新値だけが意味を持つ高頻度の更新に使用し, 送れない場合は捨てる
+    def __init__(self):
+        self.m_started = False
+        self.m_socket: pynng.Socket = None
+        self.m_dialer: pynng.Dialer = None
+        self.m_transport: Transport = None
+        self.m_mutex = threading.Lock()
+        self.m_log = LogCallback()
+        self.m_sendBufferSize = 64
+        self.m_sentCount = 0
+        self.m_droppedCount = 0
+
+    def __del__(self):
+        self.Stop()
+
+    def SetLogCallback(self, logCB: LogCallback):
+        self.m_log = logCB
+
+    def SetSendBufferSize(self, size: int):
+        self.m_sendBufferSize = size
+
+    def Start(self, url: str) -> bool:
+        self.Stop()
+        self.m_log.Info("Start IPCStreamClient")
+        self.m_sentCount = 0
+        self.m_droppedCount = 0
+
+        try:
+            self.m_transport = Transport(url)
+        except ValueError as e:
+            self.m_log.Error("%s", e)
+            return False
+
+        try:
+            self.m_socket = pynng.Push0(send_buffer_size=self.m_sendBufferSize)
+            self.m_transport.Configure(self.m_socket)
+        except Exception:
+            self.m_log.Error("Failed nng_push0_open()")
+            return False
+
+        try:
+            # 相手がいなくても nng がバックグラウンドで接続を続ける
+            self.m_dialer = self.m_socket.dial(url, block=False)
+        except Exception:
+            self.m_log.Error("Failed nng_dialer_create()")
+            self.m_socket.close()
+            return False
+
+        self.m_started = True
+        self.m_log.Info("Successful IPCStreamClient start")
+        return True
+
+    def Stop(self):
+        if self.m_started:
+            self.m_started = False
+            try:
+                if self.m_dialer:
+                    self.m_dialer.close()
+                self.m_socket.close()
+            except Exception:
+                pass
+            self.m_dialer = None
+            self.m_log.Info("Stop IPCStreamClient")
+
+    def IsStarted(self) -> bool:
+        return self.m_started
+
+    def Send(self, message: bytes) -> bool:
+        # ブロックしない. 送信バッファが一杯の場合は False
+        if not self.m_started:
+            return False
+
+        with self.m_mutex:
+            try:
+                self.m_socket.send(message, block=False)
+            except Exception:
+                self.m_droppedCount += 1
+                self.m_log.Trace("IPCStreamClient drop message")
+                return False
+            self.m_sentCount += 1
+        return True
+
+    def GetSentCount(self) -> int:
+        return self.m_sentCount
+
+    def GetDroppedCount(self) -> int:
+        return self.m_droppedCount
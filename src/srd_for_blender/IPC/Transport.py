@@ -0,0 +1,69 @@
+import enum
+
+import pynng
+
+
+class Transport:
+    class Scheme(enum.IntEnum):
+        Ipc = enum.auto()
+        Tcp = enum.auto()
+        Inproc = enum.auto()
+
+    SCHEMES = {
+        "ipc": Scheme.Ipc,
+        "tcp": Scheme.Tcp,
+        "inproc": Scheme.Inproc,
+    }
+
+    def __init__(self, url: str):
+        # 未対応の scheme の場合は ValueError
+        scheme, sep, address = url.partition("://")
+        if not sep or not address or scheme.lower() not in Transport.SCHEMES:
+            raise ValueError(f"Unsupported transport url: {url}")
+
+        self.m_url = url
+        self.m_scheme = Transport.SCHEMES[scheme.lower()]
+        self.m_address = address
+        self.m_tcpNoDelay = True
+        self.m_tcpKeepAlive = True
+
+    @staticmethod
+    def IsSupported(url: str) -> bool:
+        try:
+            Transport(url)
+        except ValueError:
+            return False
+        return True
+
+    def GetUrl(self) -> str:
+        return self.m_url
+
+    def GetScheme(self) -> Scheme:
+        return self.m_scheme
+
+    def GetAddress(self) -> str:
+        return self.m_address
+
+    def GetChannelUrl(self, name: str, portOffset: int) -> str:
+        # 同じ接続先に付随する別チャネルの url
+        # ipc/inproc は名前に接尾辞を付け, tcp はポート番号をずらす
+        scheme = self.m_url.partition("://")[0]
+        if self.m_scheme == Transport.Scheme.Tcp:
+            host, sep, port = self.m_address.rpartition(":")
+            if sep and port.isdigit():
+                return f"{scheme}://{host}:{int(port) + portOffset}"
+        return f"{self.m_url}_{name}"
+
+    def SetTcpNoDelay(self, enable: bool) -> None:
+        self.m_tcpNoDelay = enable
+
+    def SetTcpKeepAlive(self, enable: bool) -> None:
+        self.m_tcpKeepAlive = enable
+
+    def Configure(self, socket: pynng.Socket) -> None:
+        # dial 前に呼ぶこと
+        if self.m_scheme == Transport.Scheme.Tcp:
+            # 小さいコマンドを Nagle で待たせない
+            socket.tcp_nodelay = self.m_tcpNoDelay
+            # 相手ノードの消失を OS の keepalive で検出する
+            socket.tcp_keepalive = self.m_tcpKeepAlive
@@ -1,2 +1,11 @@
 from .Client import *
 from .LogCallback import *
+from .Metrics import *
+from .StreamClient import *
+from .Transport import *
+from .EventLoop import *
+from .CircuitBreaker import *
+from .CongestionControl import *
+from .Heartbeat import *
+from .EventSubscriber import *
+from .ReplyDispatcher import *
@@ -0,0 +1,44 @@
+import itertools
+from typing import Hashable, Iterator
+
+import Viewer
+
+
+class CoalescingQueue:
+    # 送信前のコマンドを (ViewerCommand.Id, 対象の名前) をキーに最新の値だけ残す
+    # 置き換えても順番は最初に追加した位置のままにし, キーの無いコマンドは追加順に送る
+    def __init__(self):
+        self.m_commands: dict[Hashable, Viewer.ViewerCommand] = {}
+        self.m_sequence = itertools.count()
+        self.m_savedCount = 0
+
+    def Put(self, key: Hashable, cmd: Viewer.ViewerCommand) -> bool:
+        # 未送信のコマンドを置き換えた場合は True を返す
+        if key is None:
+            # 置き換え対象にならないように一意なキーを割り当てる
+            key = next(self.m_sequence)
+        elif key in self.m_commands:
+            self.m_commands[key] = cmd
+            self.m_savedCount += 1
+            return True
+        self.m_commands[key] = cmd
+        return False
+
+    def Drain(self) -> Iterator[Viewer.ViewerCommand]:
+        # 取り出したコマンドは queue から取り除く
+        commands = self.m_commands
+        self.m_commands = {}
+        return iter(commands.values())
+
+    def Clear(self) -> None:
+        self.m_commands.clear()
+
+    def GetCount(self) -> int:
+        return len(self.m_commands)
+
+    def GetSavedCount(self) -> int:
+        # 置き換えにより送らずに済んだメッセージの数
+        return self.m_savedCount
+
+    def ResetSavedCount(self) -> None:
+        self.m_savedCount = 0
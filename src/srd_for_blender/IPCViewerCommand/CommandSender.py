@@ -1,5 +1,10 @@
-from typing import Callable
+import contextlib
+import itertools
+import threading
+import time
+from typing import Callable, Hashable, Tuple, Union
 
+import fbs.IPCViewerCommand.fbs.CommandBatch as FbsCommandBatch
 import fbs.IPCViewerCommand.fbs.IPCMessage as FbsIPCMessage
 import fbs.IPCViewerCommand.fbs.MessageData as FbsMessageData
 import fbs.IPCViewerCommand.fbs.ViewerCommand as FbsViewerCommand
@@ -7,8 +12,14 @@ import flatbuffers
 import IPC
 import Viewer
 
+from .CoalescingQueue import CoalescingQueue
+from .FrameCache import FrameCache
+from .MessageCompressor import MessageCompressor
+
 
 class CommandSender:
+    LOG_RECORD_SIZE = 4096
+
     def __init__(self, url: str):
         self.m_url = url
 
@@ -18,46 +29,844 @@ class CommandSender:
         # logCB.m_info = print
         # logCB.m_debug = print
         # logCB.m_trace = print
+        # 出力先が無くても直近の IPC の動作を DumpLog() で確認できるようにしておく
+        # 送受信ごとの Trace は記録の負荷が大きいので, 調査時だけ SetLogRecordLevel() で上げる
+        logCB.EnableRingBuffer(CommandSender.LOG_RECORD_SIZE, IPC.LogCallback.Level.Info)
+        self.m_log = logCB
+
+        # 全てのコマンドの通し番号と, 対象 (GetStateKey()) ごとの版
+        self.m_sequence = itertools.count(1)
+        self.m_versions: dict[Hashable, int] = {}
+
+        # エンコード用の builder は Clear() して使い回す
+        # Hello や再送用のメッセージは IPC.Client の thread でも作るので排他する
+        self.m_builder = flatbuffers.Builder(CommandSender.BUILDER_SIZE)
+        self.m_builderMutex = threading.Lock()
+        # 内容が決まっているコマンドはエンコード済みの IPCMessage を書き換えて使う
+        self.m_frameCache = FrameCache()
 
         self.m_client = IPC.Client()
         self.m_client.SetLogCallback(logCB)
         self.m_client.SetSendTimeout(300)
         self.m_client.SetReceiveTimeout(300)
+        # Blender のメインスレッドを止めないように State, Stream の溢れた分は古いものから捨てる
+        # Control のコマンドは捨てずに送信に失敗させる (SendCommand() が None を返す)
+        self.m_client.SetMaxPendingRequests(256)
+        self.m_client.SetBackpressurePolicy(IPC.Client.Backpressure.DropOldest)
+        self.m_client.SetBackpressurePolicy(
+            IPC.Client.Backpressure.FailFast, IPC.Client.Lane.Control
+        )
+        # 300 msec は RTT の計測値が得られるまでの期限として使用する
+        self.m_client.EnableCongestionControl(True)
+        # Viewer が応答しなくなった後は GetViewerState で復帰を確認する
+        self.m_client.SetProbeMessage(
+            self.Encode(Viewer.GetViewerStateCommand(Viewer.Viewer())),
+            int(Viewer.ViewerCommand.Id.GetViewerState),
+        )
+
+        # 以下の Viewer 側の対応が必要な機能は, 接続ごとに Hello で Viewer が対応していると
+        # 確認できたものだけを使用する. Enable*() で無効にした機能は使用しない
+
+        # 高頻度の更新を応答待ち無しで送るチャネル
+        self.m_streamClient = IPC.StreamClient()
+        self.m_streamClient.SetLogCallback(logCB)
+        self.m_streamEnabled = True
+
+        # Viewer の死活監視用のチャネル
+        self.m_heartbeat = IPC.Heartbeat()
+        self.m_heartbeat.SetLogCallback(logCB)
+        self.m_heartbeatEnabled = True
+
+        # Viewer の状態の変化の通知を受け取るチャネル
+        self.m_eventSubscriber = IPC.EventSubscriber()
+        self.m_eventSubscriber.SetLogCallback(logCB)
+        self.m_eventSubscriber.Subscribe(self.OnEventMessage)
+        self.m_eventsEnabled = True
+        self.m_viewerEvent: Viewer.ViewerStateChangedEvent = None
+        self.m_viewerEventCount = 0
+        self.m_viewerEventCond = threading.Condition()
+        self.m_viewerStateCallbacks: list[Callable[[Viewer.ViewerStateChangedEvent], None]] = []
+
+        # BeginBatch() から Commit() までのコマンドをひとつの IPCMessage で送る
+        # 使用できない場合はそのまま個別に送る
+        self.m_batchEnabled = True
+        self.m_batchDepth = 0
+        self.m_batch: list[tuple[int, bytes]] = []
+        self.m_batchReplyCBs: list[Callable[[IPC.Client.ReplyCBType, int, bytes], None]] = []
+        self.m_batchRequest: IPC.Client.Request = None
+
+        # Post() したコマンドは Flush() まで最新の値だけを保持する
+        self.m_queue = CoalescingQueue()
+
+        # 閾値以上の大きなメッセージだけを送信直前に圧縮する. Transform などはそのまま送る
+        self.m_compressor = MessageCompressor()
+        self.m_compressionEnabled = True
+        self.m_client.SetMessageEncoder(self.m_compressor.Compress)
+
+        # 接続中の Viewer のプロトコルのバージョンと対応している機能. 確認できるまでは機能無し
+        self.m_protocolVersion = 0
+        self.m_features = Viewer.HelloCommand.Feature.NONE
+        self.m_handshakeEvent = threading.Event()
+        # 接続, 切断ごとに進める. 以前の接続への Hello の応答は反映しない
+        self.m_connectionGeneration = 0
+        # 確認した機能に合わせたチャネルの開始, 停止が未反映の場合 True
+        self.m_channelsPending = False
+        self.m_client.SetConnectionCallback(self.OnConnectionChanged)
 
     def __del__(self):
         pass
 
+    def SetUrl(self, url: str) -> None:
+        # 次回の Start() から有効
+        self.m_url = url
+
+    def GetUrl(self) -> str:
+        return self.m_url
+
+    # MessageCompressor の方式と Hello で伝える機能の対応
+    COMPRESSION_FEATURES = {
+        MessageCompressor.Compression.Zlib: Viewer.HelloCommand.Feature.CompressZlib,
+        MessageCompressor.Compression.Zstd: Viewer.HelloCommand.Feature.CompressZstd,
+        MessageCompressor.Compression.Lz4: Viewer.HelloCommand.Feature.CompressLz4,
+    }
+
+    @staticmethod
+    def GetCompressionFeatures() -> Viewer.HelloCommand.Feature:
+        # 使用できる圧縮方式に対応する機能
+        features = Viewer.HelloCommand.Feature.NONE
+        for compression in MessageCompressor.GetSupportedCompressions():
+            features |= CommandSender.COMPRESSION_FEATURES[compression]
+        return features
+
+    @staticmethod
+    def GetCompressions(features: Viewer.HelloCommand.Feature) -> list[int]:
+        # 機能に含まれる圧縮方式
+        return [
+            compression
+            for compression, feature in CommandSender.COMPRESSION_FEATURES.items()
+            if features & feature
+        ]
+
+    # Viewer との接続で使用できる機能. Hello で送って Viewer の応答と合わせる
+    FEATURES = (
+        Viewer.HelloCommand.Feature.Batch
+        | Viewer.HelloCommand.Feature.Stream
+        | Viewer.HelloCommand.Feature.Heartbeat
+        | Viewer.HelloCommand.Feature.Events
+    )
+
+    @staticmethod
+    def GetLocalFeatures() -> Viewer.HelloCommand.Feature:
+        # Hello で送る機能. 圧縮方式はモジュールがあるものだけ
+        return CommandSender.FEATURES | CommandSender.GetCompressionFeatures()
+
+    def EnableStream(self, enable: bool) -> None:
+        # 次回の接続から有効
+        self.m_streamEnabled = enable
+
+    def IsStreamEnabled(self) -> bool:
+        # Viewer が対応していない場合は False
+        return self.m_streamEnabled and self.HasFeature(Viewer.HelloCommand.Feature.Stream)
+
+    def EnableHeartbeat(self, enable: bool) -> None:
+        # 次回の接続から有効
+        self.m_heartbeatEnabled = enable
+
+    def IsHeartbeatEnabled(self) -> bool:
+        return self.m_heartbeatEnabled and self.HasFeature(Viewer.HelloCommand.Feature.Heartbeat)
+
+    def GetHeartbeat(self) -> IPC.Heartbeat:
+        # Subscribe() は Start() の前後どちらでもよい
+        return self.m_heartbeat
+
+    def GetViewerHealth(self) -> IPC.ViewerHealth:
+        # heartbeat が無効の場合は常に Alive
+        return self.m_heartbeat.GetHealth()
+
+    def EnableEvents(self, enable: bool) -> None:
+        # 次回の接続から有効
+        self.m_eventsEnabled = enable
+
+    def IsEventsEnabled(self) -> bool:
+        # 通知のチャネルを開始するまでは False
+        return (
+            self.m_eventsEnabled
+            and self.HasFeature(Viewer.HelloCommand.Feature.Events)
+            and self.m_eventSubscriber.IsStarted()
+        )
+
+    def EnableBatch(self, enable: bool) -> None:
+        self.m_batchEnabled = enable
+
+    def IsBatchEnabled(self) -> bool:
+        return self.m_batchEnabled and self.HasFeature(Viewer.HelloCommand.Feature.Batch)
+
+    def EnableCompression(self, enable: bool) -> None:
+        # 次回の接続から有効
+        self.m_compressionEnabled = enable
+
+    def GetCompressor(self) -> MessageCompressor:
+        # 閾値は GetCompressor().SetThreshold() で変更する
+        return self.m_compressor
+
+    def GetProtocolVersion(self) -> int:
+        # Hello に対応していない Viewer や未確認の場合は 0
+        return self.m_protocolVersion
+
+    def GetFeatures(self) -> Viewer.HelloCommand.Feature:
+        return self.m_features
+
+    def HasFeature(self, feature: Viewer.HelloCommand.Feature) -> bool:
+        return (self.m_features & feature) == feature
+
+    def WaitForHandshake(self, timeout: float) -> bool:
+        # 接続後に Viewer の機能を確認するまで待つ. timeout [sec] までに確認できない場合は False
+        return self.m_handshakeEvent.wait(timeout)
+
+    def IsBatching(self) -> bool:
+        return self.m_batchRequest is not None
+
     def Start(self):
+        # 追加のチャネルは接続後に Viewer の機能を確認してから開始する
+        self.m_connectionGeneration += 1
+        self.SetFeatures(0, Viewer.HelloCommand.Feature.NONE)
         self.m_client.Start(self.m_url)
 
     def Stop(self):
+        # 先に接続を止めて, 以降に Hello の応答でチャネルが開始されないようにする
         self.m_client.Stop()
+        self.m_connectionGeneration += 1
+        self.m_queue.Clear()
+        self.m_eventSubscriber.Stop()
+        with self.m_viewerEventCond:
+            self.m_viewerEvent = None
+            self.m_viewerEventCond.notify_all()
+        self.m_heartbeat.Stop()
+        self.m_streamClient.Stop()
+        self.m_channelsPending = False
+        self.SetFeatures(0, Viewer.HelloCommand.Feature.NONE)
 
     def IsStarted(self) -> bool:
         return self.m_client.IsStarted()
 
+    def IsConnected(self) -> bool:
+        return self.m_client.IsConnected()
+
+    def OnConnectionChanged(self, state: IPC.Client.ConnectionState) -> None:
+        # IPC.Client の接続用の thread から呼ばれる
+        if state == IPC.Client.ConnectionState.Connected:
+            self.m_connectionGeneration += 1
+            self.SendHello(self.m_connectionGeneration)
+        elif state == IPC.Client.ConnectionState.Disconnected:
+            self.m_connectionGeneration += 1
+            # 再接続先は別の Viewer かもしれないので確認し直すまでは機能無しとして扱う
+            # チャネルは確認し直した時に開始, 停止する
+            self.m_handshakeEvent.clear()
+            self.m_protocolVersion = 0
+            self.m_features = Viewer.HelloCommand.Feature.NONE
+            self.m_compressor.SetCompression(MessageCompressor.Compression.NONE)
+
+    def SendHello(self, generation: int) -> IPC.Client.Request:
+        hello = Viewer.HelloCommand(Viewer.Viewer())
+        hello.SetFeatures(CommandSender.GetLocalFeatures())
+        request = self.m_client.Send(
+            self.Encode(hello),
+            tag=int(hello.GetId()),
+            lane=IPC.Client.Lane.Control,
+        )
+        if request is None:
+            self.OnHelloReply(generation, Viewer.HelloReply())
+            return None
+
+        request.add_done_callback(lambda request: self.OnHelloDone(request, generation))
+        return request
+
+    def OnHelloDone(self, request: IPC.Client.Request, generation: int) -> None:
+        # 失敗した場合や Hello に対応していない Viewer の場合は機能無しとして扱う
+        reply = Viewer.HelloReply()
+        try:
+            result = request.result()
+            if (
+                not result.IsSuccess()
+                or not reply.Deserialize(result.GetMessage())
+                or reply.GetExitCode() != 0
+            ):
+                reply = Viewer.HelloReply()
+        except Exception:
+            reply = Viewer.HelloReply()
+        self.OnHelloReply(generation, reply)
+
+    def OnHelloReply(self, generation: int, reply: Viewer.HelloReply) -> None:
+        # 応答を受けた thread から呼ばれる. 停止後や再接続前の接続への応答は無視する
+        if not self.IsStarted() or generation != self.m_connectionGeneration:
+            self.m_log.Info("CommandSender ignore stale hello reply")
+            return
+
+        # 以降の送信に関わる機能はここで反映し, チャネルの開始, 停止はメインスレッドで行う
+        features = reply.GetFeatures() & CommandSender.GetLocalFeatures()
+        self.SetFeatures(reply.GetProtocolVersion(), features)
+        self.m_channelsPending = True
+        dispatcher = self.m_client.GetReplyDispatcher()
+        if dispatcher:
+            dispatcher.Post(self.UpdateChannels)
+
+    def UpdateChannels(self) -> None:
+        # メインスレッドから呼ぶ. dispatcher が無い場合は次の Flush() で反映する
+        if not self.m_channelsPending:
+            return
+        self.m_channelsPending = False
+
+        transport = self.m_client.GetTransport()
+        if not self.IsStarted() or not transport:
+            return
+        CommandSender.UpdateChannel(
+            self.m_streamClient,
+            self.m_streamEnabled and self.HasFeature(Viewer.HelloCommand.Feature.Stream),
+            transport.GetChannelUrl("stream", 1),
+        )
+        CommandSender.UpdateChannel(
+            self.m_eventSubscriber,
+            self.m_eventsEnabled and self.HasFeature(Viewer.HelloCommand.Feature.Events),
+            transport.GetChannelUrl("events", 3),
+        )
+        CommandSender.UpdateChannel(
+            self.m_heartbeat,
+            self.m_heartbeatEnabled and self.HasFeature(Viewer.HelloCommand.Feature.Heartbeat),
+            transport.GetChannelUrl("heartbeat", 2),
+        )
+
+    def SetFeatures(self, version: int, features: Viewer.HelloCommand.Feature) -> None:
+        self.m_protocolVersion = version
+        self.m_features = features
+        self.m_log.Info("CommandSender viewer protocol: %d, features: %r", version, features)
+
+        compression = MessageCompressor.Compression.NONE
+        if self.m_compressionEnabled:
+            compressions = CommandSender.GetCompressions(features)
+            compression = self.m_compressor.SelectCompression(compressions)
+        self.m_compressor.SetCompression(compression)
+
+        if self.IsStarted():
+            self.m_handshakeEvent.set()
+        else:
+            self.m_handshakeEvent.clear()
+
+    @staticmethod
+    def UpdateChannel(channel, enable: bool, url: str) -> None:
+        if enable and not channel.IsStarted():
+            channel.Start(url)
+        elif not enable and channel.IsStarted():
+            channel.Stop()
+
+    def SetReplyDispatcher(self, dispatcher: IPC.ReplyDispatcher) -> None:
+        # replyCB や通知の callback を dispatcher 経由でメインスレッドから呼ぶ
+        dispatcher.SetLogCallback(self.m_log)
+        self.m_client.SetReplyDispatcher(dispatcher)
+
+    def GetReplyDispatcher(self) -> IPC.ReplyDispatcher:
+        return self.m_client.GetReplyDispatcher()
+
+    def DumpLog(self, sink: Callable[[str], None] = print) -> list[str]:
+        return self.m_log.Dump(sink)
+
+    def SetLogRecordLevel(self, level: IPC.LogCallback.Level) -> None:
+        # DumpLog() 用に記録するログのレベル. 記録済みのものは破棄する
+        self.m_log.EnableRingBuffer(CommandSender.LOG_RECORD_SIZE, level)
+
+    def GetCircuitState(self) -> IPC.CircuitBreaker.State:
+        return self.m_client.GetCircuitState()
+
+    def GetFlushPeriod(self) -> float:
+        # Post() したコマンドを送る間隔 [sec]. 応答が遅くなると伸ばす
+        return self.m_client.GetCongestionControl().GetFlushPeriod()
+
+    def GetMetrics(self) -> IPC.Metrics:
+        return self.m_client.GetMetrics()
+
+    # CommandBatch の Metrics の集計単位. ViewerCommand.Id とは重ならない
+    BATCH_TAG = 0
+    BATCH_KEY = ("CommandBatch",)
+
+    def GetMetricsSnapshot(self) -> dict[str, dict]:
+        # ViewerCommand.Id の名前をキーにした統計
+        result = {}
+        for tag, snapshot in self.m_client.GetMetrics().Snapshot().items():
+            try:
+                name = Viewer.ViewerCommand.Id(tag).name
+            except ValueError:
+                name = "CommandBatch" if tag == CommandSender.BATCH_TAG else str(tag)
+            result[name] = snapshot
+        return result
+
+    @staticmethod
+    def GetStateKey(cmd: Viewer.ViewerCommand):
+        # 最新の値だけが意味を持つコマンドのキー. それ以外は None
+        id = cmd.GetId()
+        if id == Viewer.ViewerCommand.Id.SetObjectTransform:
+            return (id, cmd.GetTransformName())
+        if id in (
+            Viewer.ViewerCommand.Id.SetClipping,
+            Viewer.ViewerCommand.Id.SetCameraAimLength,
+            Viewer.ViewerCommand.Id.SetAnimationFrame,
+        ):
+            return (id, "")
+        return None
+
+    STREAM_COMMAND_IDS = (
+        Viewer.ViewerCommand.Id.SetObjectTransform,
+        Viewer.ViewerCommand.Id.SetAnimationFrame,
+        Viewer.ViewerCommand.Id.SetCameraAimLength,
+    )
+
+    STATE_COMMAND_IDS = (Viewer.ViewerCommand.Id.SetClipping,)
+
+    @staticmethod
+    def GetLane(id: Viewer.ViewerCommand.Id) -> IPC.Client.Lane:
+        # シーンの切り替えや終了は溜まっている更新より先に送る
+        if id in CommandSender.STREAM_COMMAND_IDS:
+            return IPC.Client.Lane.Stream
+        if id in CommandSender.STATE_COMMAND_IDS:
+            return IPC.Client.Lane.State
+        return IPC.Client.Lane.Control
+
+    def IsStreamCommand(self, cmd: Viewer.ViewerCommand) -> bool:
+        return (
+            self.IsStreamEnabled()
+            and self.m_streamClient.IsStarted()
+            and cmd.GetId() in CommandSender.STREAM_COMMAND_IDS
+        )
+
+    # builder の初期サイズ [byte]. 足りない場合は builder が拡張し, 拡張後の領域を使い続ける
+    BUILDER_SIZE = 1024
+
+    @staticmethod
+    def GetOutput(builder: flatbuffers.Builder) -> bytes:
+        # Output() と bytes() の 2 回のコピーを 1 回にする
+        return bytes(memoryview(builder.Bytes)[builder.Head() :])
+
+    def GetFrameCache(self) -> FrameCache:
+        return self.m_frameCache
+
+    def EncodeBody(self, cmd: Viewer.ViewerCommand) -> bytes:
+        body = self.EncodeCachedBody(cmd)
+        if body is not None:
+            return body
+
+        with self.m_builderMutex:
+            self.m_builder.Clear()
+            cmd.Serialize(self.m_builder)
+            return CommandSender.GetOutput(self.m_builder)
+
+    @staticmethod
+    def BuildBody(builder: flatbuffers.Builder, cmd: Viewer.ViewerCommand) -> int:
+        # コマンドを builder の中で完結した FlatBuffer として作り, そのまま Body の vector にする
+        # Body の外の vtable を共有しないように Clear() した直後の builder で呼ぶ
+        builder.Prep(8, 0)
+        start = builder.Offset()
+        cmd.Serialize(builder)
+        # Finish() 後の先頭は 4 byte 以上に揃っているので要素数を前に置くだけでよい
+        builder.PrependUint32(builder.Offset() - start)
+        return builder.Offset()
+
+    @staticmethod
+    def BuildViewerCommand(
+        builder: flatbuffers.Builder, id: int, body: Union[bytes, int], sequence: int, version: int
+    ) -> int:
+        # body は bytes か BuildBody() の戻り値
+        bodyVec = body if isinstance(body, int) else builder.CreateByteVector(body)
+        FbsViewerCommand.Start(builder)
+        FbsViewerCommand.AddId(builder, id)
+        FbsViewerCommand.AddBody(builder, bodyVec)
+        FbsViewerCommand.AddSequence(builder, sequence)
+        FbsViewerCommand.AddVersion(builder, version)
+        return FbsViewerCommand.End(builder)
+
+    @staticmethod
+    def FinishMessage(builder: flatbuffers.Builder, dataType: int, data: int) -> bytes:
+        FbsIPCMessage.Start(builder)
+        FbsIPCMessage.AddDataType(builder, dataType)
+        FbsIPCMessage.AddData(builder, data)
+        message = FbsIPCMessage.End(builder)
+        builder.Finish(message)
+
+        return CommandSender.GetOutput(builder)
+
+    def Stamp(self, key: Hashable) -> Tuple[int, int]:
+        # (通し番号, 版) を返す. 版は対象ごとに増やし, Viewer は受け取った版より古い更新を捨てる
+        # 対象の無いコマンドの版は 0 で, 順序を問わず適用される
+        sequence = next(self.m_sequence)
+        if key is None:
+            return (sequence, 0)
+        version = self.m_versions.get(key, 0) % 0xFFFFFFFF + 1
+        self.m_versions[key] = version
+        return (sequence, version)
+
+    def EncodeMessage(self, id: int, body: bytes, sequence: int, version: int) -> bytes:
+        with self.m_builderMutex:
+            messageBuilder = self.m_builder
+            messageBuilder.Clear()
+            viewerCmd = CommandSender.BuildViewerCommand(
+                messageBuilder, id, body, sequence, version
+            )
+            return CommandSender.FinishMessage(
+                messageBuilder, FbsMessageData.MessageData.ViewerCommand, viewerCmd
+            )
+
+    def EncodeBatch(self, commands: list[tuple[int, bytes, int, int]]) -> bytes:
+        # commands は (ViewerCommand.Id, Body, 通し番号, 版) の列. 順番通りに Viewer で適用される
+        with self.m_builderMutex:
+            messageBuilder = self.m_builder
+            messageBuilder.Clear()
+            viewerCmds = [
+                CommandSender.BuildViewerCommand(messageBuilder, *command) for command in commands
+            ]
+            FbsCommandBatch.StartCommandsVector(messageBuilder, len(viewerCmds))
+            # vector は後ろから積むので逆順に追加する
+            for viewerCmd in reversed(viewerCmds):
+                messageBuilder.PrependUOffsetTRelative(viewerCmd)
+            commandsVec = messageBuilder.EndVector(len(viewerCmds))
+            FbsCommandBatch.Start(messageBuilder)
+            FbsCommandBatch.AddCommands(messageBuilder, commandsVec)
+            batch = FbsCommandBatch.End(messageBuilder)
+            return CommandSender.FinishMessage(
+                messageBuilder, FbsMessageData.MessageData.CommandBatch, batch
+            )
+
+    def Encode(self, cmd: Viewer.ViewerCommand, key: Hashable = None) -> bytes:
+        # key は GetStateKey() の値で, 対象ごとの版を決めるのに使用する
+        # コマンドと IPCMessage をひとつの builder で続けて作る
+        sequence, version = self.Stamp(key)
+        frame = self.EncodeCached(cmd, sequence, version)
+        if frame is not None:
+            return frame
+
+        with self.m_builderMutex:
+            messageBuilder = self.m_builder
+            messageBuilder.Clear()
+            body = CommandSender.BuildBody(messageBuilder, cmd)
+            viewerCmd = CommandSender.BuildViewerCommand(
+                messageBuilder, cmd.GetId(), body, sequence, version
+            )
+            return CommandSender.FinishMessage(
+                messageBuilder, FbsMessageData.MessageData.ViewerCommand, viewerCmd
+            )
+
+    def EncodeTemplate(self, cmd: Viewer.ViewerCommand) -> bytes:
+        # 既定値の項目も書き換えられるように省略せずにエンコードする
+        with self.m_builderMutex:
+            messageBuilder = self.m_builder
+            messageBuilder.Clear()
+            messageBuilder.ForceDefaults(True)
+            try:
+                body = CommandSender.BuildBody(messageBuilder, cmd)
+                viewerCmd = CommandSender.BuildViewerCommand(messageBuilder, cmd.GetId(), body, 0, 0)
+                return CommandSender.FinishMessage(
+                    messageBuilder, FbsMessageData.MessageData.ViewerCommand, viewerCmd
+                )
+            finally:
+                messageBuilder.ForceDefaults(False)
+
+    def GetFrameTemplate(self, cmd: Viewer.ViewerCommand):
+        # 初回はテンプレートを作る. 対象外のコマンドは None
+        template = self.m_frameCache.Get(cmd)
+        if template is None and self.m_frameCache.IsEnabled() and FrameCache.IsCacheable(cmd):
+            template = self.m_frameCache.Add(cmd, self.EncodeTemplate(cmd))
+        return template
+
+    def EncodeCached(self, cmd: Viewer.ViewerCommand, sequence: int, version: int) -> bytes:
+        if self.GetFrameTemplate(cmd) is None:
+            return None
+        return self.m_frameCache.Encode(cmd, sequence, version)
+
+    def EncodeCachedBody(self, cmd: Viewer.ViewerCommand) -> bytes:
+        if self.GetFrameTemplate(cmd) is None:
+            return None
+        return self.m_frameCache.EncodeBody(cmd)
+
+    @staticmethod
+    def DecodeReply(msg: bytes) -> Viewer.ViewerCommandReply:
+        reply = Viewer.ViewerCommandReply()
+        if not reply.Deserialize(msg):
+            return None
+        return reply
+
     def SendCommand(
         self,
         cmd: Viewer.ViewerCommand,
         replyCB: Callable[[IPC.Client.ReplyCBType, int, bytes], None] = None,
-    ):
-        cmdBuilder = flatbuffers.Builder()
-        cmd.Serialize(cmdBuilder)
-
-        messageBuilder = flatbuffers.Builder()
-        body = messageBuilder.CreateByteVector(cmdBuilder.Output())
-        FbsViewerCommand.Start(messageBuilder)
-        FbsViewerCommand.AddId(messageBuilder, cmd.GetId())
-        FbsViewerCommand.AddBody(messageBuilder, body)
-        viewerCmd = FbsViewerCommand.End(messageBuilder)
-        FbsIPCMessage.Start(messageBuilder)
-        FbsIPCMessage.AddDataType(messageBuilder, FbsMessageData.MessageData.ViewerCommand)
-        FbsIPCMessage.AddData(messageBuilder, viewerCmd)
-        message = FbsIPCMessage.End(messageBuilder)
-        messageBuilder.Finish(message)
-
-        msg = messageBuilder.Output()
-
-        self.m_client.Send(bytes(msg), replyCB)
+        timeout: int = None,
+    ) -> IPC.Client.Request:
+        # Future を返す. 結果は IPC.Client.Result で GetReply() が ViewerCommandReply
+        # 送信できなかった場合は None を返す
+        # timeout [msec] を指定するとこのコマンドだけ期限を変更できる
+        # 再接続時には最新の Transform などを再送する
+        # BeginBatch() 中は Commit() で送るバッチ全体の Request を返す
+        if self.IsBatching():
+            return self.AddBatchCommand(cmd, replyCB)
+
+        if self.IsStreamCommand(cmd):
+            return self.SendStreamCommand(cmd, replyCB)
+
+        # 同じ対象へのコマンドは IPC.Client が前のものの応答を待ってから送る
+        key = CommandSender.GetStateKey(cmd)
+        return self.m_client.Send(
+            self.Encode(cmd, key),
+            replyCB,
+            CommandSender.DecodeReply,
+            key=key,
+            replayKey=key,
+            timeout=timeout,
+            tag=int(cmd.GetId()),
+            lane=CommandSender.GetLane(cmd.GetId()),
+        )
+
+    def SendStreamCommand(
+        self,
+        cmd: Viewer.ViewerCommand,
+        replyCB: Callable[[IPC.Client.ReplyCBType, int, bytes], None] = None,
+    ) -> IPC.Client.Request:
+        key = CommandSender.GetStateKey(cmd)
+        msg = self.Encode(cmd, key)
+
+        # 制御チャネルの再接続時にも最新の状態を送り直す
+        if key is not None:
+            self.m_client.SetReplayMessage(key, msg)
+
+        return self.SendStreamMessage(msg, replyCB, int(cmd.GetId()))
+
+    def SendStreamMessage(
+        self,
+        msg: bytes,
+        replyCB: Callable[[IPC.Client.ReplyCBType, int, bytes], None] = None,
+        tag: int = 0,
+    ) -> IPC.Client.Request:
+        # 応答は無いので送信結果だけを持つ完了済みの Request を返す
+        # IPC.Client.Send() の Stream lane と同じく Viewer が応答しない間は送らずに None を返す
+        if self.m_client.IsShedding(IPC.Client.Lane.Stream):
+            return None
+
+        message = self.m_compressor.Compress(msg)
+        ret = IPC.Client.ErrorCode.Success
+        if not self.m_streamClient.Send(message):
+            ret = IPC.Client.ErrorCode.Failed
+
+        metrics = self.m_client.GetMetrics()
+        if metrics.IsEnabled():
+            metrics.OnStreamSend(tag, len(message), ret == IPC.Client.ErrorCode.Success)
+
+        empty = "".encode("utf-8")
+        if replyCB:
+            replyCB(IPC.Client.ReplyCBType.Send, ret, empty)
+
+        request = IPC.Client.Request(0, msg, None, None, None)
+        request.set_result(IPC.Client.Result(0, IPC.Client.ReplyCBType.Send, ret, empty, None, 0.0))
+        return request
+
+    def Post(self, cmd: Viewer.ViewerCommand) -> bool:
+        # 次の Flush() で送る. 同じ対象への未送信のコマンドは置き換える
+        if not self.IsStarted():
+            return False
+        self.m_queue.Put(CommandSender.GetStateKey(cmd), cmd)
+        return True
+
+    def Flush(self) -> int:
+        # Post() したコマンドを追加順に送り, 送った数を返す
+        # Post() した値に依存するコマンドを SendCommand() する前に呼ぶこと
+        # stream channel は送信まで済ませるが, IPC.Client の lane をまたいだ順番は保証しない
+        self.UpdateChannels()
+        count = 0
+        for cmd in self.m_queue.Drain():
+            if self.SendCommand(cmd):
+                count += 1
+        return count
+
+    def GetCoalescedCount(self) -> int:
+        return self.m_queue.GetSavedCount()
+
+    def BeginBatch(self) -> None:
+        # 入れ子にした場合は一番外側の Commit() でまとめて送る
+        if not self.IsBatchEnabled() or not self.IsStarted():
+            return
+        self.m_batchDepth += 1
+        if self.m_batchRequest is None:
+            self.m_batchRequest = IPC.Client.Request(0, None, None, None, None)
+
+    def AddBatchCommand(
+        self,
+        cmd: Viewer.ViewerCommand,
+        replyCB: Callable[[IPC.Client.ReplyCBType, int, bytes], None] = None,
+    ) -> IPC.Client.Request:
+        key = CommandSender.GetStateKey(cmd)
+        command = (int(cmd.GetId()), self.EncodeBody(cmd), *self.Stamp(key))
+        self.m_batch.append(command)
+        if replyCB:
+            self.m_batchReplyCBs.append(replyCB)
+
+        # 再接続時の再送用のメッセージは実際に再送する時に作る
+        if key is not None:
+            self.m_client.SetReplayMessage(key, lambda: self.EncodeMessage(*command))
+
+        return self.m_batchRequest
+
+    def Commit(self) -> IPC.Client.Request:
+        # バッチを送信してその Request を返す. 空の場合や送信できなかった場合は None
+        if self.m_batchRequest is None:
+            return None
+        self.m_batchDepth -= 1
+        if self.m_batchDepth > 0:
+            return self.m_batchRequest
+
+        # 送信に失敗しても次のバッチに持ち越さないように先に状態を戻す
+        request = self.m_batchRequest
+        batch = self.m_batch
+        replyCBs = self.m_batchReplyCBs
+        self.m_batchDepth = 0
+        self.m_batchRequest = None
+        self.m_batch = []
+        self.m_batchReplyCBs = []
+
+        if len(batch) == 0:
+            request.cancel()
+            return None
+
+        try:
+            return self.SendBatch(request, batch, replyCBs)
+        except Exception:
+            request.cancel()
+            raise
 
+    @contextlib.contextmanager
+    def Batch(self):
+        # with sender.Batch(): の中で送ったコマンドを例外が起きても必ず Commit() する
+        self.BeginBatch()
+        try:
+            yield self
+        finally:
+            self.Commit()
+
+    def SendBatch(
+        self,
+        request: IPC.Client.Request,
+        batch: list[tuple[int, bytes]],
+        replyCBs: list[Callable[[IPC.Client.ReplyCBType, int, bytes], None]],
+    ) -> IPC.Client.Request:
+
+        def replyCB(type: IPC.Client.ReplyCBType, ret: int, msg: bytes) -> None:
+            for cb in replyCBs:
+                cb(type, ret, msg)
+
+        # バッチは含まれるコマンドのうち最も優先度の高い Lane で送る
+        lane = min(CommandSender.GetLane(command[0]) for command in batch)
+        msg = self.EncodeBatch(batch)
+        if (
+            self.IsStreamEnabled()
+            and self.m_streamClient.IsStarted()
+            and lane == IPC.Client.Lane.Stream
+        ):
+            sent = self.SendStreamMessage(msg, replyCB, CommandSender.BATCH_TAG)
+        else:
+            # バッチ同士も送った順に Viewer に届くようにする
+            sent = self.m_client.Send(
+                msg,
+                replyCB,
+                CommandSender.DecodeReply,
+                key=CommandSender.BATCH_KEY,
+                tag=CommandSender.BATCH_TAG,
+                lane=lane,
+            )
+        if sent is None:
+            request.cancel()
+            return None
+
+        def copyResult(future: IPC.Client.Request) -> None:
+            if future.cancelled():
+                request.cancel()
+            elif not request.done():
+                request.set_result(future.result())
+
+        sent.add_done_callback(copyResult)
+        return request
+
+    def SubscribeViewerState(
+        self, callback: Callable[[Viewer.ViewerStateChangedEvent], None]
+    ) -> None:
+        # callback は SetReplyDispatcher() の dispatcher, 未設定の場合は受信用の thread から呼ばれる
+        if callback not in self.m_viewerStateCallbacks:
+            self.m_viewerStateCallbacks.append(callback)
+
+    def UnsubscribeViewerState(
+        self, callback: Callable[[Viewer.ViewerStateChangedEvent], None]
+    ) -> None:
+        if callback in self.m_viewerStateCallbacks:
+            self.m_viewerStateCallbacks.remove(callback)
+
+    def GetViewerEvent(self) -> Tuple[int, Viewer.ViewerStateChangedEvent]:
+        # (これまでに受け取った通知の数, 最新の通知) を返す. 通知が無い場合の通知は None
+        with self.m_viewerEventCond:
+            return (self.m_viewerEventCount, self.m_viewerEvent)
+
+    def WaitForViewerEvent(
+        self, since: int, timeout: float
+    ) -> Tuple[int, Viewer.ViewerStateChangedEvent]:
+        # since 個目より後の通知を待って GetViewerEvent() と同じ値を返す
+        # timeout [sec] までに通知が無い場合は (since, None)
+        with self.m_viewerEventCond:
+            if not self.m_viewerEventCond.wait_for(
+                lambda: self.m_viewerEventCount > since, timeout
+            ):
+                return (since, None)
+            return (self.m_viewerEventCount, self.m_viewerEvent)
+
+    def WaitForViewerState(self, state: Viewer.Viewer.State, timeout: float) -> bool:
+        # 最新の通知の状態が state になるまで待つ. 通知を受け取れない場合は False
+        deadline = time.monotonic() + timeout
+        since, event = self.GetViewerEvent()
+        while event is None or event.GetState() != state:
+            remain = deadline - time.monotonic()
+            if remain <= 0:
+                return False
+            count, latest = self.WaitForViewerEvent(since, remain)
+            if latest is None:
+                return False
+            since, event = count, latest
         return True
+
+    def OnEventMessage(self, msg: bytes) -> None:
+        event = Viewer.ViewerStateChangedEvent()
+        try:
+            if not event.Deserialize(msg):
+                return
+        except Exception:
+            return
+        event.SetReceivedTime(time.monotonic())
+
+        with self.m_viewerEventCond:
+            self.m_viewerEvent = event
+            self.m_viewerEventCount += 1
+            self.m_viewerEventCond.notify_all()
+
+        dispatcher = self.m_client.GetReplyDispatcher()
+        for callback in list(self.m_viewerStateCallbacks):
+            if dispatcher:
+                dispatcher.Post(callback, event)
+            else:
+                callback(event)
+
+    async def Request(
+        self, cmd: Viewer.ViewerCommand, timeout: int = None
+    ) -> Viewer.ViewerCommandReply:
+        # 失敗時は None を返す
+        # SendCommand() と同じく同じ対象へのコマンドは送った順に処理させる
+        key = CommandSender.GetStateKey(cmd)
+        type, ret, msg = await self.m_client.SendAsync(
+            self.Encode(cmd, key),
+            timeout,
+            int(cmd.GetId()),
+            key=key,
+            replayKey=key,
+            lane=CommandSender.GetLane(cmd.GetId()),
+        )
+        if type != IPC.Client.ReplyCBType.Recv or ret != 0:
+            return None
+
+        return CommandSender.DecodeReply(msg)
@@ -0,0 +1,149 @@
+import struct
+
+import fbs.IPCViewerCommand.fbs.IPCMessage as FbsIPCMessage
+import fbs.IPCViewerCommand.fbs.ViewerCommand as FbsViewerCommand
+import flatbuffers
+import Viewer
+
+Id = Viewer.ViewerCommand.Id
+
+
+class FrameTemplate:
+    # 一度エンコードした IPCMessage と, 書き換える項目の位置
+    def __init__(self, frame: bytes, fields: tuple):
+        self.m_frame = frame
+
+        message = FbsIPCMessage.IPCMessage.GetRootAs(frame)
+        data = message.Data()
+        viewerCmd = FbsViewerCommand.ViewerCommand()
+        viewerCmd.Init(data.Bytes, data.Pos)
+        tab = viewerCmd._tab
+        self.m_sequenceOffset = tab.Pos + tab.Offset(8)
+        self.m_versionOffset = tab.Pos + tab.Offset(10)
+
+        # Body は vector の中で完結した FlatBuffer
+        self.m_bodyStart = tab.Vector(tab.Offset(6))
+        self.m_bodyEnd = self.m_bodyStart + tab.VectorLen(tab.Offset(6))
+        bodyPos = self.m_bodyStart + flatbuffers.encode.Get(
+            flatbuffers.packer.uoffset, frame, self.m_bodyStart
+        )
+        body = flatbuffers.table.Table(frame, bodyPos)
+        self.m_fields = tuple(
+            (bodyPos + body.Offset(vtableOffset), format, getter)
+            for vtableOffset, format, getter in fields
+        )
+        if 0 in (tab.Offset(8), tab.Offset(10)) or any(
+            offset == bodyPos for offset, _, _ in self.m_fields
+        ):
+            raise ValueError("FrameTemplate: missing scalar slot")
+
+    def Patch(self, cmd: Viewer.ViewerCommand, sequence: int, version: int) -> bytes:
+        frame = bytearray(self.m_frame)
+        struct.pack_into("<Q", frame, self.m_sequenceOffset, sequence)
+        struct.pack_into("<I", frame, self.m_versionOffset, version)
+        for offset, format, getter in self.m_fields:
+            struct.pack_into(format, frame, offset, getter(cmd))
+        return bytes(frame)
+
+    def PatchBody(self, cmd: Viewer.ViewerCommand) -> bytes:
+        body = bytearray(self.m_frame[self.m_bodyStart : self.m_bodyEnd])
+        for offset, format, getter in self.m_fields:
+            struct.pack_into(format, body, offset - self.m_bodyStart, getter(cmd))
+        return bytes(body)
+
+
+class FrameCache:
+    # 内容が決まっているコマンドは一度だけエンコードし, 以降はその複製の通し番号, 版と
+    # コマンドの数値の項目だけを struct.pack_into で書き換える
+    # テンプレートは ForceDefaults(True) で作るので既定値の項目も必ず領域がある
+
+    # ViewerCommand.Id: (コマンドのクラス, ((Body の table の vtable offset, 書式, 値を返す関数), ...))
+    # 同じ Id を返す別のクラスのコマンドは対象外
+    FIELDS = {
+        Id.StartAnimation: (Viewer.StartAnimationCommand, ()),
+        Id.StopAnimation: (Viewer.StopAnimationCommand, ()),
+        Id.GetViewerState: (Viewer.GetViewerStateCommand, ()),
+        Id.StopViewer: (Viewer.StopViewerCommand, ()),
+        Id.StartExporting: (Viewer.StartExportingCommand, ()),
+        Id.EndExporting: (Viewer.EndExportingCommand, ()),
+        Id.SetAnimationFrame: (
+            Viewer.SetAnimationFrameCommand,
+            (
+                (4, "<i", Viewer.SetAnimationFrameCommand.GetFrame),
+                (6, "<f", Viewer.SetAnimationFrameCommand.GetFPS),
+            ),
+        ),
+        Id.SetCameraAimLength: (
+            Viewer.SetCameraAimLengthCommand,
+            ((4, "<f", Viewer.SetCameraAimLengthCommand.GetCameraAimLength),),
+        ),
+        Id.SetClipping: (
+            Viewer.SetClippingCommand,
+            (
+                (4, "<i", Viewer.SetClippingCommand.GetMethod),
+                (6, "<i", Viewer.SetClippingCommand.GetPlane),
+            ),
+        ),
+    }
+
+    def __init__(self):
+        self.m_enabled = True
+        self.m_templates: dict[Id, FrameTemplate] = {}
+        self.m_hitCount = 0
+
+    def SetEnabled(self, enable: bool) -> None:
+        self.m_enabled = enable
+
+    def IsEnabled(self) -> bool:
+        return self.m_enabled
+
+    @staticmethod
+    def IsCacheable(cmd: Viewer.ViewerCommand) -> bool:
+        entry = FrameCache.FIELDS.get(cmd.GetId())
+        return entry is not None and type(cmd) is entry[0]
+
+    def Get(self, cmd: Viewer.ViewerCommand) -> FrameTemplate:
+        # テンプレートが無い場合は None
+        if not self.m_enabled or not FrameCache.IsCacheable(cmd):
+            return None
+        return self.m_templates.get(cmd.GetId())
+
+    def Add(self, cmd: Viewer.ViewerCommand, frame: bytes) -> FrameTemplate:
+        # frame は ForceDefaults(True) でエンコードした cmd の IPCMessage
+        try:
+            template = FrameTemplate(frame, FrameCache.FIELDS[cmd.GetId()][1])
+        except Exception:
+            return None
+        self.m_templates[cmd.GetId()] = template
+        return template
+
+    def Encode(self, cmd: Viewer.ViewerCommand, sequence: int, version: int) -> bytes:
+        # テンプレートが無い場合や値が書式に収まらない場合は None
+        # float の範囲外は struct.error ではなく OverflowError になる
+        template = self.Get(cmd)
+        if template is None:
+            return None
+        try:
+            frame = template.Patch(cmd, sequence, version)
+        except (struct.error, OverflowError):
+            return None
+        self.m_hitCount += 1
+        return frame
+
+    def EncodeBody(self, cmd: Viewer.ViewerCommand) -> bytes:
+        template = self.Get(cmd)
+        if template is None:
+            return None
+        try:
+            body = template.PatchBody(cmd)
+        except (struct.error, OverflowError):
+            return None
+        self.m_hitCount += 1
+        return body
+
+    def GetHitCount(self) -> int:
+        return self.m_hitCount
+
+    def Clear(self) -> None:
+        self.m_templates = {}
+        self.m_hitCount = 0
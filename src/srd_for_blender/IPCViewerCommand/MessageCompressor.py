@@ -0,0 +1,166 @@
+import threading
+import zlib
+from typing import Iterable
+
+import fbs.IPCViewerCommand.fbs.Compression as FbsCompression
+import fbs.IPCViewerCommand.fbs.IPCMessage as FbsIPCMessage
+import flatbuffers
+from fbs.ZeroCopy import ZeroCopy
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4frame
+except ImportError:
+    lz4frame = None
+
+
+class MessageCompressor:
+    # 閾値以上の IPCMessage を圧縮し, Compression と Payload を設定した IPCMessage で包む
+    # 方式は接続ごとに Viewer と合わせる. 小さいメッセージや縮まないメッセージはそのまま送る
+    # Viewer の機能との対応は CommandSender が持つ
+    Compression = FbsCompression.Compression
+
+    DEFAULT_THRESHOLD = 4096  # byte
+
+    # 両方が対応している場合に使用する順
+    PREFERENCES = (Compression.Zstd, Compression.Lz4, Compression.Zlib)
+
+    def __init__(self):
+        self.m_compression = MessageCompressor.Compression.NONE
+        self.m_threshold = MessageCompressor.DEFAULT_THRESHOLD
+        self.m_zlibLevel = 1
+        self.m_zstdLevel = 3
+        # zstandard の compressor は thread 間で共有できないので thread ごとに持つ
+        self.m_local = threading.local()
+        self.m_mutex = threading.Lock()
+        self.m_compressedCount = 0
+        self.m_bytesIn = 0
+        self.m_bytesOut = 0
+
+    @staticmethod
+    def IsSupported(compression: int) -> bool:
+        # zlib は常に使用できる. zstd, lz4 はモジュールがある場合のみ
+        if compression == MessageCompressor.Compression.Zlib:
+            return True
+        if compression == MessageCompressor.Compression.Zstd:
+            return zstandard is not None
+        if compression == MessageCompressor.Compression.Lz4:
+            return lz4frame is not None
+        return False
+
+    @staticmethod
+    def GetSupportedCompressions() -> list[int]:
+        # 使用できる方式を PREFERENCES の順で返す
+        return [c for c in MessageCompressor.PREFERENCES if MessageCompressor.IsSupported(c)]
+
+    def SelectCompression(self, compressions: Iterable[int]) -> int:
+        # Viewer の対応している方式から使用する方式を決める. 共通のものが無い場合は NONE
+        compressions = set(compressions)
+        self.m_compression = MessageCompressor.Compression.NONE
+        for compression in MessageCompressor.GetSupportedCompressions():
+            if compression in compressions:
+                self.m_compression = compression
+                break
+        return self.m_compression
+
+    def SetCompression(self, compression: int) -> None:
+        self.m_compression = compression
+
+    def GetCompression(self) -> int:
+        return self.m_compression
+
+    def SetThreshold(self, threshold: int) -> None:
+        # threshold [byte] 未満のメッセージは圧縮しない
+        self.m_threshold = threshold
+
+    def GetThreshold(self) -> int:
+        return self.m_threshold
+
+    def SetLevel(self, zlibLevel: int, zstdLevel: int) -> None:
+        self.m_zlibLevel = zlibLevel
+        self.m_zstdLevel = zstdLevel
+        self.m_local = threading.local()
+
+    def GetZstdCompressor(self):
+        compressor = getattr(self.m_local, "zstd", None)
+        if compressor is None:
+            compressor = zstandard.ZstdCompressor(level=self.m_zstdLevel)
+            self.m_local.zstd = compressor
+        return compressor
+
+    def CompressPayload(self, compression: int, data: bytes) -> bytes:
+        if compression == MessageCompressor.Compression.Zlib:
+            return zlib.compress(data, self.m_zlibLevel)
+        if compression == MessageCompressor.Compression.Zstd:
+            return self.GetZstdCompressor().compress(data)
+        if compression == MessageCompressor.Compression.Lz4:
+            return lz4frame.compress(data)
+        return data
+
+    @staticmethod
+    def DecompressPayload(compression: int, payload: bytes) -> bytes:
+        if compression == MessageCompressor.Compression.Zlib:
+            return zlib.decompress(payload)
+        if compression == MessageCompressor.Compression.Zstd:
+            return zstandard.ZstdDecompressor().decompress(payload)
+        if compression == MessageCompressor.Compression.Lz4:
+            return lz4frame.decompress(payload)
+        return payload
+
+    def Compress(self, data: bytes) -> bytes:
+        # 送信直前に呼ぶ. 圧縮しない場合は data をそのまま返す
+        compression = self.m_compression
+        if compression == MessageCompressor.Compression.NONE or len(data) < self.m_threshold:
+            return data
+
+        try:
+            payload = self.CompressPayload(compression, data)
+        except Exception:
+            return data
+        if len(payload) >= len(data):
+            return data
+
+        builder = flatbuffers.Builder(len(payload) + 64)
+        payloadVec = builder.CreateByteVector(payload)
+        FbsIPCMessage.Start(builder)
+        FbsIPCMessage.AddCompression(builder, compression)
+        FbsIPCMessage.AddPayload(builder, payloadVec)
+        FbsIPCMessage.AddOriginalSize(builder, len(data))
+        message = FbsIPCMessage.End(builder)
+        builder.Finish(message)
+        output = bytes(builder.Output())
+
+        with self.m_mutex:
+            self.m_compressedCount += 1
+            self.m_bytesIn += len(data)
+            self.m_bytesOut += len(output)
+        return output
+
+    @staticmethod
+    def Decompress(data: bytes) -> bytes:
+        # Compress() の逆. 圧縮されていない IPCMessage はそのまま返す
+        message = FbsIPCMessage.IPCMessage.GetRootAs(data)
+        compression = message.Compression()
+        if compression == MessageCompressor.Compression.NONE:
+            return data
+
+        # 受信したバッファをコピーせずに展開する
+        payload = ZeroCopy.PayloadAsMemoryview(message)
+        return MessageCompressor.DecompressPayload(compression, payload)
+
+    def GetCompressedCount(self) -> int:
+        return self.m_compressedCount
+
+    def GetSavedBytes(self) -> int:
+        with self.m_mutex:
+            return self.m_bytesIn - self.m_bytesOut
+
+    def ResetCount(self) -> None:
+        with self.m_mutex:
+            self.m_compressedCount = 0
+            self.m_bytesIn = 0
+            self.m_bytesOut = 0
@@ -1 +1,5 @@
-from .CommandSender import CommandSender
\ No newline at end of file
+from .CoalescingQueue import CoalescingQueue
+from .CommandSender import CommandSender
+from .MessageCompressor import MessageCompressor
+
+__all__ = ["CoalescingQueue", "CommandSender", "MessageCompressor"]
\ No newline at end of file
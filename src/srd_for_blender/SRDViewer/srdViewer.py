@@ -25,7 +25,8 @@ class srdViewer:
     # region プラグインで管理するコールバック関連
     # Attribute Change / Timer(100msec) / timeChangeコールバックとアトリビュートチェック関数
     def updateViewerStatusTimerCB() -> float:
-        period = 0.05
+        # 応答しなくなったことは heartbeat で検知するのでプロセスの確認は間隔を空ける
+        period = 0.5
         if srdViewer.m_pi is None or srdViewer.m_pi.poll() is not None:
             srdViewer.m_pi = None
             srdViewer.m_pHandle = None
@@ -36,6 +37,7 @@ class srdViewer:
 
         if srdViewer.m_viewerStatus == srdViewer.ProcessStatus.CLOSING:
             # viewer 終了待ち
+            period = 0.1
             waitResult = ctypes.windll.kernel32.WaitForSingleObject(srdViewer.m_pHandle, 1)
             if WAIT_OBJECT_0 == waitResult:
                 srdViewer.appendHistory("End closing Spatial Reality Display Viewer.")
@@ -51,6 +53,7 @@ class srdViewer:
         if WAIT_TIMEOUT == waitResult:
             # タイムアウトしていたらまだプロセスは動いている
             srdViewer.m_viewerStatus = srdViewer.ProcessStatus.PROCESSING
+            srdViewer.checkViewerHealth()
             return period
 
         # 予期せずViewerが終了している場合
@@ -71,6 +74,24 @@ class srdViewer:
 
         return period
 
+    def onViewerHealthChanged(health: IPC.ViewerHealth) -> None:
+        # m_replyDispatcher 経由でメインスレッドから呼ばれる
+        srdViewer.m_viewerHealth = health
+        if health == IPC.ViewerHealth.Alive:
+            srdViewer.m_reportedHealth = health
+
+    def checkViewerHealth() -> None:
+        health = srdViewer.m_viewerHealth
+        if health == srdViewer.m_reportedHealth:
+            return
+        if health == IPC.ViewerHealth.Hung:
+            srdViewer.appendHistory("[ERROR] Spatial Reality Display Viewer is not responding.")
+        elif health == IPC.ViewerHealth.Dead:
+            srdViewer.appendHistory("Disconnected with Spatial Reality Display Viewer.")
+        else:
+            return
+        srdViewer.m_reportedHealth = health
+
     @bpy.app.handlers.persistent
     def checkTransformCB(scene) -> None:
         if srdViewer.isLoading():
@@ -141,22 +162,27 @@ class srdViewer:
                 srdViewer.checkAttrChangeTime()
 
         # Transform の更新
-        camCheck = False
-        for path in srdViewer.m_changedPath:
-            srdViewer.SendTransformCommand(path)
-
-            if not camCheck:
-                if srdViewer.cameraNode and path == srdViewer.cameraNode.name:
-                    camCheck = True
-
-        # Camera Aim のチェックと更新
-        # カメラに関係する Transform 変更に対して無条件に Gizmo の Aim を送信
-        if camCheck:
-            srdViewer.stateCheckSendCameraAimLength()
-
+        # 1 tick 分の更新はまとめて送り Viewer 側で一度に適用させる
+        with srdViewer.m_messageSender.Batch():
+            camCheck = False
+            for path in srdViewer.m_changedPath:
+                srdViewer.SendTransformCommand(path)
+
+                if not camCheck:
+                    if srdViewer.cameraNode and path == srdViewer.cameraNode.name:
+                        camCheck = True
+
+            # Camera Aim のチェックと更新
+            # カメラに関係する Transform 変更に対して無条件に Gizmo の Aim を送信
+            if camCheck:
+                srdViewer.stateCheckSendCameraAimLength()
+
+            # Post() したコマンドを送る
+            srdViewer.m_messageSender.Flush()
         srdViewer.m_changedPath.clear()
 
-        return period
+        # Viewer の応答が遅い間は送る間隔を伸ばす
+        return srdViewer.m_messageSender.GetFlushPeriod()
 
     def checkNodeAttr(path: bpy.types.Object):
         if path is None:
@@ -172,6 +198,23 @@ class srdViewer:
             for child in path.children:
                 srdViewer.checkNodeAttr(child)
 
+    def updateEventLoopTimerCB() -> float:
+        # CommandSender.Request() などの非同期処理をメインスレッドで進める
+        if srdViewer.m_eventLoop is None:
+            return None
+        return srdViewer.m_eventLoop.TimerCB()
+
+    def registerEventLoopTimer() -> None:
+        # 非同期処理がある間だけイベントループを回す
+        if not bpy.app.timers.is_registered(srdViewer.updateEventLoopTimerCB):
+            bpy.app.timers.register(srdViewer.updateEventLoopTimerCB)
+
+    def updateReplyDispatchTimerCB() -> float:
+        # worker thread で受け取った応答の callback をメインスレッドで処理する
+        if srdViewer.m_replyDispatcher is None:
+            return None
+        return srdViewer.m_replyDispatcher.TimerCB()
+
     @bpy.app.handlers.persistent
     def loadPostHandler(context):
         # タイマーコールバックを再登録
@@ -183,6 +226,10 @@ class srdViewer:
             srdViewer.fElapsedTimeCallbackId = bpy.app.timers.register(
                 srdViewer.updateTransformTimerCB
             )
+        if srdViewer.m_eventLoop and srdViewer.m_eventLoop.HasTasks():
+            srdViewer.registerEventLoopTimer()
+        if not bpy.app.timers.is_registered(srdViewer.updateReplyDispatchTimerCB):
+            bpy.app.timers.register(srdViewer.updateReplyDispatchTimerCB)
 
     @bpy.app.handlers.persistent
     def updateAnimationFrameCB(scene) -> None:
@@ -309,6 +356,8 @@ class srdViewer:
 
             # Gizmo Camera を検索して aim distance を送信
             ret = srdViewer.stateCheckSendCameraAimLength()
+            # Clipping より前に Viewer に届くように Post() した aim distance をここで送る
+            srdViewer.m_messageSender.Flush()
             if not ret:
                 return ret
 
@@ -316,6 +365,7 @@ class srdViewer:
             ret = srdViewer.SendSetClippingCommand(
                 srdViewer.m_clippingPlane, srdViewer.m_clippingMethod
             )
+            srdViewer.m_messageSender.Flush()
 
             srdViewer.deleteFbxFileRequest()
             return ret
@@ -382,6 +432,10 @@ class srdViewer:
         return True
 
     m_messageSender: CommandSender = None
+    m_eventLoop: IPC.EventLoop = None
+    m_replyDispatcher: IPC.ReplyDispatcher = None
+    m_viewerHealth: IPC.ViewerHealth = IPC.ViewerHealth.Alive
+    m_reportedHealth: IPC.ViewerHealth = IPC.ViewerHealth.Alive
     m_si: subprocess.STARTUPINFO = None  # STARTUPINFOW
     m_pi: subprocess.Popen = None  # PROCESS_INFORMATION
     m_pHandle: int = None
@@ -389,10 +443,8 @@ class srdViewer:
 
     # region コマンドを発行関連 : wait を考慮した呼び出し
     def stateCheckStartViewer() -> bool:
-        # debug_msg = ""
-
-        counter = 0
-        sleepTime = 500 / 1000  # sec
+        sleepTime = 100 / 1000  # sec
+        timeout = 10  # sec
         retBoot = False
 
         if srdViewer.m_viewerStatus == srdViewer.ProcessStatus.PROCESSING:
@@ -401,22 +453,13 @@ class srdViewer:
                 srdViewer.m_messageSender.Start()
             return True
 
-        serverState = Viewer.Viewer.State.Ready
-        serverReplyState = Viewer.Viewer.State.Ready
-
         retBoot = srdViewer.bootSRDViewer()
         if not retBoot:
             return False
 
-        def replyCB(type: IPC.Client.ReplyCBType, ret: int, msg: bytes):
-            nonlocal serverReplyState
-            if type == IPC.Client.ReplyCBType.Recv and ret == 0:
-                reply = Viewer.ViewerCommandReply()
-                if reply.Deserialize(msg):
-                    serverReplyState = Viewer.Viewer.State(reply.GetExitCode())
-
+        startWait = False
+        startTime = time.time()
         while True:
-            time.sleep(sleepTime)
             if (
                 srdViewer.m_viewerStatus != srdViewer.ProcessStatus.PROCESSING
                 and srdViewer.m_pi is not None
@@ -428,103 +471,150 @@ class srdViewer:
                     # 多重起動で、自身でPopenしたprocessが終了している場合ここを通る
                     return False
 
+            if time.time() - startTime > timeout:
+                # 最大 10秒待ち　通常ここには来ない
+                srdViewer.appendHistory("BOOT Process: timeout")
+                break
+
             if not srdViewer.m_messageSender.IsStarted():
                 srdViewer.m_messageSender.Start()
-                time.sleep(sleepTime)
-                continue
-
-            viewer = Viewer.Viewer()
-            getViewerStateCommand = Viewer.GetViewerStateCommand(viewer)
-            srdViewer.m_messageSender.SendCommand(getViewerStateCommand, replyCB)
-
-            if serverState != serverReplyState:
-                # 起動に関してはここには来ない
-                print("BOOT Process serverStatus : NOT Ready --------")
-                pass
 
-            if counter < 5:
-                print("Wait 5 times for the status to change =======")
+            if not srdViewer.m_messageSender.IsConnected():
+                # 接続の再試行は IPC.Client が行う
                 time.sleep(sleepTime)
-                counter += 1
                 continue
 
-            if serverState == serverReplyState:
-                print("BOOT Process serverStatus : Ready +++++++++++++")
-                break
+            # 使用するチャネルは Viewer の対応している機能で決まる
+            # この処理の間は dispatcher の timer が動かないのでここでチャネルを開始する
+            srdViewer.m_messageSender.WaitForHandshake(1.0)
+            srdViewer.m_messageSender.UpdateChannels()
 
-            counter += 1
-            time.sleep(sleepTime)
-            if counter > 20:
-                # 最大 10秒待ち　通常ここには来ない
-                print("*****************TIME_OUT*********************")
+            # 応答を直接待つので状態変化を sleep で待つ必要はない
+            serverState = srdViewer.requestViewerState(1.0)
+            if serverState == Viewer.Viewer.State.Ready:
+                srdViewer.appendHistory("BOOT Process: Server Status Ready")
                 break
 
+            if not startWait:
+                srdViewer.appendHistory("BOOT Process: Server Status NOT Ready")
+                startWait = True
+
+            if srdViewer.m_messageSender.IsEventsEnabled():
+                # 状態が変わった時点で問い合わせ直す
+                srdViewer.m_messageSender.WaitForViewerState(Viewer.Viewer.State.Ready, 1.0)
+            else:
+                time.sleep(sleepTime)
+
         srdViewer.appendHistory("Start Spatial Reality Display Viewer.")
         return True
 
     def stateCheckSceneLoad() -> bool:
-        counter = 0
-        sleepTime = 300 / 1000
-
-        srdViewer.loadScene()
+        sleepTime = 100 / 1000
+        timeout = 5  # sec
+        readyCheckCount = 5
+
+        # OpenScene より後の通知だけを対象にする
+        eventCount, _ = srdViewer.m_messageSender.GetViewerEvent()
+        requestTime = time.monotonic()
+
+        openRequest = srdViewer.loadScene()
+        if openRequest:
+            # OpenScene が処理されてから状態を確認する
+            openRequest.Wait(2.0)
+
+        if srdViewer.m_messageSender.IsEventsEnabled():
+            ret = srdViewer.waitSceneLoadEvent(eventCount, requestTime, timeout)
+            if ret is not None:
+                return ret
+            # 通知を受け取れない場合は状態の問い合わせで確認する
 
-        serverState = Viewer.Viewer.State.Ready
-        serverReplyState = Viewer.Viewer.State.Ready
         startWait = False
-        needTimeout = False
-
-        def replyCB(type: IPC.Client.ReplyCBType, ret: int, msg: bytes):
-            nonlocal serverReplyState
-            if type == IPC.Client.ReplyCBType.Recv and ret == 0:
-                reply = Viewer.ViewerCommandReply()
-                if reply.Deserialize(msg):
-                    serverReplyState = Viewer.Viewer.State(reply.GetExitCode())
+        readyCount = 0
+        startTime = time.time()
 
         while True:
-            viewer = Viewer.Viewer()
-            getViewerStateCommand = Viewer.GetViewerStateCommand(viewer)
-            srdViewer.m_messageSender.SendCommand(getViewerStateCommand, replyCB)
-            if serverState != serverReplyState and not startWait:
-                # ここはロード中
-                srdViewer.appendHistory("LOAD Process: Server Status NOT Ready")
-                startWait = True
-                time.sleep(sleepTime)
-                counter += 1
-            elif serverState != serverReplyState:
-                srdViewer.appendHistory("LOAD Process: wait ...")
-                time.sleep(sleepTime)
-                counter += 1
-                continue
-
-            if serverState == serverReplyState and not startWait and not needTimeout:
-                if counter < 5:
-                    print("Wait 5 times for the status to change =======")
-                else:
-                    # 5回待ってもステータスチェンジが確認出来なければ強制的にフラグを上げる
-                    srdViewer.appendHistory("LOAD Process: need timeout")
-                    needTimeout = True
-                time.sleep(sleepTime)
-                counter += 1
-                continue
+            if srdViewer.m_pi is None or srdViewer.m_pi.poll() is not None:
+                srdViewer.appendHistory("LOAD Process: viewer is not running")
+                return False
 
-            if serverState == serverReplyState:
+            serverState = srdViewer.requestViewerState(1.0)
+            if serverState == Viewer.Viewer.State.Loading:
+                if not startWait:
+                    # ここはロード中
+                    srdViewer.appendHistory("LOAD Process: Server Status NOT Ready")
+                    startWait = True
+            elif serverState == Viewer.Viewer.State.Ready:
                 if startWait:
                     srdViewer.appendHistory("LOAD Process: Server Status Ready")
                     break
-                else:
-                    # ステータスチェンジを確認出来なかった
-                    # シーンロードが早すぎる場合なので、5秒程度で進む事とする
-                    if counter > 15:
-                        srdViewer.appendHistory("LOAD Process: timeout")
-                        break
-                    else:
-                        srdViewer.appendHistory("LOAD Process: WAIT timeout")
-                        time.sleep(sleepTime)
-                        counter += 1
-                        continue
+                # シーンロードが早すぎてステータスチェンジを確認出来ない場合があるので
+                # 数回 Ready を確認できたら完了とする
+                readyCount += 1
+                if readyCount >= readyCheckCount:
+                    srdViewer.appendHistory("LOAD Process: Server Status Ready")
+                    break
+
+            if not startWait and time.time() - startTime > timeout:
+                srdViewer.appendHistory("LOAD Process: timeout")
+                break
+
+            time.sleep(sleepTime)
 
         return True
 
+    def waitSceneLoadEvent(since: int, requestTime: float, timeout: float) -> bool:
+        # Viewer からの通知で読み込みの終了を待つ. 通知が無い間は状態を問い合わせる
+        # requestTime (time.monotonic()) より後に受け取った Ready の通知で完了とする
+        # timeout [sec] までに完了しない場合は None を返す
+        readyCheckCount = 5
+        startWait = False
+        readyCount = 0
+        startTime = time.time()
+        while True:
+            if srdViewer.m_pi is None or srdViewer.m_pi.poll() is not None:
+                srdViewer.appendHistory("LOAD Process: viewer is not running")
+                return False
+
+            if time.time() - startTime > timeout:
+                return None
+
+            since, event = srdViewer.m_messageSender.WaitForViewerEvent(since, 0.5)
+            if event is not None:
+                state = event.GetState()
+                if state == Viewer.Viewer.State.Ready and event.GetReceivedTime() > requestTime:
+                    srdViewer.appendHistory("LOAD Process: Server Status Ready")
+                    return True
+            else:
+                # 通知が失われた場合に備えて問い合わせる
+                state = srdViewer.requestViewerState(1.0)
+                if state == Viewer.Viewer.State.Ready:
+                    # 読み込みの開始前の Ready の場合があるので数回確認できたら完了とする
+                    readyCount += 1
+                    if startWait or readyCount >= readyCheckCount:
+                        srdViewer.appendHistory("LOAD Process: Server Status Ready")
+                        return True
+
+            if state == Viewer.Viewer.State.Loading and not startWait:
+                srdViewer.appendHistory("LOAD Process: Server Status NOT Ready")
+                startWait = True
+
+    def requestViewerState(timeout: float) -> Viewer.Viewer.State:
+        # 応答が得られない場合は None を返す
+        viewer = Viewer.Viewer()
+        getViewerStateCommand = Viewer.GetViewerStateCommand(viewer)
+        request = srdViewer.m_messageSender.SendCommand(getViewerStateCommand)
+        if request is None:
+            return None
+
+        result = request.Wait(timeout)
+        if result is None or not result.IsSuccess() or result.GetReply() is None:
+            return None
+
+        try:
+            return Viewer.Viewer.State(result.GetReply().GetExitCode())
+        except ValueError:
+            return None
+
     def stateCheckSendCameraName() -> bool:
         name = srdViewer.getGizmoCameraName()
         if name:
@@ -558,6 +648,8 @@ class srdViewer:
             return
         frame, frate = srdViewer.getUnit()
         srdViewer.SendAnimationFrameCommand(frame, frate)
+        # 同期していない間は Transform の timer が Flush() しないのでここで送る
+        srdViewer.m_messageSender.Flush()
 
     def getUnit() -> typing.Tuple[int, float]:
         frate = bpy.context.scene.render.fps / bpy.context.scene.render.fps_base
@@ -614,7 +706,7 @@ class srdViewer:
                 # ここには来ない
                 srdViewer.appendHistory("[ERROR] Clipping setting: Unknown", True)
 
-        srdViewer.SendSetClippingCommand(srdViewer.m_clippingPlane, srdViewer.m_clippingMethod)
+        srdViewer.postClippingCommand()
 
     def setClippingPlane(front: bool, top: bool) -> None:
         if front is False and top is False:
@@ -634,7 +726,14 @@ class srdViewer:
             if srdViewer.m_viewerStatus == srdViewer.ProcessStatus.PROCESSING:
                 srdViewer.appendHistory("Clipping plane: Both")
 
+        srdViewer.postClippingCommand()
+
+    def postClippingCommand() -> None:
+        # 連続した UI 操作は Transform の timer の Flush() で最新の設定だけを送る
         srdViewer.SendSetClippingCommand(srdViewer.m_clippingPlane, srdViewer.m_clippingMethod)
+        # 同期していない間は Transform の timer が Flush() しないのでここで送る
+        if not srdViewer.isSyncronize():
+            srdViewer.m_messageSender.Flush()
 
     # endregion
 
@@ -834,6 +933,10 @@ class srdViewer:
             bpy.app.handlers.frame_change_pre.remove(srdViewer.fTimeChangeCallbackId)
         if srdViewer.fLoadPostHandlerId:
             bpy.app.handlers.load_post.remove(srdViewer.fLoadPostHandlerId)
+        if bpy.app.timers.is_registered(srdViewer.updateEventLoopTimerCB):
+            bpy.app.timers.unregister(srdViewer.updateEventLoopTimerCB)
+        if bpy.app.timers.is_registered(srdViewer.updateReplyDispatchTimerCB):
+            bpy.app.timers.unregister(srdViewer.updateReplyDispatchTimerCB)
 
     # endregion
 
@@ -850,7 +953,7 @@ class srdViewer:
             else:
                 srdViewer.m_sourceOperator.report({"INFO"}, log)
 
-    def loadScene() -> None:
+    def loadScene() -> IPC.Client.Request:
         srdViewer.setFbxPath()
         srdViewer.setFbxPresetPath()
         fbxFullPathName = os.path.join(srdViewer.m_fbxPath, srdViewer.m_uniqueFileName)
@@ -910,7 +1013,7 @@ class srdViewer:
         cameraName = ""
         if srdViewer.cameraNode:
             cameraName = srdViewer.cameraNode.name
-        srdViewer.SendOpenCommand(fbxFullPathName, cameraName, aimDistance)
+        return srdViewer.SendOpenCommand(fbxFullPathName, cameraName, aimDistance)
 
     def preLoadCheck() -> bool:
         existGizmo = srdViewer.existsGizmoCamera()
@@ -974,6 +1077,25 @@ class srdViewer:
     def isSyncronize() -> bool:
         return srdViewer.m_synchronize
 
+    def getConnectionStatusText() -> str:
+        # Panel 表示用
+        sender = srdViewer.m_messageSender
+        if sender is None or not sender.IsStarted():
+            return "Stopped"
+        if not sender.IsConnected():
+            return "Disconnected"
+        health = sender.GetViewerHealth()
+        if health == IPC.ViewerHealth.Hung:
+            return "Not responding"
+        if health == IPC.ViewerHealth.Degraded:
+            return "Slow"
+        state = sender.GetCircuitState()
+        if state == IPC.CircuitBreaker.State.Open:
+            return "Not responding"
+        if state == IPC.CircuitBreaker.State.HalfOpen:
+            return "Checking"
+        return "Connected"
+
     def checkAttrChangeTime() -> None:
         srdViewer.m_attrChangeTimeStamp = time.time()
 
@@ -1023,21 +1145,22 @@ class srdViewer:
     # endregion
 
     # region コマンド関連
-    def SendOpenCommand(open_path: str, camera_name: str, aim_length: float) -> bool:
-        ret = False
+    def SendOpenCommand(
+        open_path: str, camera_name: str, aim_length: float
+    ) -> IPC.Client.Request:
         view = Viewer.Viewer()
         openSceneCmd = Viewer.OpenSceneCommand(view)
         openSceneCmd.SetOpenPath(open_path)
         openSceneCmd.AddOption("camera", camera_name)
         openSceneCmd.AddOption("aim_length", aim_length)
 
-        ret = srdViewer.m_messageSender.SendCommand(openSceneCmd)
-        if ret:
+        request = srdViewer.m_messageSender.SendCommand(openSceneCmd)
+        if request:
             srdViewer.appendHistory("Succeeded in sending the scene")
         else:
             srdViewer.appendHistory("[ERROR] Failure in sending the scene.")
 
-        return ret
+        return request
 
     def SendTransformCommand(path: str) -> bool:
         ret = False
@@ -1053,7 +1176,8 @@ class srdViewer:
         transCmd.SetTransform(obj.matrix_world)
         transCmd.SetTransformName(path)
 
-        ret = srdViewer.m_messageSender.SendCommand(transCmd)
+        # 次の tick までに同じ Object が更新された場合は最新の Transform だけを送る
+        ret = srdViewer.m_messageSender.Post(transCmd)
 
         if ret:
             srdViewer.appendHistory(f"Load Transform Success {path}")
@@ -1067,6 +1191,8 @@ class srdViewer:
         view = Viewer.Viewer()
         animStartCmd = Viewer.StartAnimationCommand(view)
 
+        # Post() した animation frame を先に送る
+        srdViewer.m_messageSender.Flush()
         ret = srdViewer.m_messageSender.SendCommand(animStartCmd)
         srdViewer.appendHistory("Succeeded in starting animation.")
 
@@ -1077,6 +1203,8 @@ class srdViewer:
         view = Viewer.Viewer()
         stopAnimCmd = Viewer.StopAnimationCommand(view)
 
+        # Post() した animation frame を先に送る
+        srdViewer.m_messageSender.Flush()
         ret = srdViewer.m_messageSender.SendCommand(stopAnimCmd)
         srdViewer.appendHistory("Succeeded in stopping animation.")
 
@@ -1089,7 +1217,7 @@ class srdViewer:
         animFrameCmd.SetFPS(frate)
         animFrameCmd.SetFrame(frame)
 
-        ret = srdViewer.m_messageSender.SendCommand(animFrameCmd)
+        ret = srdViewer.m_messageSender.Post(animFrameCmd)
         srdViewer.appendHistory(f"Succeeded in setting animation frame {frame} / {frate} [fps].")
 
         return ret
@@ -1121,7 +1249,7 @@ class srdViewer:
 
         aimCmd.SetCameraAimLength(aimLength)
 
-        ret = srdViewer.m_messageSender.SendCommand(aimCmd)
+        ret = srdViewer.m_messageSender.Post(aimCmd)
 
         msg = "set camera aim length: "
         msg += str(aimLength)
@@ -1189,7 +1317,8 @@ class srdViewer:
         clipCmd.SetPlane(int(plane))
         clipCmd.SetMethod(int(method))
 
-        ret = srdViewer.m_messageSender.SendCommand(clipCmd)
+        # 次の Flush() で送る. 未送信の Clipping 設定は置き換える
+        ret = srdViewer.m_messageSender.Post(clipCmd)
 
         return ret
 
@@ -0,0 +1,102 @@
+import enum
+
+import fbs.Viewer.fbs.HelloCommand as FbsHelloCommand
+import fbs.Viewer.fbs.HelloReply as FbsHelloReply
+import flatbuffers
+
+from .ViewerCommand import Viewer, ViewerCommand
+
+
+class HelloCommand(ViewerCommand):
+    # 接続ごとに最初に送り, プロトコルのバージョンと対応する機能を Viewer と合わせる
+    PROTOCOL_VERSION = 1
+
+    class Feature(enum.IntFlag):
+        NONE = 0
+        Batch = enum.auto()  # CommandBatch
+        Stream = enum.auto()  # 応答無しの stream チャネル
+        Heartbeat = enum.auto()  # heartbeat チャネル
+        Events = enum.auto()  # ViewerStateChanged の events チャネル
+        CompressZlib = enum.auto()
+        CompressZstd = enum.auto()
+        CompressLz4 = enum.auto()
+
+    def __init__(self, viewer: Viewer):
+        super().__init__(viewer)
+        self.m_protocolVersion = HelloCommand.PROTOCOL_VERSION
+        self.m_features = HelloCommand.Feature.NONE
+
+    def __del__(self):
+        pass
+
+    def Exec(self) -> bool:
+        return True
+
+    def GetId(self) -> ViewerCommand.Id:
+        return ViewerCommand.Id.Hello
+
+    def SetProtocolVersion(self, version: int) -> None:
+        self.m_protocolVersion = version
+
+    def GetProtocolVersion(self) -> int:
+        return self.m_protocolVersion
+
+    def SetFeatures(self, features: Feature) -> None:
+        self.m_features = features
+
+    def GetFeatures(self) -> Feature:
+        return self.m_features
+
+    def Serialize(self, builder: flatbuffers.Builder) -> bool:
+        FbsHelloCommand.Start(builder)
+        FbsHelloCommand.AddProtocolVersion(builder, self.m_protocolVersion)
+        FbsHelloCommand.AddFeatures(builder, int(self.m_features))
+        cmd = FbsHelloCommand.End(builder)
+        builder.Finish(cmd)
+
+        return True
+
+    def Deserialize(self, data, dataSize) -> bool:
+        cmd = FbsHelloCommand.HelloCommand.GetRootAs(data)
+        self.m_protocolVersion = cmd.ProtocolVersion()
+        self.m_features = HelloCommand.Feature(cmd.Features())
+
+        return True
+
+
+class HelloReply:
+    # Reply と先頭の項目が同じなので, Hello に対応していない Viewer の応答は
+    # バージョン 0, 機能無しとして扱われる
+    def __init__(self):
+        self.m_exitCode = 0
+        self.m_exitMessage = ""
+        self.m_protocolVersion = 0
+        self.m_features = HelloCommand.Feature.NONE
+
+    def GetExitCode(self) -> int:
+        return self.m_exitCode
+
+    def GetExitMessage(self) -> str:
+        return self.m_exitMessage
+
+    def SetProtocolVersion(self, version: int) -> None:
+        self.m_protocolVersion = version
+
+    def GetProtocolVersion(self) -> int:
+        return self.m_protocolVersion
+
+    def SetFeatures(self, features: HelloCommand.Feature) -> None:
+        self.m_features = features
+
+    def GetFeatures(self) -> HelloCommand.Feature:
+        return self.m_features
+
+    def Deserialize(self, data) -> bool:
+        reply = FbsHelloReply.HelloReply.GetRootAs(data)
+        self.m_exitCode = reply.Code()
+        self.m_exitMessage = reply.Message()
+        self.m_protocolVersion = reply.ProtocolVersion()
+        # 知らない機能は無視する
+        known = sum(int(feature) for feature in HelloCommand.Feature)
+        self.m_features = HelloCommand.Feature(reply.Features() & known)
+        return True
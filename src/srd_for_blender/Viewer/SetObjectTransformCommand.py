@@ -1,10 +1,18 @@
+import struct
+
 import fbs.Viewer.fbs.SetObjectTransformCommand as FbsSetObjectTransformCommand
-import fbs.Viewer.fbs.Transform as Transform
 import flatbuffers
+from fbs.ZeroCopy import ZeroCopy
+from flatbuffers.compat import import_numpy
 from mathutils import Matrix
 
 from .ViewerCommand import Viewer, ViewerCommand
 
+np = import_numpy()
+
+# Transform の 4x4 の float32
+TRANSFORM_STRUCT = struct.Struct("<16f")
+
 
 class SetObjectTransformCommand(ViewerCommand):
     def __init__(self, viewer: Viewer):
@@ -21,6 +29,9 @@ class SetObjectTransformCommand(ViewerCommand):
     def SetTransformName(self, trnName: str) -> None:
         self.m_transformName = trnName
 
+    def GetTransformName(self) -> str:
+        return self.m_transformName
+
     def Exec(self) -> bool:
         return True
 
@@ -38,41 +49,36 @@ class SetObjectTransformCommand(ViewerCommand):
 
         FbsSetObjectTransformCommand.AddName(builder, name)
 
-        # mathutil.Matrixをflat化してTransformを作成
-        m = self.m_transform
-
-        # MayaのTRS行列に変換
-        mx = [
-            m.row[0][0],
-            m.row[1][0],
-            m.row[2][0],
-            m.row[3][0],
-            m.row[0][1],
-            m.row[1][1],
-            m.row[2][1],
-            m.row[3][1],
-            m.row[0][2],
-            m.row[1][2],
-            m.row[2][2],
-            m.row[3][2],
-            m.row[0][3],
-            m.row[1][3],
-            m.row[2][3],
-            m.row[3][3],
-        ]
-        # itertools.chain.from_iterableのほうが高速
-        # FbsSetObjectTransformCommand.AddTransform(builder,Transform.CreateTransform(builder,list(itertools.chain.from_iterable(m.row))))
-        # FbsSetObjectTransformCommand.AddTransform(
-        #     builder, Transform.CreateTransform(builder, [x for row in m.row for x in row])
-        # )
-        FbsSetObjectTransformCommand.AddTransform(builder, Transform.CreateTransform(builder, mx))
+        FbsSetObjectTransformCommand.AddTransform(
+            builder, SetObjectTransformCommand.CreateTransform(builder, self.m_transform)
+        )
         cmd = FbsSetObjectTransformCommand.End(builder)
         builder.Finish(cmd)
         return True
 
+    @staticmethod
+    def CreateTransform(builder: flatbuffers.Builder, m) -> int:
+        # Transform.CreateTransform() と同じバイト列を 16 回の PrependFloat32 ではなく一度に書き込む
+        # m は mathutils.Matrix か (4, 4) の numpy.ndarray
+        # MayaのTRS行列に変換するので列の順に並べる
+        size = TRANSFORM_STRUCT.size
+        builder.Prep(4, size)
+        head = builder.Head() - size
+        if np is not None and isinstance(m, np.ndarray):
+            builder.Bytes[head : head + size] = np.ascontiguousarray(m.T, dtype="<f4").tobytes()
+        else:
+            col = m.col
+            TRANSFORM_STRUCT.pack_into(builder.Bytes, head, *col[0], *col[1], *col[2], *col[3])
+        builder.head = head
+        return builder.Offset()
+
     def Deserialize(self, data) -> bool:
         cmd = FbsSetObjectTransformCommand.SetObjectTransformCommand.GetRootAs(data)
         # objName = cmd.Name()
-        m = cmd.Transform().Matrix()
-        self.m_transform = Matrix((tuple(m[0:4]), tuple(m[4:8]), tuple(m[8:12]), tuple(m[12:16])))
+        # 受信したバッファの 4x4 をそのまま参照して Matrix を作る
+        transform = cmd.Transform()
+        if np is not None:
+            self.m_transform = Matrix(ZeroCopy.MatrixAsNumpy(transform))
+        else:
+            self.m_transform = Matrix(ZeroCopy.MatrixAsMemoryview(transform).tolist())
         return True
@@ -82,6 +82,7 @@ class ViewerCommand:
         StartExporting = enum.auto()
         EndExporting = enum.auto()
         SetClipping = enum.auto()
+        Hello = enum.auto()
 
     def __init__(self, viewer: Viewer):
         self.m_viewer = viewer
@@ -0,0 +1,58 @@
+import fbs.Viewer.fbs.ViewerStateChanged as FbsViewerStateChanged
+import flatbuffers
+
+from .ViewerCommand import Viewer
+
+
+class ViewerStateChangedEvent:
+    # Viewer の状態が変わった時に events チャネルで通知される
+    def __init__(self):
+        self.m_state = Viewer.State.Ready
+        self.m_displayState = Viewer.DisplayState.Ready
+        self.m_progress = 0.0
+        self.m_receivedTime = 0.0
+
+    def SetState(self, state: Viewer.State) -> None:
+        self.m_state = state
+
+    def GetState(self) -> Viewer.State:
+        return self.m_state
+
+    def SetDisplayState(self, state: Viewer.DisplayState) -> None:
+        self.m_displayState = state
+
+    def GetDisplayState(self) -> Viewer.DisplayState:
+        return self.m_displayState
+
+    def SetProgress(self, progress: float) -> None:
+        # シーンの読み込みの進捗 (0.0 - 1.0)
+        self.m_progress = progress
+
+    def GetProgress(self) -> float:
+        return self.m_progress
+
+    def SetReceivedTime(self, receivedTime: float) -> None:
+        # 受け取った時刻 (time.monotonic()). 送信されない
+        self.m_receivedTime = receivedTime
+
+    def GetReceivedTime(self) -> float:
+        return self.m_receivedTime
+
+    def Serialize(self, builder: flatbuffers.Builder) -> bool:
+        FbsViewerStateChanged.Start(builder)
+        FbsViewerStateChanged.AddState(builder, int(self.m_state))
+        FbsViewerStateChanged.AddDisplayState(builder, int(self.m_displayState))
+        FbsViewerStateChanged.AddProgress(builder, self.m_progress)
+        event = FbsViewerStateChanged.End(builder)
+        builder.Finish(event)
+        return True
+
+    def Deserialize(self, data) -> bool:
+        event = FbsViewerStateChanged.ViewerStateChanged.GetRootAs(data)
+        try:
+            self.m_state = Viewer.State(event.State())
+            self.m_displayState = Viewer.DisplayState(event.DisplayState())
+        except ValueError:
+            return False
+        self.m_progress = event.Progress()
+        return True
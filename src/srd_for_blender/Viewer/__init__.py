@@ -2,9 +2,11 @@ from .AnimationCommand import *
 from .CameraAimCommand import *
 from .ExportCommand import *
 from .GetViewerStateCommand import *
+from .HelloCommand import *
 from .OpenSceneCommand import *
 from .SelectCameraCommand import *
 from .SetClippingCommand import *
 from .SetObjectTransformCommand import *
 from .StopViewerCommand import *
 from .ViewerCommand import *
+from .ViewerEvent import *
@@ -55,6 +55,7 @@ except ImportError:
         raise "pynng install failed."
 
 import bpy
+import IPC
 import utils.CheckModal as CheckModal
 from IPCViewerCommand import CommandSender
 from SRDViewer import srdViewer
@@ -73,6 +74,9 @@ bl_info = {
 }
 
 
+DEFAULT_VIEWER_ENDPOINT = "ipc://srdViewer"
+
+
 # region classes
 class SRDPropertyIndex(enum.IntEnum):
     VisibleGizmo = enum.auto()
@@ -147,6 +151,21 @@ class SRDPropertyGroup(bpy.types.PropertyGroup):
     )
 
 
+class SRDAddonPreferences(bpy.types.AddonPreferences):
+    bl_idname = __name__
+
+    ViewerEndpoint: bpy.props.StringProperty(
+        name="Viewer endpoint",
+        description="ipc://name, tcp://host:port or inproc://name",
+        default=DEFAULT_VIEWER_ENDPOINT,
+        update=lambda self, context: change_endpoint_callback(self, context),
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "ViewerEndpoint")
+
+
 class SRD_OT_Create(bpy.types.Operator):
     bl_idname = "object.srd_opt_create"
     bl_label = "NOP"
@@ -275,6 +294,8 @@ class SRD_PT_Panel(bpy.types.Panel):
         row = column.row(align=True)
         row.operator(SRD_OT_LoadScene.bl_idname, text="load scene")
         row.operator(SRD_OT_Shutdown.bl_idname, text="shutdown")
+        row = column.row(align=True)
+        row.label(text="Connection: " + srdViewer.getConnectionStatusText(), translate=False)
         column.separator()
 
         # animation
@@ -305,6 +326,7 @@ class SRD_PT_Panel(bpy.types.Panel):
 
 
 classes = [
+    SRDAddonPreferences,
     SRD_PT_Panel,
     SRD_OT_Create,
     SRD_OT_LoadScene,
@@ -340,6 +362,23 @@ def change_property_callback(self, context, index: SRDPropertyIndex):
         srdViewer.setClippingPlane(front, top)
 
 
+def get_viewer_endpoint() -> str:
+    try:
+        endpoint = bpy.context.preferences.addons[__name__].preferences.ViewerEndpoint
+    except (KeyError, AttributeError):
+        return DEFAULT_VIEWER_ENDPOINT
+    if not IPC.Transport.IsSupported(endpoint):
+        srdViewer.appendHistory(f"Unsupported viewer endpoint: {endpoint}", True)
+        return DEFAULT_VIEWER_ENDPOINT
+    return endpoint
+
+
+def change_endpoint_callback(self, context):
+    # 通信中の場合は次回の接続から有効
+    if srdViewer.m_messageSender:
+        srdViewer.m_messageSender.SetUrl(get_viewer_endpoint())
+
+
 def init_props():
     scene = bpy.types.Scene
 
@@ -366,6 +405,8 @@ def register():
         bpy.utils.register_class(cls)
     init_props()
     CheckModal.init_structs()
+    # AddonPreferences の登録後に接続先を反映する
+    srdViewer.m_messageSender.SetUrl(get_viewer_endpoint())
 
 
 def unregister():
@@ -377,7 +418,7 @@ def unregister():
 
 
 def initializePlugin(context):
-    # 50 msec 監視
+    # プロセスの監視. 応答の有無は heartbeat で監視する
     srdViewer.fViewerWatchTimerCallbackId = bpy.app.timers.register(
         srdViewer.updateViewerStatusTimerCB
     )
@@ -400,7 +441,19 @@ def initializePlugin(context):
 
     srdViewer.fLoadPostHandlerId = bpy.app.handlers.load_post.append(srdViewer.loadPostHandler)
 
-    srdViewer.m_messageSender = CommandSender("ipc://srdViewer")
+    srdViewer.m_messageSender = CommandSender(DEFAULT_VIEWER_ENDPOINT)
+
+    # 応答や通知の callback はメインスレッドでまとめて処理する
+    srdViewer.m_replyDispatcher = IPC.ReplyDispatcher()
+    srdViewer.m_messageSender.SetReplyDispatcher(srdViewer.m_replyDispatcher)
+    bpy.app.timers.register(srdViewer.updateReplyDispatchTimerCB)
+    srdViewer.m_messageSender.GetHeartbeat().Subscribe(
+        lambda health: srdViewer.m_replyDispatcher.Post(srdViewer.onViewerHealthChanged, health)
+    )
+
+    # 非同期 API 用のイベントループ
+    srdViewer.m_eventLoop = IPC.EventLoop()
+    srdViewer.m_eventLoop.SetSubmitCB(srdViewer.registerEventLoopTimer)
 
     srdViewer.m_synchronize = True
     srdViewer.m_syncTransform = True  # transform のデフォルトのみ True
@@ -437,6 +490,14 @@ def uninitializePlugin(context):
         srdViewer.m_messageSender.Stop()
         srdViewer.m_messageSender = None
 
+    if srdViewer.m_eventLoop:
+        srdViewer.m_eventLoop.Close()
+        srdViewer.m_eventLoop = None
+
+    if srdViewer.m_replyDispatcher:
+        srdViewer.m_replyDispatcher.Clear()
+        srdViewer.m_replyDispatcher = None
+
 
 if __name__ == "__main__":
     register()
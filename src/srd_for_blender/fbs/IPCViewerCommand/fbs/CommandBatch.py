@@ -0,0 +1,74 @@
+# automatically generated by the FlatBuffers compiler, do not modify
+
+# namespace: fbs
+
+import flatbuffers
+from flatbuffers.compat import import_numpy
+np = import_numpy()
+
+class CommandBatch(object):
+    __slots__ = ['_tab']
+
+    @classmethod
+    def GetRootAs(cls, buf, offset=0):
+        n = flatbuffers.encode.Get(flatbuffers.packer.uoffset, buf, offset)
+        x = CommandBatch()
+        x.Init(buf, n + offset)
+        return x
+
+    @classmethod
+    def GetRootAsCommandBatch(cls, buf, offset=0):
+        """This method is deprecated. Please switch to GetRootAs."""
+        return cls.GetRootAs(buf, offset)
+    # CommandBatch
+    def Init(self, buf, pos):
+        self._tab = flatbuffers.table.Table(buf, pos)
+
+    # CommandBatch
+    def Commands(self, j):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(4))
+        if o != 0:
+            x = self._tab.Vector(o)
+            x += flatbuffers.number_types.UOffsetTFlags.py_type(j) * 4
+            x = self._tab.Indirect(x)
+            from fbs.IPCViewerCommand.fbs.ViewerCommand import ViewerCommand
+            obj = ViewerCommand()
+            obj.Init(self._tab.Bytes, x)
+            return obj
+        return None
+
+    # CommandBatch
+    def CommandsLength(self):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(4))
+        if o != 0:
+            return self._tab.VectorLen(o)
+        return 0
+
+    # CommandBatch
+    def CommandsIsNone(self):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(4))
+        return o == 0
+
+def CommandBatchStart(builder):
+    builder.StartObject(1)
+
+def Start(builder):
+    CommandBatchStart(builder)
+
+def CommandBatchAddCommands(builder, commands):
+    builder.PrependUOffsetTRelativeSlot(0, flatbuffers.number_types.UOffsetTFlags.py_type(commands), 0)
+
+def AddCommands(builder, commands):
+    CommandBatchAddCommands(builder, commands)
+
+def CommandBatchStartCommandsVector(builder, numElems):
+    return builder.StartVector(4, numElems, 4)
+
+def StartCommandsVector(builder, numElems):
+    return CommandBatchStartCommandsVector(builder, numElems)
+
+def CommandBatchEnd(builder):
+    return builder.EndObject()
+
+def End(builder):
+    return CommandBatchEnd(builder)
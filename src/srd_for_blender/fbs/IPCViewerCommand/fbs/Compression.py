@@ -0,0 +1,9 @@
+# automatically generated by the FlatBuffers compiler, do not modify
+
+# namespace: fbs
+
+class Compression(object):
+    NONE = 0
+    Zlib = 1
+    Zstd = 2
+    Lz4 = 3
@@ -41,19 +41,91 @@ class IPCMessage(object):
             return obj
         return None
 
-def Start(builder): builder.StartObject(2)
+    # IPCMessage
+    def Compression(self):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(8))
+        if o != 0:
+            return self._tab.Get(flatbuffers.number_types.Uint8Flags, o + self._tab.Pos)
+        return 0
+
+    # IPCMessage
+    def Payload(self, j):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(10))
+        if o != 0:
+            a = self._tab.Vector(o)
+            return self._tab.Get(flatbuffers.number_types.Uint8Flags, a + flatbuffers.number_types.UOffsetTFlags.py_type(j * 1))
+        return 0
+
+    # IPCMessage
+    def PayloadAsNumpy(self):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(10))
+        if o != 0:
+            return self._tab.GetVectorAsNumpy(flatbuffers.number_types.Uint8Flags, o)
+        return 0
+
+    # IPCMessage
+    def PayloadLength(self):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(10))
+        if o != 0:
+            return self._tab.VectorLen(o)
+        return 0
+
+    # IPCMessage
+    def PayloadIsNone(self):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(10))
+        return o == 0
+
+    # IPCMessage
+    def OriginalSize(self):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(12))
+        if o != 0:
+            return self._tab.Get(flatbuffers.number_types.Uint32Flags, o + self._tab.Pos)
+        return 0
+
 def IPCMessageStart(builder):
-    """This method is deprecated. Please switch to Start."""
-    return Start(builder)
-def AddDataType(builder, dataType): builder.PrependUint8Slot(0, dataType, 0)
+    builder.StartObject(5)
+
+def Start(builder):
+    IPCMessageStart(builder)
+
 def IPCMessageAddDataType(builder, dataType):
-    """This method is deprecated. Please switch to AddDataType."""
-    return AddDataType(builder, dataType)
-def AddData(builder, data): builder.PrependUOffsetTRelativeSlot(1, flatbuffers.number_types.UOffsetTFlags.py_type(data), 0)
+    builder.PrependUint8Slot(0, dataType, 0)
+
+def AddDataType(builder, dataType):
+    IPCMessageAddDataType(builder, dataType)
+
 def IPCMessageAddData(builder, data):
-    """This method is deprecated. Please switch to AddData."""
-    return AddData(builder, data)
-def End(builder): return builder.EndObject()
+    builder.PrependUOffsetTRelativeSlot(1, flatbuffers.number_types.UOffsetTFlags.py_type(data), 0)
+
+def AddData(builder, data):
+    IPCMessageAddData(builder, data)
+
+def IPCMessageAddCompression(builder, compression):
+    builder.PrependUint8Slot(2, compression, 0)
+
+def AddCompression(builder, compression):
+    IPCMessageAddCompression(builder, compression)
+
+def IPCMessageAddPayload(builder, payload):
+    builder.PrependUOffsetTRelativeSlot(3, flatbuffers.number_types.UOffsetTFlags.py_type(payload), 0)
+
+def AddPayload(builder, payload):
+    IPCMessageAddPayload(builder, payload)
+
+def IPCMessageStartPayloadVector(builder, numElems):
+    return builder.StartVector(1, numElems, 1)
+
+def StartPayloadVector(builder, numElems):
+    return IPCMessageStartPayloadVector(builder, numElems)
+
+def IPCMessageAddOriginalSize(builder, originalSize):
+    builder.PrependUint32Slot(4, originalSize, 0)
+
+def AddOriginalSize(builder, originalSize):
+    IPCMessageAddOriginalSize(builder, originalSize)
+
 def IPCMessageEnd(builder):
-    """This method is deprecated. Please switch to End."""
-    return End(builder)
\ No newline at end of file
+    return builder.EndObject()
+
+def End(builder):
+    return IPCMessageEnd(builder)
@@ -6,4 +6,4 @@ class MessageData(object):
     NONE = 0
     Text = 1
     ViewerCommand = 2
-
+    CommandBatch = 3
@@ -31,15 +31,20 @@ class Text(object):
             return self._tab.String(o + self._tab.Pos)
         return None
 
-def Start(builder): builder.StartObject(1)
 def TextStart(builder):
-    """This method is deprecated. Please switch to Start."""
-    return Start(builder)
-def AddText(builder, text): builder.PrependUOffsetTRelativeSlot(0, flatbuffers.number_types.UOffsetTFlags.py_type(text), 0)
+    builder.StartObject(1)
+
+def Start(builder):
+    TextStart(builder)
+
 def TextAddText(builder, text):
-    """This method is deprecated. Please switch to AddText."""
-    return AddText(builder, text)
-def End(builder): return builder.EndObject()
+    builder.PrependUOffsetTRelativeSlot(0, flatbuffers.number_types.UOffsetTFlags.py_type(text), 0)
+
+def AddText(builder, text):
+    TextAddText(builder, text)
+
 def TextEnd(builder):
-    """This method is deprecated. Please switch to End."""
-    return End(builder)
\ No newline at end of file
+    return builder.EndObject()
+
+def End(builder):
+    return TextEnd(builder)
@@ -58,23 +58,58 @@ class ViewerCommand(object):
         o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(6))
         return o == 0
 
-def Start(builder): builder.StartObject(2)
+    # ViewerCommand
+    def Sequence(self):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(8))
+        if o != 0:
+            return self._tab.Get(flatbuffers.number_types.Uint64Flags, o + self._tab.Pos)
+        return 0
+
+    # ViewerCommand
+    def Version(self):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(10))
+        if o != 0:
+            return self._tab.Get(flatbuffers.number_types.Uint32Flags, o + self._tab.Pos)
+        return 0
+
 def ViewerCommandStart(builder):
-    """This method is deprecated. Please switch to Start."""
-    return Start(builder)
-def AddId(builder, id): builder.PrependUint32Slot(0, id, 0)
+    builder.StartObject(4)
+
+def Start(builder):
+    ViewerCommandStart(builder)
+
 def ViewerCommandAddId(builder, id):
-    """This method is deprecated. Please switch to AddId."""
-    return AddId(builder, id)
-def AddBody(builder, body): builder.PrependUOffsetTRelativeSlot(1, flatbuffers.number_types.UOffsetTFlags.py_type(body), 0)
+    builder.PrependUint32Slot(0, id, 0)
+
+def AddId(builder, id):
+    ViewerCommandAddId(builder, id)
+
 def ViewerCommandAddBody(builder, body):
-    """This method is deprecated. Please switch to AddBody."""
-    return AddBody(builder, body)
-def StartBodyVector(builder, numElems): return builder.StartVector(1, numElems, 1)
+    builder.PrependUOffsetTRelativeSlot(1, flatbuffers.number_types.UOffsetTFlags.py_type(body), 0)
+
+def AddBody(builder, body):
+    ViewerCommandAddBody(builder, body)
+
 def ViewerCommandStartBodyVector(builder, numElems):
-    """This method is deprecated. Please switch to Start."""
-    return StartBodyVector(builder, numElems)
-def End(builder): return builder.EndObject()
+    return builder.StartVector(1, numElems, 1)
+
+def StartBodyVector(builder, numElems):
+    return ViewerCommandStartBodyVector(builder, numElems)
+
+def ViewerCommandAddSequence(builder, sequence):
+    builder.PrependUint64Slot(2, sequence, 0)
+
+def AddSequence(builder, sequence):
+    ViewerCommandAddSequence(builder, sequence)
+
+def ViewerCommandAddVersion(builder, version):
+    builder.PrependUint32Slot(3, version, 0)
+
+def AddVersion(builder, version):
+    ViewerCommandAddVersion(builder, version)
+
 def ViewerCommandEnd(builder):
-    """This method is deprecated. Please switch to End."""
-    return End(builder)
\ No newline at end of file
+    return builder.EndObject()
+
+def End(builder):
+    return ViewerCommandEnd(builder)
@@ -31,15 +31,20 @@ class EditCameraAimCommand(object):
             return bool(self._tab.Get(flatbuffers.number_types.BoolFlags, o + self._tab.Pos))
         return False
 
-def Start(builder): builder.StartObject(1)
 def EditCameraAimCommandStart(builder):
-    """This method is deprecated. Please switch to Start."""
-    return Start(builder)
-def AddEdit(builder, edit): builder.PrependBoolSlot(0, edit, 0)
+    builder.StartObject(1)
+
+def Start(builder):
+    EditCameraAimCommandStart(builder)
+
 def EditCameraAimCommandAddEdit(builder, edit):
-    """This method is deprecated. Please switch to AddEdit."""
-    return AddEdit(builder, edit)
-def End(builder): return builder.EndObject()
+    builder.PrependBoolSlot(0, edit, 0)
+
+def AddEdit(builder, edit):
+    EditCameraAimCommandAddEdit(builder, edit)
+
 def EditCameraAimCommandEnd(builder):
-    """This method is deprecated. Please switch to End."""
-    return End(builder)
\ No newline at end of file
+    return builder.EndObject()
+
+def End(builder):
+    return EditCameraAimCommandEnd(builder)
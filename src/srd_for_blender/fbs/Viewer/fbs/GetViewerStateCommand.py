@@ -24,11 +24,14 @@ class GetViewerStateCommand(object):
     def Init(self, buf, pos):
         self._tab = flatbuffers.table.Table(buf, pos)
 
-def Start(builder): builder.StartObject(0)
 def GetViewerStateCommandStart(builder):
-    """This method is deprecated. Please switch to Start."""
-    return Start(builder)
-def End(builder): return builder.EndObject()
+    builder.StartObject(0)
+
+def Start(builder):
+    GetViewerStateCommandStart(builder)
+
 def GetViewerStateCommandEnd(builder):
-    """This method is deprecated. Please switch to End."""
-    return End(builder)
\ No newline at end of file
+    return builder.EndObject()
+
+def End(builder):
+    return GetViewerStateCommandEnd(builder)
@@ -0,0 +1,63 @@
+# automatically generated by the FlatBuffers compiler, do not modify
+
+# namespace: fbs
+
+import flatbuffers
+from flatbuffers.compat import import_numpy
+np = import_numpy()
+
+class HelloCommand(object):
+    __slots__ = ['_tab']
+
+    @classmethod
+    def GetRootAs(cls, buf, offset=0):
+        n = flatbuffers.encode.Get(flatbuffers.packer.uoffset, buf, offset)
+        x = HelloCommand()
+        x.Init(buf, n + offset)
+        return x
+
+    @classmethod
+    def GetRootAsHelloCommand(cls, buf, offset=0):
+        """This method is deprecated. Please switch to GetRootAs."""
+        return cls.GetRootAs(buf, offset)
+    # HelloCommand
+    def Init(self, buf, pos):
+        self._tab = flatbuffers.table.Table(buf, pos)
+
+    # HelloCommand
+    def ProtocolVersion(self):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(4))
+        if o != 0:
+            return self._tab.Get(flatbuffers.number_types.Uint32Flags, o + self._tab.Pos)
+        return 0
+
+    # HelloCommand
+    def Features(self):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(6))
+        if o != 0:
+            return self._tab.Get(flatbuffers.number_types.Uint64Flags, o + self._tab.Pos)
+        return 0
+
+def HelloCommandStart(builder):
+    builder.StartObject(2)
+
+def Start(builder):
+    HelloCommandStart(builder)
+
+def HelloCommandAddProtocolVersion(builder, protocolVersion):
+    builder.PrependUint32Slot(0, protocolVersion, 0)
+
+def AddProtocolVersion(builder, protocolVersion):
+    HelloCommandAddProtocolVersion(builder, protocolVersion)
+
+def HelloCommandAddFeatures(builder, features):
+    builder.PrependUint64Slot(1, features, 0)
+
+def AddFeatures(builder, features):
+    HelloCommandAddFeatures(builder, features)
+
+def HelloCommandEnd(builder):
+    return builder.EndObject()
+
+def End(builder):
+    return HelloCommandEnd(builder)
@@ -0,0 +1,89 @@
+# automatically generated by the FlatBuffers compiler, do not modify
+
+# namespace: fbs
+
+import flatbuffers
+from flatbuffers.compat import import_numpy
+np = import_numpy()
+
+class HelloReply(object):
+    __slots__ = ['_tab']
+
+    @classmethod
+    def GetRootAs(cls, buf, offset=0):
+        n = flatbuffers.encode.Get(flatbuffers.packer.uoffset, buf, offset)
+        x = HelloReply()
+        x.Init(buf, n + offset)
+        return x
+
+    @classmethod
+    def GetRootAsHelloReply(cls, buf, offset=0):
+        """This method is deprecated. Please switch to GetRootAs."""
+        return cls.GetRootAs(buf, offset)
+    # HelloReply
+    def Init(self, buf, pos):
+        self._tab = flatbuffers.table.Table(buf, pos)
+
+    # HelloReply
+    def Code(self):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(4))
+        if o != 0:
+            return self._tab.Get(flatbuffers.number_types.Int32Flags, o + self._tab.Pos)
+        return 0
+
+    # HelloReply
+    def Message(self):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(6))
+        if o != 0:
+            return self._tab.String(o + self._tab.Pos)
+        return None
+
+    # HelloReply
+    def ProtocolVersion(self):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(8))
+        if o != 0:
+            return self._tab.Get(flatbuffers.number_types.Uint32Flags, o + self._tab.Pos)
+        return 0
+
+    # HelloReply
+    def Features(self):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(10))
+        if o != 0:
+            return self._tab.Get(flatbuffers.number_types.Uint64Flags, o + self._tab.Pos)
+        return 0
+
+def HelloReplyStart(builder):
+    builder.StartObject(4)
+
+def Start(builder):
+    HelloReplyStart(builder)
+
+def HelloReplyAddCode(builder, code):
+    builder.PrependInt32Slot(0, code, 0)
+
+def AddCode(builder, code):
+    HelloReplyAddCode(builder, code)
+
+def HelloReplyAddMessage(builder, message):
+    builder.PrependUOffsetTRelativeSlot(1, flatbuffers.number_types.UOffsetTFlags.py_type(message), 0)
+
+def AddMessage(builder, message):
+    HelloReplyAddMessage(builder, message)
+
+def HelloReplyAddProtocolVersion(builder, protocolVersion):
+    builder.PrependUint32Slot(2, protocolVersion, 0)
+
+def AddProtocolVersion(builder, protocolVersion):
+    HelloReplyAddProtocolVersion(builder, protocolVersion)
+
+def HelloReplyAddFeatures(builder, features):
+    builder.PrependUint64Slot(3, features, 0)
+
+def AddFeatures(builder, features):
+    HelloReplyAddFeatures(builder, features)
+
+def HelloReplyEnd(builder):
+    return builder.EndObject()
+
+def End(builder):
+    return HelloReplyEnd(builder)
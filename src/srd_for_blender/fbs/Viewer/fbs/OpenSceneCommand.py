@@ -56,23 +56,32 @@ class OpenSceneCommand(object):
         o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(6))
         return o == 0
 
-def Start(builder): builder.StartObject(2)
 def OpenSceneCommandStart(builder):
-    """This method is deprecated. Please switch to Start."""
-    return Start(builder)
-def AddPath(builder, path): builder.PrependUOffsetTRelativeSlot(0, flatbuffers.number_types.UOffsetTFlags.py_type(path), 0)
+    builder.StartObject(2)
+
+def Start(builder):
+    OpenSceneCommandStart(builder)
+
 def OpenSceneCommandAddPath(builder, path):
-    """This method is deprecated. Please switch to AddPath."""
-    return AddPath(builder, path)
-def AddOptions(builder, options): builder.PrependUOffsetTRelativeSlot(1, flatbuffers.number_types.UOffsetTFlags.py_type(options), 0)
+    builder.PrependUOffsetTRelativeSlot(0, flatbuffers.number_types.UOffsetTFlags.py_type(path), 0)
+
+def AddPath(builder, path):
+    OpenSceneCommandAddPath(builder, path)
+
 def OpenSceneCommandAddOptions(builder, options):
-    """This method is deprecated. Please switch to AddOptions."""
-    return AddOptions(builder, options)
-def StartOptionsVector(builder, numElems): return builder.StartVector(4, numElems, 4)
+    builder.PrependUOffsetTRelativeSlot(1, flatbuffers.number_types.UOffsetTFlags.py_type(options), 0)
+
+def AddOptions(builder, options):
+    OpenSceneCommandAddOptions(builder, options)
+
 def OpenSceneCommandStartOptionsVector(builder, numElems):
-    """This method is deprecated. Please switch to Start."""
-    return StartOptionsVector(builder, numElems)
-def End(builder): return builder.EndObject()
+    return builder.StartVector(4, numElems, 4)
+
+def StartOptionsVector(builder, numElems):
+    return OpenSceneCommandStartOptionsVector(builder, numElems)
+
 def OpenSceneCommandEnd(builder):
-    """This method is deprecated. Please switch to End."""
-    return End(builder)
\ No newline at end of file
+    return builder.EndObject()
+
+def End(builder):
+    return OpenSceneCommandEnd(builder)
@@ -38,19 +38,26 @@ class Reply(object):
             return self._tab.String(o + self._tab.Pos)
         return None
 
-def Start(builder): builder.StartObject(2)
 def ReplyStart(builder):
-    """This method is deprecated. Please switch to Start."""
-    return Start(builder)
-def AddCode(builder, code): builder.PrependInt32Slot(0, code, 0)
+    builder.StartObject(2)
+
+def Start(builder):
+    ReplyStart(builder)
+
 def ReplyAddCode(builder, code):
-    """This method is deprecated. Please switch to AddCode."""
-    return AddCode(builder, code)
-def AddMessage(builder, message): builder.PrependUOffsetTRelativeSlot(1, flatbuffers.number_types.UOffsetTFlags.py_type(message), 0)
+    builder.PrependInt32Slot(0, code, 0)
+
+def AddCode(builder, code):
+    ReplyAddCode(builder, code)
+
 def ReplyAddMessage(builder, message):
-    """This method is deprecated. Please switch to AddMessage."""
-    return AddMessage(builder, message)
-def End(builder): return builder.EndObject()
+    builder.PrependUOffsetTRelativeSlot(1, flatbuffers.number_types.UOffsetTFlags.py_type(message), 0)
+
+def AddMessage(builder, message):
+    ReplyAddMessage(builder, message)
+
 def ReplyEnd(builder):
-    """This method is deprecated. Please switch to End."""
-    return End(builder)
\ No newline at end of file
+    return builder.EndObject()
+
+def End(builder):
+    return ReplyEnd(builder)
@@ -38,19 +38,26 @@ class SetAnimationFrameCommand(object):
             return self._tab.Get(flatbuffers.number_types.Float32Flags, o + self._tab.Pos)
         return 0.0
 
-def Start(builder): builder.StartObject(2)
 def SetAnimationFrameCommandStart(builder):
-    """This method is deprecated. Please switch to Start."""
-    return Start(builder)
-def AddFrame(builder, frame): builder.PrependInt32Slot(0, frame, 0)
+    builder.StartObject(2)
+
+def Start(builder):
+    SetAnimationFrameCommandStart(builder)
+
 def SetAnimationFrameCommandAddFrame(builder, frame):
-    """This method is deprecated. Please switch to AddFrame."""
-    return AddFrame(builder, frame)
-def AddFps(builder, fps): builder.PrependFloat32Slot(1, fps, 0.0)
+    builder.PrependInt32Slot(0, frame, 0)
+
+def AddFrame(builder, frame):
+    SetAnimationFrameCommandAddFrame(builder, frame)
+
 def SetAnimationFrameCommandAddFps(builder, fps):
-    """This method is deprecated. Please switch to AddFps."""
-    return AddFps(builder, fps)
-def End(builder): return builder.EndObject()
+    builder.PrependFloat32Slot(1, fps, 0.0)
+
+def AddFps(builder, fps):
+    SetAnimationFrameCommandAddFps(builder, fps)
+
 def SetAnimationFrameCommandEnd(builder):
-    """This method is deprecated. Please switch to End."""
-    return End(builder)
\ No newline at end of file
+    return builder.EndObject()
+
+def End(builder):
+    return SetAnimationFrameCommandEnd(builder)
@@ -31,15 +31,20 @@ class SetCameraAimLengthCommand(object):
             return self._tab.Get(flatbuffers.number_types.Float32Flags, o + self._tab.Pos)
         return 0.0
 
-def Start(builder): builder.StartObject(1)
 def SetCameraAimLengthCommandStart(builder):
-    """This method is deprecated. Please switch to Start."""
-    return Start(builder)
-def AddAimLength(builder, aimLength): builder.PrependFloat32Slot(0, aimLength, 0.0)
+    builder.StartObject(1)
+
+def Start(builder):
+    SetCameraAimLengthCommandStart(builder)
+
 def SetCameraAimLengthCommandAddAimLength(builder, aimLength):
-    """This method is deprecated. Please switch to AddAimLength."""
-    return AddAimLength(builder, aimLength)
-def End(builder): return builder.EndObject()
+    builder.PrependFloat32Slot(0, aimLength, 0.0)
+
+def AddAimLength(builder, aimLength):
+    SetCameraAimLengthCommandAddAimLength(builder, aimLength)
+
 def SetCameraAimLengthCommandEnd(builder):
-    """This method is deprecated. Please switch to End."""
-    return End(builder)
\ No newline at end of file
+    return builder.EndObject()
+
+def End(builder):
+    return SetCameraAimLengthCommandEnd(builder)
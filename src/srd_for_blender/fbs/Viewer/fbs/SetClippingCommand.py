@@ -38,19 +38,26 @@ class SetClippingCommand(object):
             return self._tab.Get(flatbuffers.number_types.Int32Flags, o + self._tab.Pos)
         return 0
 
-def Start(builder): builder.StartObject(2)
 def SetClippingCommandStart(builder):
-    """This method is deprecated. Please switch to Start."""
-    return Start(builder)
-def AddMethod(builder, method): builder.PrependInt32Slot(0, method, 0)
+    builder.StartObject(2)
+
+def Start(builder):
+    SetClippingCommandStart(builder)
+
 def SetClippingCommandAddMethod(builder, method):
-    """This method is deprecated. Please switch to AddMethod."""
-    return AddMethod(builder, method)
-def AddPlane(builder, plane): builder.PrependInt32Slot(1, plane, 0)
+    builder.PrependInt32Slot(0, method, 0)
+
+def AddMethod(builder, method):
+    SetClippingCommandAddMethod(builder, method)
+
 def SetClippingCommandAddPlane(builder, plane):
-    """This method is deprecated. Please switch to AddPlane."""
-    return AddPlane(builder, plane)
-def End(builder): return builder.EndObject()
+    builder.PrependInt32Slot(1, plane, 0)
+
+def AddPlane(builder, plane):
+    SetClippingCommandAddPlane(builder, plane)
+
 def SetClippingCommandEnd(builder):
-    """This method is deprecated. Please switch to End."""
-    return End(builder)
\ No newline at end of file
+    return builder.EndObject()
+
+def End(builder):
+    return SetClippingCommandEnd(builder)
@@ -42,19 +42,26 @@ class SetObjectTransformCommand(object):
             return obj
         return None
 
-def Start(builder): builder.StartObject(2)
 def SetObjectTransformCommandStart(builder):
-    """This method is deprecated. Please switch to Start."""
-    return Start(builder)
-def AddName(builder, name): builder.PrependUOffsetTRelativeSlot(0, flatbuffers.number_types.UOffsetTFlags.py_type(name), 0)
+    builder.StartObject(2)
+
+def Start(builder):
+    SetObjectTransformCommandStart(builder)
+
 def SetObjectTransformCommandAddName(builder, name):
-    """This method is deprecated. Please switch to AddName."""
-    return AddName(builder, name)
-def AddTransform(builder, transform): builder.PrependStructSlot(1, flatbuffers.number_types.UOffsetTFlags.py_type(transform), 0)
+    builder.PrependUOffsetTRelativeSlot(0, flatbuffers.number_types.UOffsetTFlags.py_type(name), 0)
+
+def AddName(builder, name):
+    SetObjectTransformCommandAddName(builder, name)
+
 def SetObjectTransformCommandAddTransform(builder, transform):
-    """This method is deprecated. Please switch to AddTransform."""
-    return AddTransform(builder, transform)
-def End(builder): return builder.EndObject()
+    builder.PrependStructSlot(1, flatbuffers.number_types.UOffsetTFlags.py_type(transform), 0)
+
+def AddTransform(builder, transform):
+    SetObjectTransformCommandAddTransform(builder, transform)
+
 def SetObjectTransformCommandEnd(builder):
-    """This method is deprecated. Please switch to End."""
-    return End(builder)
\ No newline at end of file
+    return builder.EndObject()
+
+def End(builder):
+    return SetObjectTransformCommandEnd(builder)
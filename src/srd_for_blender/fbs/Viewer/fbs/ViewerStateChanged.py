@@ -0,0 +1,76 @@
+# automatically generated by the FlatBuffers compiler, do not modify
+
+# namespace: fbs
+
+import flatbuffers
+from flatbuffers.compat import import_numpy
+np = import_numpy()
+
+class ViewerStateChanged(object):
+    __slots__ = ['_tab']
+
+    @classmethod
+    def GetRootAs(cls, buf, offset=0):
+        n = flatbuffers.encode.Get(flatbuffers.packer.uoffset, buf, offset)
+        x = ViewerStateChanged()
+        x.Init(buf, n + offset)
+        return x
+
+    @classmethod
+    def GetRootAsViewerStateChanged(cls, buf, offset=0):
+        """This method is deprecated. Please switch to GetRootAs."""
+        return cls.GetRootAs(buf, offset)
+    # ViewerStateChanged
+    def Init(self, buf, pos):
+        self._tab = flatbuffers.table.Table(buf, pos)
+
+    # ViewerStateChanged
+    def State(self):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(4))
+        if o != 0:
+            return self._tab.Get(flatbuffers.number_types.Int32Flags, o + self._tab.Pos)
+        return 0
+
+    # ViewerStateChanged
+    def DisplayState(self):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(6))
+        if o != 0:
+            return self._tab.Get(flatbuffers.number_types.Int32Flags, o + self._tab.Pos)
+        return 0
+
+    # ViewerStateChanged
+    def Progress(self):
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(self._tab.Offset(8))
+        if o != 0:
+            return self._tab.Get(flatbuffers.number_types.Float32Flags, o + self._tab.Pos)
+        return 0.0
+
+def ViewerStateChangedStart(builder):
+    builder.StartObject(3)
+
+def Start(builder):
+    ViewerStateChangedStart(builder)
+
+def ViewerStateChangedAddState(builder, state):
+    builder.PrependInt32Slot(0, state, 0)
+
+def AddState(builder, state):
+    ViewerStateChangedAddState(builder, state)
+
+def ViewerStateChangedAddDisplayState(builder, displayState):
+    builder.PrependInt32Slot(1, displayState, 0)
+
+def AddDisplayState(builder, displayState):
+    ViewerStateChangedAddDisplayState(builder, displayState)
+
+def ViewerStateChangedAddProgress(builder, progress):
+    builder.PrependFloat32Slot(2, progress, 0.0)
+
+def AddProgress(builder, progress):
+    ViewerStateChangedAddProgress(builder, progress)
+
+def ViewerStateChangedEnd(builder):
+    return builder.EndObject()
+
+def End(builder):
+    return ViewerStateChangedEnd(builder)
@@ -0,0 +1,41 @@
+import flatbuffers
+
+
+# fbs 以下の生成コードは flatc で作り直されるので、コピーを伴わない読み出しはここに置く
+class ZeroCopy:
+    # Transform の 4x4 の float32
+    TRANSFORM_SIZE = 64
+
+    # ViewerCommand.body の vtable オフセット
+    VIEWER_COMMAND_BODY = 6
+    # IPCMessage.payload の vtable オフセット
+    IPC_MESSAGE_PAYLOAD = 10
+
+    @staticmethod
+    def VectorAsMemoryview(tab: flatbuffers.table.Table, vtableOffset: int) -> memoryview:
+        o = flatbuffers.number_types.UOffsetTFlags.py_type(tab.Offset(vtableOffset))
+        if o != 0:
+            a = tab.Vector(o)
+            return memoryview(tab.Bytes).cast("B")[a:a + tab.VectorLen(o)]
+        return memoryview(b"")
+
+    @staticmethod
+    def MatrixAsNumpy(transform):
+        # numpy が無い場合は呼ばないこと
+        return flatbuffers.encode.GetVectorAsNumpy(
+            flatbuffers.number_types.to_numpy_type(flatbuffers.number_types.Float32Flags),
+            transform._tab.Bytes, 16, transform._tab.Pos).reshape(4, 4)
+
+    @staticmethod
+    def MatrixAsMemoryview(transform) -> memoryview:
+        pos = transform._tab.Pos
+        view = memoryview(transform._tab.Bytes).cast("B")[pos:pos + ZeroCopy.TRANSFORM_SIZE]
+        return view.cast("f", (4, 4))
+
+    @staticmethod
+    def BodyAsMemoryview(command) -> memoryview:
+        return ZeroCopy.VectorAsMemoryview(command._tab, ZeroCopy.VIEWER_COMMAND_BODY)
+
+    @staticmethod
+    def PayloadAsMemoryview(message) -> memoryview:
+        return ZeroCopy.VectorAsMemoryview(message._tab, ZeroCopy.IPC_MESSAGE_PAYLOAD)
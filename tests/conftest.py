@@ -0,0 +1,5 @@
+import os
+import sys
+
+# アドオンと同じく srd_for_blender 直下をパッケージの検索先にする
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "srd_for_blender"))
@@ -0,0 +1,62 @@
+import threading
+import uuid
+
+import pytest
+
+pytest.importorskip("pynng")
+
+import IPC  # noqa: E402
+
+Lane = IPC.Client.Lane
+Backpressure = IPC.Client.Backpressure
+
+
+@pytest.fixture
+def client():
+    # 接続先が無いので送信待ちの要求は送られずに残る
+    client = IPC.Client()
+    client.SetMaxPendingRequests(2)
+    client.SetBackpressurePolicy(Backpressure.DropOldest)
+    assert client.Start(f"ipc:///tmp/srd_test_{uuid.uuid4().hex}")
+    yield client
+    client.Stop()
+
+
+def test_drop_oldest_applies_to_state_and_stream(client):
+    for lane in (Lane.State, Lane.Stream):
+        requests = [client.Send(b"update", lane=lane) for _ in range(3)]
+        result = requests[0].Wait(1.0)
+        assert result.GetErrorCode() == IPC.Client.ErrorCode.Dropped
+        assert not requests[1].done() and not requests[2].done()
+
+
+def test_control_is_not_dropped(client):
+    assert client.GetBackpressurePolicy(Lane.Control) == Backpressure.Block
+    requests = [client.Send(b"control", lane=Lane.Control) for _ in range(2)]
+
+    # 空きが出るまで待つ. 古い要求は捨てない
+    blocked = []
+    thread = threading.Thread(
+        target=lambda: blocked.append(client.Send(b"control", lane=Lane.Control))
+    )
+    thread.start()
+    thread.join(0.3)
+    assert thread.is_alive()
+    assert not any(request.done() for request in requests)
+
+    client.Stop()
+    thread.join(1.0)
+    assert blocked == [None]
+
+
+def test_control_fail_fast(client):
+    client.SetBackpressurePolicy(Backpressure.FailFast, Lane.Control)
+    requests = [client.Send(b"control", lane=Lane.Control) for _ in range(2)]
+    assert client.Send(b"control", lane=Lane.Control) is None
+    assert not any(request.done() for request in requests)
+
+
+@pytest.mark.parametrize("policy", [Backpressure.DropOldest, Backpressure.Coalesce])
+def test_control_rejects_dropping_policy(client, policy):
+    with pytest.raises(ValueError):
+        client.SetBackpressurePolicy(policy, Lane.Control)
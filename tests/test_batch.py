@@ -0,0 +1,63 @@
+import uuid
+
+import pytest
+
+pytest.importorskip("pynng")
+pytest.importorskip("flatbuffers")
+pytest.importorskip("mathutils")
+
+import IPC  # noqa: E402
+import IPCViewerCommand  # noqa: E402
+import Viewer  # noqa: E402
+
+from test_handshake import HelloServer  # noqa: E402
+
+Feature = Viewer.HelloCommand.Feature
+
+
+@pytest.fixture
+def sender():
+    url = f"ipc:///tmp/srd_test_{uuid.uuid4().hex}"
+    server = HelloServer(url, Feature.Batch)
+    sender = IPCViewerCommand.CommandSender(url)
+    sender.SetReplyDispatcher(IPC.ReplyDispatcher())
+    sender.Start()
+    assert sender.WaitForHandshake(5.0)
+    assert sender.IsBatchEnabled()
+    yield sender
+    sender.Stop()
+    server.Stop()
+
+
+def test_batch_commits_on_exception(sender):
+    with pytest.raises(RuntimeError):
+        with sender.Batch():
+            sender.SendCommand(Viewer.StartAnimationCommand(Viewer.Viewer()))
+            assert sender.IsBatching()
+            raise RuntimeError()
+
+    assert not sender.IsBatching()
+    assert sender.m_batchDepth == 0
+
+
+def test_commit_failure_resets_batch(sender, monkeypatch):
+    def fail(batch):
+        raise RuntimeError()
+
+    monkeypatch.setattr(sender, "EncodeBatch", fail)
+    sender.BeginBatch()
+    sender.BeginBatch()
+    batchRequest = sender.SendCommand(Viewer.StartAnimationCommand(Viewer.Viewer()))
+    assert sender.Commit() is batchRequest
+    with pytest.raises(RuntimeError):
+        sender.Commit()
+
+    assert batchRequest.cancelled()
+    assert not sender.IsBatching()
+    assert sender.m_batchDepth == 0
+
+    # 次のバッチは通常どおり送れる
+    monkeypatch.undo()
+    with sender.Batch():
+        batchRequest = sender.SendCommand(Viewer.StartAnimationCommand(Viewer.Viewer()))
+    assert batchRequest.Wait(2.0) is not None
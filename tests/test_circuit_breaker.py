@@ -0,0 +1,98 @@
+import time
+import uuid
+
+import pytest
+
+pytest.importorskip("pynng")
+
+import IPC  # noqa: E402
+
+State = IPC.CircuitBreaker.State
+
+
+@pytest.fixture
+def breaker():
+    breaker = IPC.CircuitBreaker()
+    breaker.SetTimeoutThreshold(3)
+    breaker.SetErrorRateThreshold(0.5, windowSize=10, minSamples=4)
+    breaker.SetOpenInterval(0.05)
+    return breaker
+
+
+def Open(breaker: IPC.CircuitBreaker) -> None:
+    assert breaker.RecordFailure(True) is None
+    assert breaker.RecordFailure(True) is None
+    assert breaker.RecordFailure(True) == State.Open
+
+
+def test_closed_open_half_open_closed(breaker):
+    assert breaker.GetState() == State.Closed
+    Open(breaker)
+    assert breaker.GetState() == State.Open
+    assert breaker.GetTripCount() == 1
+
+    # 間隔が過ぎるまでは試さない. Open の間の失敗は数えない
+    assert not breaker.TryHalfOpen()
+    assert breaker.RecordFailure(True) is None
+    assert breaker.GetProbeWait() > 0.0
+
+    time.sleep(0.06)
+    assert breaker.GetProbeWait() == 0.0
+    assert breaker.TryHalfOpen()
+    assert breaker.GetState() == State.HalfOpen
+
+    # 試しの要求が成功すれば Closed に戻る
+    assert breaker.RecordSuccess() == State.Closed
+    assert breaker.GetState() == State.Closed
+    assert breaker.RecordSuccess() is None
+
+
+def test_probe_failure_reopens(breaker):
+    Open(breaker)
+    time.sleep(0.06)
+    assert breaker.TryHalfOpen()
+
+    # 試しの要求が失敗した場合はタイムアウト以外でもすぐに Open に戻す
+    assert breaker.RecordFailure(False) == State.Open
+    assert breaker.GetTripCount() == 2
+    assert not breaker.TryHalfOpen()
+
+    time.sleep(0.06)
+    assert breaker.TryHalfOpen()
+    assert breaker.RecordSuccess() == State.Closed
+
+
+def test_error_rate_trips(breaker):
+    # 連続しないタイムアウトでも失敗率が閾値を超えると Open にする
+    assert breaker.RecordSuccess() is None
+    assert breaker.RecordFailure(False) is None
+    assert breaker.RecordSuccess() is None
+    assert breaker.RecordFailure(False) == State.Open
+
+
+def test_success_resets_consecutive_timeouts(breaker):
+    breaker.SetErrorRateThreshold(1.0, windowSize=10, minSamples=10)
+    for _ in range(3):
+        assert breaker.RecordFailure(True) is None
+        assert breaker.RecordFailure(True) is None
+        assert breaker.RecordSuccess() is None
+    assert breaker.GetState() == State.Closed
+
+
+def test_client_sheds_while_open():
+    client = IPC.Client()
+    client.SetMaxPendingRequests(4)
+    try:
+        assert client.Start(f"ipc:///tmp/srd_test_{uuid.uuid4().hex}")
+        client.GetCircuitBreaker().SetOpenInterval(60.0)
+        queued = client.Send(b"state")
+        client.OnCircuitStateChanged(client.GetCircuitBreaker().Trip())
+
+        # Open にした時点の State, Stream は捨て, Control だけを受け付ける
+        assert queued.Wait(1.0).GetErrorCode() == IPC.Client.ErrorCode.Dropped
+        assert client.IsShedding(IPC.Client.Lane.State)
+        assert client.Send(b"state") is None
+        assert client.Send(b"stream", lane=IPC.Client.Lane.Stream) is None
+        assert client.Send(b"control", lane=IPC.Client.Lane.Control) is not None
+    finally:
+        client.Stop()
@@ -0,0 +1,92 @@
+import threading
+import time
+import uuid
+
+import pytest
+
+pynng = pytest.importorskip("pynng")
+
+import IPC  # noqa: E402
+
+
+class EchoServer:
+    # Viewer の代わりに受け取ったメッセージを記録してそのまま返す
+    def __init__(self, url: str):
+        self.m_url = url
+        self.m_received: list[bytes] = []
+        self.m_socket: pynng.Rep0 = None
+        self.m_thread: threading.Thread = None
+
+    def Start(self) -> None:
+        self.m_socket = pynng.Rep0(listen=self.m_url, recv_timeout=100)
+        self.m_thread = threading.Thread(target=self.Main, daemon=True)
+        self.m_thread.start()
+
+    def Stop(self) -> None:
+        self.m_socket.close()
+        self.m_thread.join(1.0)
+
+    def Main(self) -> None:
+        socket = self.m_socket
+        while True:
+            try:
+                msg = socket.recv()
+            except pynng.Timeout:
+                continue
+            except Exception:
+                return
+            self.m_received.append(msg)
+            try:
+                socket.send(msg)
+            except Exception:
+                return
+
+
+def WaitFor(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def url():
+    return f"ipc:///tmp/srd_test_{uuid.uuid4().hex}"
+
+
+def test_reconnect_after_server_restart(url):
+    server = EchoServer(url)
+    server.Start()
+
+    states = []
+    client = IPC.Client()
+    client.SetSendTimeout(500)
+    client.SetReceiveTimeout(500)
+    client.SetReconnectInterval(0.05, 0.2)
+    client.SetConnectionCallback(states.append)
+    try:
+        assert client.Start(url)
+        assert WaitFor(client.IsConnected)
+
+        request = client.Send(b"transform", replayKey="transform")
+        result = request.Wait(2.0)
+        assert result is not None and result.IsSuccess()
+
+        # Viewer の再起動
+        server.Stop()
+        assert WaitFor(lambda: IPC.Client.ConnectionState.Disconnected in states)
+        assert not client.IsConnected()
+
+        server = EchoServer(url)
+        server.Start()
+        assert WaitFor(client.IsConnected)
+        assert states.index(IPC.Client.ConnectionState.Disconnected) < len(states) - 1
+        assert states[-1] == IPC.Client.ConnectionState.Connected
+
+        # 再接続後に最新の状態が再送される
+        assert WaitFor(lambda: b"transform" in server.m_received)
+    finally:
+        client.Stop()
+        server.Stop()
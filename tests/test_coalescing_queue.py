@@ -0,0 +1,62 @@
+import pytest
+
+pytest.importorskip("flatbuffers")
+pytest.importorskip("mathutils")
+
+import IPCViewerCommand  # noqa: E402
+import Viewer  # noqa: E402
+
+CommandSender = IPCViewerCommand.CommandSender
+
+
+def Clipping(plane: int, method: int) -> Viewer.SetClippingCommand:
+    cmd = Viewer.SetClippingCommand(Viewer.Viewer())
+    cmd.SetPlane(plane)
+    cmd.SetMethod(method)
+    return cmd
+
+
+def Frame(frame: int) -> Viewer.SetAnimationFrameCommand:
+    cmd = Viewer.SetAnimationFrameCommand(Viewer.Viewer())
+    cmd.SetFrame(frame)
+    return cmd
+
+
+def test_replaces_in_place_and_keeps_order():
+    queue = IPCViewerCommand.CoalescingQueue()
+    first = Clipping(1, 1)
+    frame = Frame(1)
+    last = Clipping(2, 3)
+    assert not queue.Put(CommandSender.GetStateKey(first), first)
+    assert not queue.Put(CommandSender.GetStateKey(frame), frame)
+    # 置き換えても最初に追加した位置のまま
+    assert queue.Put(CommandSender.GetStateKey(last), last)
+    assert queue.GetCount() == 2
+    assert list(queue.Drain()) == [last, frame]
+    assert queue.GetCount() == 0
+
+
+def test_commands_without_key_are_not_replaced():
+    queue = IPCViewerCommand.CoalescingQueue()
+    commands = [Viewer.StartAnimationCommand(Viewer.Viewer()) for _ in range(3)]
+    for cmd in commands:
+        assert CommandSender.GetStateKey(cmd) is None
+        assert not queue.Put(None, cmd)
+    assert list(queue.Drain()) == commands
+    assert queue.GetSavedCount() == 0
+
+
+def test_saved_count():
+    queue = IPCViewerCommand.CoalescingQueue()
+    for frame in range(5):
+        cmd = Frame(frame)
+        queue.Put(CommandSender.GetStateKey(cmd), cmd)
+    assert queue.GetSavedCount() == 4
+    assert [cmd.GetFrame() for cmd in queue.Drain()] == [4]
+
+    # 取り出した後のコマンドは置き換えない
+    cmd = Frame(5)
+    assert not queue.Put(CommandSender.GetStateKey(cmd), cmd)
+    assert queue.GetSavedCount() == 4
+    queue.ResetSavedCount()
+    assert queue.GetSavedCount() == 0
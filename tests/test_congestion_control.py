@@ -0,0 +1,38 @@
+import uuid
+
+import pytest
+
+pytest.importorskip("pynng")
+
+import IPC  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    "initial, expected",
+    [
+        # 計測した期限が設定値より短い場合は設定値を使う
+        (0.1, (300, 500)),
+        (1.0, (1000, 1000)),
+    ],
+)
+def test_adaptive_timeout_is_clamped_to_configured(initial, expected):
+    client = IPC.Client()
+    client.SetSendTimeout(300)
+    client.SetReceiveTimeout(500)
+    client.EnableCongestionControl(True)
+    client.GetCongestionControl().SetTimeoutRange(initial, 0.1, 2.0)
+    try:
+        assert client.Start(f"ipc:///tmp/srd_test_{uuid.uuid4().hex}")
+        assert client.GetCongestionControl().GetTimeout() == int(initial * 1000)
+        work = client.AcquireWork()
+        assert client.ApplyTimeout(work)
+        assert (work.m_sendTimeout, work.m_receiveTimeout) == expected
+        client.ReleaseWork(work)
+    finally:
+        client.Stop()
+
+
+def test_clamp_timeout_without_configured_limit():
+    assert IPC.Client.ClampTimeout(100, -1) == 100
+    assert IPC.Client.ClampTimeout(100, 300) == 300
+    assert IPC.Client.ClampTimeout(500, 300) == 500
@@ -0,0 +1,98 @@
+import os
+import threading
+import tracemalloc
+import uuid
+
+import pytest
+
+pytest.importorskip("pynng")
+
+import IPC  # noqa: E402
+
+from test_client_reconnect import EchoServer, WaitFor  # noqa: E402
+
+# 長時間の確認は SRD_SOAK_SENDS=1000000 などで実行する
+SOAK_SENDS = int(os.environ.get("SRD_SOAK_SENDS", "4000"))
+# SRD_SOAK=1 の場合だけ 100 万回送る確認を行う
+LONG_SOAK = os.environ.get("SRD_SOAK") == "1"
+LONG_SOAK_SENDS = 1000000
+MAX_CONTEXTS = 4
+
+
+@pytest.fixture
+def client():
+    url = f"ipc:///tmp/srd_test_{uuid.uuid4().hex}"
+    server = EchoServer(url)
+    server.Start()
+    client = IPC.Client()
+    client.SetSendTimeout(2000)
+    client.SetReceiveTimeout(2000)
+    client.SetMaxContexts(MAX_CONTEXTS)
+    assert client.Start(url)
+    assert WaitFor(client.IsConnected)
+    yield client, server
+    client.Stop()
+    server.Stop()
+
+
+def SendAll(client: IPC.Client, server: EchoServer, count: int, window: int = 64) -> int:
+    # window 個ずつ送って応答を待ち, 成功した数を返す
+    # 受信側の記録は計測の対象外なので都度捨てる
+    succeeded = 0
+    maxContexts = 0
+    for start in range(0, count, window):
+        requests = [client.Send(b"soak") for _ in range(min(window, count - start))]
+        for request in requests:
+            result = request.Wait(5.0)
+            if result is not None and result.IsSuccess():
+                succeeded += 1
+        maxContexts = max(maxContexts, client.GetContextCount())
+        server.m_received.clear()
+    assert maxContexts <= MAX_CONTEXTS
+    return succeeded
+
+
+def test_soak_context_count_and_memory_stay_flat(client):
+    client, server = client
+    # 前半で context と内部の領域を確保しきってから後半の増加量を見る
+    half = SOAK_SENDS // 2
+    assert SendAll(client, server, half) == half
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        assert SendAll(client, server, half) == half
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert client.GetContextCount() <= MAX_CONTEXTS
+    assert after - before < 256 * 1024
+
+
+@pytest.mark.skipif(not LONG_SOAK, reason="set SRD_SOAK=1 to run the long soak")
+def test_long_soak_leaks_no_contexts_or_threads(client):
+    client, server = client
+    threads = threading.active_count()
+    assert SendAll(client, server, LONG_SOAK_SENDS, 256) == LONG_SOAK_SENDS
+
+    # 完了した要求や context, thread が残っていない
+    assert client.GetContextCount() <= MAX_CONTEXTS
+    assert client.GetQueuedRequestCount() == 0
+    assert all(client.GetInFlightCount(lane) == 0 for lane in IPC.Client.Lane)
+    assert len(client.m_pendingRequests) == 0
+    assert len(client.m_activeWorks) == 0
+    assert threading.active_count() == threads
+
+
+def test_idle_contexts_are_reaped(client):
+    client, server = client
+    client.SetContextIdleTimeout(0.2)
+    assert SendAll(client, server, 256) == 256
+    assert client.GetContextCount() > 0
+
+    # 送信が無い間も worker thread が回収する
+    assert WaitFor(lambda: client.GetContextCount() == 0, 3.0)
+
+    # 回収後も新しい context で送れる
+    assert SendAll(client, server, 16) == 16
@@ -0,0 +1,48 @@
+import time
+import uuid
+
+import pytest
+
+pytest.importorskip("pynng")
+
+import IPC  # noqa: E402
+
+Lane = IPC.Client.Lane
+
+
+@pytest.fixture
+def client():
+    # 接続先が無いので送信待ちの要求は送られずに残る
+    client = IPC.Client()
+    client.EnableCongestionControl(True)
+    assert client.Start(f"ipc:///tmp/srd_test_{uuid.uuid4().hex}")
+    yield client
+    client.Stop()
+
+
+def test_queued_request_times_out_while_disconnected(client):
+    timeout = client.GetCongestionControl().GetTimeout()
+    start = time.monotonic()
+    request = client.Send(b"x", timeout=100, lane=Lane.Control)
+    result = request.Wait(1.0)
+    assert result is not None
+    assert result.GetType() == IPC.Client.ReplyCBType.Send
+    assert result.GetErrorCode() == IPC.Client.ErrorCode.Timeout
+    assert time.monotonic() - start < 1.0
+    assert client.GetQueuedRequestCount() == 0
+
+    # 送っていないので Viewer の異常としては扱わない
+    assert client.GetCircuitState() == IPC.CircuitBreaker.State.Closed
+    assert client.GetCongestionControl().GetTimeout() == timeout
+    assert client.GetErrorCount() == 0
+
+
+def test_queued_requests_expire_in_deadline_order(client):
+    late = client.Send(b"late", timeout=300)
+    early = client.Send(b"early", timeout=50)
+    keep = client.Send(b"keep")
+    assert early.Wait(1.0).GetErrorCode() == IPC.Client.ErrorCode.Timeout
+    assert not late.done()
+    assert late.Wait(1.0).GetErrorCode() == IPC.Client.ErrorCode.Timeout
+    assert not keep.done()
+    assert client.GetQueuedRequestCount() == 1
@@ -0,0 +1,121 @@
+import asyncio
+import uuid
+
+import pytest
+
+pytest.importorskip("pynng")
+
+import IPC  # noqa: E402
+
+from test_client_reconnect import EchoServer, WaitFor  # noqa: E402
+from test_metrics import SilentServer  # noqa: E402
+
+
+def test_close_with_request_in_flight():
+    url = f"ipc:///tmp/srd_test_{uuid.uuid4().hex}"
+    server = SilentServer(url)
+    client = IPC.Client()
+    client.SetSendTimeout(1000)
+    client.SetReceiveTimeout(1000)
+    loop = IPC.EventLoop()
+    try:
+        assert client.Start(url)
+        assert WaitFor(client.IsConnected)
+
+        task = loop.Submit(client.SendAsync(b"async"))
+
+        def step() -> bool:
+            loop.Step()
+            return len(server.m_contexts) == 1
+
+        assert WaitFor(step)
+        assert not task.done()
+
+        # 破棄せずに終わらせてから閉じる. 応答待ちの要求も中断される
+        loop.Close()
+        assert task.cancelled()
+        assert loop.GetLoop().is_closed()
+        assert client.GetMetrics().Snapshot().get(0, {"in_flight": 0})["in_flight"] == 0
+    finally:
+        loop.Close()
+        client.Stop()
+        server.Stop()
+
+
+def test_close_runs_task_cleanup():
+    loop = IPC.EventLoop()
+    cleaned = []
+
+    async def wait():
+        try:
+            await asyncio.sleep(10)
+        finally:
+            cleaned.append(True)
+
+    task = loop.Submit(wait())
+    loop.Step()
+    loop.Close()
+    assert task.cancelled()
+    assert cleaned == [True]
+
+
+def RunUntil(loop: IPC.EventLoop, task: asyncio.Task, timeout: float = 5.0):
+    assert WaitFor(lambda: loop.Step() or task.done(), timeout)
+    return task.result()
+
+
+def test_send_async_follows_send_queue():
+    url = f"ipc:///tmp/srd_test_{uuid.uuid4().hex}"
+    server = EchoServer(url)
+    server.Start()
+    client = IPC.Client()
+    client.SetSendTimeout(1000)
+    client.SetReceiveTimeout(1000)
+    loop = IPC.EventLoop()
+    try:
+        assert client.Start(url)
+        assert WaitFor(client.IsConnected)
+
+        # 同じ key の要求は Send() と SendAsync() を混ぜても送った順に届く
+        client.Send(b"first", key="cube")
+        task = loop.Submit(client.SendAsync(b"second", key="cube"))
+        # coroutine は次に loop を回した時に Send() する
+        loop.Step()
+        client.Send(b"third", key="cube")
+        type, ret, msg = RunUntil(loop, task)
+        assert type == IPC.Client.ReplyCBType.Recv
+        assert (ret, msg) == (IPC.Client.ErrorCode.Success, b"second")
+        assert WaitFor(lambda: len(server.m_received) == 3)
+        assert server.m_received == [b"first", b"second", b"third"]
+
+        # Viewer が応答しない間は Control 以外は送らない
+        client.GetCircuitBreaker().Trip()
+        task = loop.Submit(client.SendAsync(b"update"))
+        assert RunUntil(loop, task)[1] == IPC.Client.ErrorCode.Failed
+        task = loop.Submit(client.SendAsync(b"control", lane=IPC.Client.Lane.Control))
+        assert RunUntil(loop, task)[1] == IPC.Client.ErrorCode.Success
+    finally:
+        loop.Close()
+        client.Stop()
+        server.Stop()
+
+
+def test_timer_runs_only_while_tasks_exist():
+    loop = IPC.EventLoop()
+    submitted = []
+    loop.SetSubmitCB(lambda: submitted.append(True))
+    try:
+        # task が無ければ timer は止まる
+        assert loop.TimerCB() is None
+
+        async def work() -> int:
+            await asyncio.sleep(0)
+            return 1
+
+        task = loop.Submit(work())
+        assert submitted == [True]
+        assert loop.TimerCB() == loop.m_period
+        assert loop.TimerCB() is None
+        assert task.result() == 1
+    finally:
+        loop.Close()
@@ -0,0 +1,107 @@
+import uuid
+
+import pytest
+
+pynng = pytest.importorskip("pynng")
+pytest.importorskip("flatbuffers")
+pytest.importorskip("mathutils")
+
+import flatbuffers  # noqa: E402
+import IPC  # noqa: E402
+import IPCViewerCommand  # noqa: E402
+import Viewer  # noqa: E402
+
+from test_client_reconnect import WaitFor  # noqa: E402
+from test_handshake import HelloServer  # noqa: E402
+
+Feature = Viewer.HelloCommand.Feature
+State = Viewer.Viewer.State
+
+
+def EncodeStateChanged(state: State, progress: float) -> bytes:
+    event = Viewer.ViewerStateChangedEvent()
+    event.SetState(state)
+    event.SetDisplayState(Viewer.Viewer.DisplayState.SceneLoading)
+    event.SetProgress(progress)
+    builder = flatbuffers.Builder(64)
+    event.Serialize(builder)
+    return bytes(builder.Output())
+
+
+def PublishUntil(publisher: pynng.Pub0, msg: bytes, predicate) -> bool:
+    # Sub0 の接続が完了するまでの通知は届かないので届くまで送り直す
+    def publish() -> bool:
+        publisher.send(msg)
+        return predicate()
+
+    return WaitFor(publish)
+
+
+@pytest.fixture
+def url():
+    return f"ipc:///tmp/srd_test_{uuid.uuid4().hex}"
+
+
+def test_subscriber_delivers_to_callbacks(url):
+    subscriber = IPC.EventSubscriber()
+    received = []
+    subscriber.Subscribe(received.append)
+    subscriber.Subscribe(lambda msg: 1 / 0)
+    publisher = pynng.Pub0(listen=url)
+    try:
+        assert subscriber.Start(url)
+        # 例外を投げる callback があっても他の callback には届く
+        assert PublishUntil(publisher, b"event", lambda: len(received) > 0)
+        assert received[0] == b"event"
+        assert subscriber.GetReceivedCount() >= 1
+    finally:
+        subscriber.Stop()
+        publisher.close()
+    assert not subscriber.IsStarted()
+
+
+def test_viewer_state_changed_delivery(url):
+    sender = IPCViewerCommand.CommandSender(url)
+    dispatcher = IPC.ReplyDispatcher()
+    sender.SetReplyDispatcher(dispatcher)
+    events = []
+    sender.SubscribeViewerState(events.append)
+    server = HelloServer(url, Feature.Events)
+    publisher = pynng.Pub0(listen=IPC.Transport(url).GetChannelUrl("events", 3))
+    try:
+        sender.Start()
+        assert sender.WaitForHandshake(5.0)
+        dispatcher.Dispatch()
+        assert sender.IsEventsEnabled()
+
+        # 解釈できない通知は捨てる
+        publisher.send(b"\x00")
+        msg = EncodeStateChanged(State.Loading, 0.5)
+        assert PublishUntil(publisher, msg, lambda: sender.GetViewerEvent()[1] is not None)
+        assert sender.WaitForViewerState(State.Loading, 1.0)
+
+        count, event = sender.GetViewerEvent()
+        assert count >= 1
+        assert event.GetDisplayState() == Viewer.Viewer.DisplayState.SceneLoading
+        assert event.GetProgress() == 0.5
+        assert event.GetReceivedTime() > 0.0
+
+        # callback は dispatcher からメインスレッドで呼ばれる
+        assert events == []
+        dispatcher.Dispatch()
+        assert len(events) >= 1
+        assert events[0].GetState() == State.Loading
+
+        # 次の通知を待てる
+        since = count
+        publisher.send(EncodeStateChanged(State.Ready, 1.0))
+        count, event = sender.WaitForViewerEvent(since, 1.0)
+        assert count > since and event is not None
+        assert sender.WaitForViewerState(State.Ready, 1.0)
+    finally:
+        sender.Stop()
+        server.Stop()
+        publisher.close()
+
+    # 停止後は最新の通知を持たない
+    assert sender.GetViewerEvent()[1] is None
@@ -0,0 +1,120 @@
+import pytest
+
+pytest.importorskip("flatbuffers")
+pytest.importorskip("mathutils")
+
+import fbs.IPCViewerCommand.fbs.IPCMessage as FbsIPCMessage  # noqa: E402
+import fbs.IPCViewerCommand.fbs.ViewerCommand as FbsViewerCommand  # noqa: E402
+import IPCViewerCommand  # noqa: E402
+import Viewer  # noqa: E402
+from IPCViewerCommand.FrameCache import FrameCache  # noqa: E402
+
+CommandSender = IPCViewerCommand.CommandSender
+
+
+def AnimationFrame(frame: int, fps: float) -> Viewer.SetAnimationFrameCommand:
+    cmd = Viewer.SetAnimationFrameCommand(Viewer.Viewer())
+    cmd.SetFrame(frame)
+    cmd.SetFPS(fps)
+    return cmd
+
+
+def Clipping(plane: int, method: int) -> Viewer.SetClippingCommand:
+    cmd = Viewer.SetClippingCommand(Viewer.Viewer())
+    cmd.SetPlane(plane)
+    cmd.SetMethod(method)
+    return cmd
+
+
+def AimLength(length: float) -> Viewer.SetCameraAimLengthCommand:
+    cmd = Viewer.SetCameraAimLengthCommand(Viewer.Viewer())
+    cmd.SetCameraAimLength(length)
+    return cmd
+
+
+def Decode(frame: bytes) -> tuple:
+    # (Id, 通し番号, 版, Body)
+    message = FbsIPCMessage.IPCMessage.GetRootAs(frame)
+    data = message.Data()
+    viewerCmd = FbsViewerCommand.ViewerCommand()
+    viewerCmd.Init(data.Bytes, data.Pos)
+    body = bytes(viewerCmd.Body(j) for j in range(viewerCmd.BodyLength()))
+    return (viewerCmd.Id(), viewerCmd.Sequence(), viewerCmd.Version(), body)
+
+
+def Fields(cmd: Viewer.ViewerCommand, body: bytes) -> tuple:
+    # Body を同じクラスのコマンドに戻して FrameCache が書き換える項目を取り出す
+    _, fields = FrameCache.FIELDS[cmd.GetId()]
+    if len(fields) == 0:
+        return ()
+    decoded = type(cmd)(Viewer.Viewer())
+    if isinstance(cmd, Viewer.SetClippingCommand):
+        decoded.Deserialize(body, len(body))
+    else:
+        decoded.Deserialize(body)
+    return tuple(getter(decoded) for _, _, getter in fields)
+
+
+COMMANDS = [
+    AnimationFrame(0, 0.0),
+    AnimationFrame(1, 24.0),
+    AnimationFrame(-1, 59.94),
+    AnimationFrame(2**31 - 1, 30.0),
+    Clipping(1, 1),
+    Clipping(4, 3),
+    AimLength(0.0),
+    AimLength(12.5),
+    Viewer.StartAnimationCommand(Viewer.Viewer()),
+    Viewer.StopAnimationCommand(Viewer.Viewer()),
+    Viewer.GetViewerStateCommand(Viewer.Viewer()),
+]
+
+
+def test_patched_frame_decodes_like_full_encode():
+    cached = CommandSender("ipc:///tmp/srd_test_frame_cache")
+    full = CommandSender("ipc:///tmp/srd_test_frame_cache")
+    full.GetFrameCache().SetEnabled(False)
+    full.GetFrameCache().Clear()
+
+    # 同じ対象を繰り返し送り, 通し番号と版も含めて一致することを確認する
+    for _ in range(3):
+        for cmd in COMMANDS:
+            key = CommandSender.GetStateKey(cmd)
+            patched = Decode(cached.Encode(cmd, key))
+            expected = Decode(full.Encode(cmd, key))
+            assert patched[:3] == expected[:3]
+            assert Fields(cmd, patched[3]) == Fields(cmd, expected[3])
+
+    assert cached.GetFrameCache().GetHitCount() > 0
+    assert full.GetFrameCache().GetHitCount() == 0
+
+
+def test_value_out_of_format_falls_back():
+    cache = FrameCache()
+    sender = CommandSender("ipc:///tmp/srd_test_frame_cache")
+    cmd = AnimationFrame(1, 24.0)
+    template = cache.Add(cmd, sender.EncodeTemplate(cmd))
+    assert template is not None
+
+    # 書式に収まらない値は書き換えずに None を返し, 呼び出し側が通常のエンコードを行う
+    assert cache.Encode(AnimationFrame(2**31, 24.0), 1, 1) is None
+    assert cache.EncodeBody(AnimationFrame(1, 1e300)) is None
+    assert cache.GetHitCount() == 0
+
+    # テンプレートは壊れずに使い続けられる
+    frame = cache.Encode(AnimationFrame(5, 30.0), 7, 3)
+    assert Decode(frame)[:3] == (int(cmd.GetId()), 7, 3)
+    assert cache.GetHitCount() == 1
+
+
+def test_sender_encodes_when_cache_cannot_patch(monkeypatch):
+    sender = CommandSender("ipc:///tmp/srd_test_frame_cache")
+    cmd = AnimationFrame(10, 24.0)
+    key = CommandSender.GetStateKey(cmd)
+    _, first, _, _ = Decode(sender.Encode(cmd, key))
+
+    # 書き換えに失敗した場合も同じ通し番号, 版のまま通常のエンコードで送る
+    monkeypatch.setattr(FrameCache, "Encode", lambda *args: None)
+    id, sequence, version, body = Decode(sender.Encode(AnimationFrame(11, 24.0), key))
+    assert (id, sequence, version) == (int(cmd.GetId()), first + 1, 2)
+    assert Fields(cmd, body) == (11, 24.0)
@@ -0,0 +1,141 @@
+import threading
+import uuid
+
+import pytest
+
+pynng = pytest.importorskip("pynng")
+pytest.importorskip("flatbuffers")
+pytest.importorskip("mathutils")
+
+import fbs.Viewer.fbs.HelloReply as FbsHelloReply  # noqa: E402
+import flatbuffers  # noqa: E402
+import IPC  # noqa: E402
+import IPCViewerCommand  # noqa: E402
+import Viewer  # noqa: E402
+
+from test_client_reconnect import WaitFor  # noqa: E402
+
+Feature = Viewer.HelloCommand.Feature
+
+
+def EncodeHelloReply(features: Feature) -> bytes:
+    builder = flatbuffers.Builder(64)
+    FbsHelloReply.Start(builder)
+    FbsHelloReply.AddCode(builder, 0)
+    FbsHelloReply.AddProtocolVersion(builder, Viewer.HelloCommand.PROTOCOL_VERSION)
+    FbsHelloReply.AddFeatures(builder, int(features))
+    builder.Finish(FbsHelloReply.End(builder))
+    return bytes(builder.Output())
+
+
+class HelloServer:
+    # Viewer の代わりにすべての要求に同じ HelloReply を返す
+    def __init__(self, url: str, features: Feature):
+        self.m_socket = pynng.Rep0(listen=url, recv_timeout=100)
+        self.m_reply = EncodeHelloReply(features)
+        self.m_thread = threading.Thread(target=self.Main, daemon=True)
+        self.m_thread.start()
+
+    def Stop(self) -> None:
+        self.m_socket.close()
+        self.m_thread.join(1.0)
+
+    def Main(self) -> None:
+        while True:
+            try:
+                self.m_socket.recv()
+            except pynng.Timeout:
+                continue
+            except Exception:
+                return
+            try:
+                self.m_socket.send(self.m_reply)
+            except Exception:
+                return
+
+
+@pytest.fixture
+def url():
+    return f"ipc:///tmp/srd_test_{uuid.uuid4().hex}"
+
+
+@pytest.fixture
+def sender(url):
+    sender = IPCViewerCommand.CommandSender(url)
+    dispatcher = IPC.ReplyDispatcher()
+    sender.SetReplyDispatcher(dispatcher)
+    yield sender
+    sender.Stop()
+
+
+def test_channels_start_on_dispatcher(url, sender):
+    server = HelloServer(url, Feature.Batch | Feature.Events)
+    try:
+        sender.Start()
+        assert sender.WaitForHandshake(5.0)
+        assert sender.HasFeature(Feature.Batch | Feature.Events)
+
+        # 応答を受けた thread ではチャネルを開始しない
+        assert not sender.m_eventSubscriber.IsStarted()
+        assert not sender.IsEventsEnabled()
+
+        sender.GetReplyDispatcher().Dispatch()
+        assert sender.m_eventSubscriber.IsStarted()
+        assert sender.IsEventsEnabled()
+        assert not sender.GetHeartbeat().IsStarted()
+    finally:
+        sender.Stop()
+        server.Stop()
+
+    assert not sender.m_eventSubscriber.IsStarted()
+    assert sender.GetFeatures() == Feature.NONE
+
+
+def test_stale_hello_reply_is_ignored(url, sender):
+    server = HelloServer(url, Feature.Events)
+    try:
+        sender.Start()
+        assert sender.WaitForHandshake(5.0)
+        generation = sender.m_connectionGeneration
+        sender.Stop()
+
+        # 停止後に届いた応答
+        reply = Viewer.HelloReply()
+        reply.SetFeatures(Feature.Events | Feature.Stream)
+        sender.OnHelloReply(generation, reply)
+        sender.GetReplyDispatcher().Dispatch()
+        sender.Flush()
+        assert sender.GetFeatures() == Feature.NONE
+        assert not sender.m_eventSubscriber.IsStarted()
+
+        # 以前の接続への応答
+        sender.Start()
+        assert WaitFor(sender.IsConnected)
+        assert sender.WaitForHandshake(5.0)
+        sender.OnHelloReply(generation, reply)
+        assert not sender.HasFeature(Feature.Stream)
+    finally:
+        sender.Stop()
+        server.Stop()
+
+
+def test_compression_follows_viewer_features(url, sender):
+    CommandSender = IPCViewerCommand.CommandSender
+    Compression = IPCViewerCommand.MessageCompressor.Compression
+    assert sender.GetLocalFeatures() & Feature.CompressZlib
+    assert CommandSender.GetCompressions(Feature.CompressZlib | Feature.Batch) == [
+        Compression.Zlib
+    ]
+
+    # 共通の方式が zlib だけの Viewer とは zlib で圧縮する
+    server = HelloServer(url, Feature.CompressZlib)
+    try:
+        sender.Start()
+        assert sender.WaitForHandshake(5.0)
+        assert sender.GetCompressor().GetCompression() == Compression.Zlib
+    finally:
+        sender.Stop()
+        server.Stop()
+
+    # 切断後は確認し直すまで圧縮しない
+    assert sender.GetCompressor().GetCompression() == Compression.NONE
@@ -0,0 +1,111 @@
+import threading
+import uuid
+
+import pytest
+
+pynng = pytest.importorskip("pynng")
+
+import IPC  # noqa: E402
+
+from test_client_reconnect import WaitFor  # noqa: E402
+
+Health = IPC.ViewerHealth
+
+
+class PongServer:
+    # Viewer の代わりに ping に応答する. m_replying を False にすると受信だけして応答しない
+    def __init__(self, url: str):
+        self.m_socket = pynng.Rep0(listen=url, recv_timeout=50)
+        self.m_replying = threading.Event()
+        self.m_replying.set()
+        self.m_thread = threading.Thread(target=self.Main, daemon=True)
+        self.m_thread.start()
+
+    def Stop(self) -> None:
+        self.m_socket.close()
+        self.m_thread.join(1.0)
+
+    def Main(self) -> None:
+        while True:
+            try:
+                ping = self.m_socket.recv()
+            except pynng.Timeout:
+                continue
+            except Exception:
+                return
+            if not self.m_replying.is_set():
+                continue
+            try:
+                self.m_socket.send(ping)
+            except Exception:
+                return
+
+
+@pytest.fixture
+def url():
+    return f"ipc:///tmp/srd_test_{uuid.uuid4().hex}"
+
+
+@pytest.fixture
+def heartbeat():
+    heartbeat = IPC.Heartbeat()
+    heartbeat.SetInterval(0.05)
+    heartbeat.SetMissThresholds(1, 3)
+    verdicts = []
+    heartbeat.Subscribe(verdicts.append)
+    yield heartbeat, verdicts
+    heartbeat.Stop()
+
+
+def test_hung_after_missed_pings(url, heartbeat):
+    heartbeat, verdicts = heartbeat
+    server = PongServer(url)
+    try:
+        assert heartbeat.Start(url)
+        assert WaitFor(lambda: heartbeat.GetLastRtt() > 0.0)
+        assert heartbeat.GetHealth() == Health.Alive
+
+        # 応答が途絶えると Degraded を経て N 回目で Hung にする
+        server.m_replying.clear()
+        assert WaitFor(lambda: heartbeat.GetHealth() == Health.Hung)
+        assert heartbeat.GetMissCount() >= 3
+        assert verdicts == [Health.Degraded, Health.Hung]
+
+        # 応答が戻れば Alive に戻る
+        server.m_replying.set()
+        assert WaitFor(lambda: heartbeat.GetHealth() == Health.Alive)
+        assert heartbeat.GetMissCount() == 0
+        assert verdicts == [Health.Degraded, Health.Hung, Health.Alive]
+    finally:
+        heartbeat.Stop()
+        server.Stop()
+
+
+def test_no_verdict_before_first_pong(url, heartbeat):
+    heartbeat, verdicts = heartbeat
+    server = PongServer(url)
+    server.m_replying.clear()
+    try:
+        # 対応していない Viewer を Hung と誤判定しない
+        assert heartbeat.Start(url)
+        assert WaitFor(lambda: heartbeat.GetMissCount() >= 4)
+        assert heartbeat.GetHealth() == Health.Alive
+        assert verdicts == []
+    finally:
+        heartbeat.Stop()
+        server.Stop()
+
+
+def test_dead_when_viewer_closes(url, heartbeat):
+    heartbeat, verdicts = heartbeat
+    server = PongServer(url)
+    try:
+        assert heartbeat.Start(url)
+        assert WaitFor(lambda: heartbeat.GetLastRtt() > 0.0)
+    finally:
+        server.Stop()
+
+    assert WaitFor(lambda: heartbeat.GetHealth() == Health.Dead)
+    # 切断後の応答なしでは Hung にしない
+    assert WaitFor(lambda: heartbeat.GetMissCount() >= 4)
+    assert verdicts == [Health.Dead]
@@ -0,0 +1,114 @@
+import importlib.util
+import os
+
+import pytest
+
+flatbuffers = pytest.importorskip("flatbuffers")
+
+import fbs.IPCViewerCommand.fbs.IPCMessage as FbsIPCMessage  # noqa: E402
+
+
+def LoadModule(name: str, path: str):
+    # IPCViewerCommand/__init__.py は Viewer (mathutils) を読み込むのでファイルを直接読み込む
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+MessageCompressor = LoadModule(
+    "MessageCompressor",
+    os.path.join(
+        os.path.dirname(__file__),
+        "..",
+        "src",
+        "srd_for_blender",
+        "IPCViewerCommand",
+        "MessageCompressor.py",
+    ),
+).MessageCompressor
+
+Compression = MessageCompressor.Compression
+
+CODECS = [
+    pytest.param(Compression.Zlib, id="zlib"),
+    pytest.param(Compression.Zstd, id="zstd"),
+    pytest.param(Compression.Lz4, id="lz4"),
+]
+
+
+def Compressible(size: int) -> bytes:
+    return (b"SetObjectTransform:Cube.001;" * (size // 28 + 1))[:size]
+
+
+def PlainMessage() -> bytes:
+    builder = flatbuffers.Builder(0)
+    FbsIPCMessage.Start(builder)
+    builder.Finish(FbsIPCMessage.End(builder))
+    return bytes(builder.Output())
+
+
+def Compressor(compression: int) -> MessageCompressor:
+    if not MessageCompressor.IsSupported(compression):
+        pytest.skip(f"{compression!r} is not installed")
+    compressor = MessageCompressor()
+    compressor.SetCompression(compression)
+    return compressor
+
+
+@pytest.mark.parametrize("compression", CODECS)
+def test_round_trip(compression):
+    compressor = Compressor(compression)
+    data = Compressible(64 * 1024)
+    output = compressor.Compress(data)
+    assert len(output) < len(data)
+
+    message = FbsIPCMessage.IPCMessage.GetRootAs(output)
+    assert message.Compression() == compression
+    assert message.OriginalSize() == len(data)
+    assert MessageCompressor.Decompress(output) == data
+
+    assert compressor.GetCompressedCount() == 1
+    assert compressor.GetSavedBytes() == len(data) - len(output)
+
+
+@pytest.mark.parametrize("compression", CODECS)
+def test_threshold(compression):
+    compressor = Compressor(compression)
+    compressor.SetThreshold(1024)
+
+    small = Compressible(1023)
+    assert compressor.Compress(small) is small
+    assert compressor.Compress(Compressible(1024)) != Compressible(1024)
+    assert compressor.GetCompressedCount() == 1
+
+
+@pytest.mark.parametrize("compression", CODECS)
+def test_incompressible_is_sent_as_is(compression):
+    compressor = Compressor(compression)
+    data = os.urandom(64 * 1024)
+    assert compressor.Compress(data) is data
+    assert compressor.GetCompressedCount() == 0
+
+
+def test_disabled_until_selected():
+    compressor = MessageCompressor()
+    data = Compressible(64 * 1024)
+    assert compressor.Compress(data) is data
+
+    # Viewer が対応していない場合も圧縮しない
+    assert compressor.SelectCompression([]) == Compression.NONE
+    assert compressor.Compress(data) is data
+
+
+def test_select_compression_prefers_shared_codec():
+    compressor = MessageCompressor()
+    assert compressor.SelectCompression([Compression.Zlib]) == Compression.Zlib
+    if MessageCompressor.IsSupported(Compression.Zstd):
+        compressions = [Compression.Zlib, Compression.Zstd, Compression.Lz4]
+        assert compressor.SelectCompression(compressions) == Compression.Zstd
+
+
+def test_decompress_plain_message():
+    data = PlainMessage()
+    assert MessageCompressor.Decompress(data) is data
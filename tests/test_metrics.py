@@ -0,0 +1,90 @@
+import threading
+import uuid
+
+import pytest
+
+pynng = pytest.importorskip("pynng")
+
+import IPC  # noqa: E402
+
+from test_client_reconnect import WaitFor  # noqa: E402
+
+
+class SilentServer:
+    # 要求を受け取るだけで応答しない Viewer
+    def __init__(self, url: str):
+        self.m_socket = pynng.Rep0(listen=url, recv_timeout=100)
+        self.m_contexts = []
+        self.m_running = True
+        self.m_thread = threading.Thread(target=self.Main, daemon=True)
+        self.m_thread.start()
+
+    def Stop(self) -> None:
+        # context はソケットより先に閉じる
+        self.m_running = False
+        self.m_thread.join(1.0)
+        for ctx in self.m_contexts:
+            ctx.close()
+        self.m_socket.close()
+
+    def Main(self) -> None:
+        # Rep0 は応答するまで次を受け取れないので context ごとに受ける
+        ctx = self.m_socket.new_context()
+        while self.m_running:
+            try:
+                ctx.recv()
+            except pynng.Timeout:
+                continue
+            except Exception:
+                break
+            self.m_contexts.append(ctx)
+            ctx = self.m_socket.new_context()
+        ctx.close()
+
+
+@pytest.fixture
+def client():
+    url = f"ipc:///tmp/srd_test_{uuid.uuid4().hex}"
+    server = SilentServer(url)
+    client = IPC.Client()
+    client.SetSendTimeout(5000)
+    client.SetReceiveTimeout(5000)
+    client.GetMetrics().SetEnabled(True)
+    assert client.Start(url)
+    assert WaitFor(client.IsConnected)
+    yield client, server
+    client.Stop()
+    server.Stop()
+
+
+def GetSnapshot(client: IPC.Client, tag: int) -> dict:
+    return client.GetMetrics().Snapshot()[tag]
+
+
+def test_cancel_completes_in_flight(client):
+    client, server = client
+    request = client.Send(b"cancel", tag=1)
+    assert WaitFor(lambda: len(server.m_contexts) == 1)
+    assert GetSnapshot(client, 1)["in_flight"] == 1
+
+    assert client.Cancel(request)
+    snapshot = GetSnapshot(client, 1)
+    assert snapshot["in_flight"] == 0
+    assert snapshot["cancelled"] == 1
+    assert snapshot["errors"] == 0
+    assert snapshot["latency_count"] == 0
+
+
+def test_stop_completes_in_flight(client):
+    client, server = client
+    # 応答待ちのものと送信待ちのもの
+    requests = [client.Send(b"stop", tag=2) for _ in range(3)]
+    assert WaitFor(lambda: len(server.m_contexts) >= 1)
+    sentCount = GetSnapshot(client, 2)["send_count"]
+    assert GetSnapshot(client, 2)["in_flight"] == sentCount
+
+    client.Stop()
+    assert all(request.cancelled() for request in requests)
+    snapshot = GetSnapshot(client, 2)
+    assert snapshot["in_flight"] == 0
+    assert snapshot["cancelled"] == sentCount
@@ -0,0 +1,121 @@
+import threading
+import uuid
+
+import pytest
+
+pynng = pytest.importorskip("pynng")
+pytest.importorskip("flatbuffers")
+pytest.importorskip("mathutils")
+
+import fbs.IPCViewerCommand.fbs.IPCMessage as FbsIPCMessage  # noqa: E402
+import fbs.IPCViewerCommand.fbs.ViewerCommand as FbsViewerCommand  # noqa: E402
+import IPC  # noqa: E402
+import IPCViewerCommand  # noqa: E402
+import Viewer  # noqa: E402
+
+from test_client_reconnect import WaitFor  # noqa: E402
+from test_handshake import EncodeHelloReply  # noqa: E402
+
+Id = Viewer.ViewerCommand.Id
+
+
+class RecordingServer:
+    # Viewer の代わりに受け取ったメッセージを記録し, すべての要求に HelloReply を返す
+    def __init__(self, url: str):
+        self.m_socket = pynng.Rep0(listen=url, recv_timeout=100)
+        self.m_reply = EncodeHelloReply(Viewer.HelloCommand.Feature.NONE)
+        self.m_received: list[bytes] = []
+        self.m_thread = threading.Thread(target=self.Main, daemon=True)
+        self.m_thread.start()
+
+    def Stop(self) -> None:
+        self.m_socket.close()
+        self.m_thread.join(1.0)
+
+    def Main(self) -> None:
+        while True:
+            try:
+                msg = self.m_socket.recv()
+            except pynng.Timeout:
+                continue
+            except Exception:
+                return
+            self.m_received.append(msg)
+            try:
+                self.m_socket.send(self.m_reply)
+            except Exception:
+                return
+
+    def GetCommands(self) -> list[tuple[int, int, int, bytes]]:
+        # Hello 以外の (Id, 通し番号, 版, メッセージ)
+        commands = []
+        for msg in list(self.m_received):
+            data = FbsIPCMessage.IPCMessage.GetRootAs(msg).Data()
+            viewerCmd = FbsViewerCommand.ViewerCommand()
+            viewerCmd.Init(data.Bytes, data.Pos)
+            if viewerCmd.Id() != Id.Hello:
+                commands.append((viewerCmd.Id(), viewerCmd.Sequence(), viewerCmd.Version(), msg))
+        return commands
+
+
+def Transform(name: str) -> Viewer.SetObjectTransformCommand:
+    cmd = Viewer.SetObjectTransformCommand(Viewer.Viewer())
+    cmd.SetTransformName(name)
+    return cmd
+
+
+def test_stamp_sequence_and_versions():
+    sender = IPCViewerCommand.CommandSender("ipc:///tmp/srd_test_stamp")
+    stamps = [sender.Stamp(key) for key in ("cube", "sphere", None, "cube", None, "cube")]
+    sequences = [sequence for sequence, _ in stamps]
+    assert sequences == list(range(sequences[0], sequences[0] + len(stamps)))
+    assert [version for _, version in stamps] == [1, 1, 0, 2, 0, 3]
+
+    # 版は 0 (対象なし) を飛ばして一巡する
+    sender.m_versions["cube"] = 0xFFFFFFFF
+    assert sender.Stamp("cube")[1] == 1
+
+
+def test_versions_kept_across_replay():
+    url = f"ipc:///tmp/srd_test_{uuid.uuid4().hex}"
+    server = RecordingServer(url)
+    sender = IPCViewerCommand.CommandSender(url)
+    sender.SetReplyDispatcher(IPC.ReplyDispatcher())
+    sender.m_client.SetReconnectInterval(0.05, 0.2)
+    try:
+        sender.Start()
+        assert sender.WaitForHandshake(5.0)
+        for cmd in (
+            Transform("Cube"),
+            Transform("Sphere"),
+            Viewer.StartAnimationCommand(Viewer.Viewer()),
+            Transform("Cube"),
+        ):
+            result = sender.SendCommand(cmd).Wait(2.0)
+            assert result is not None
+
+        commands = server.GetCommands()
+        assert [(id, version) for id, _, version, _ in commands] == [
+            (Id.SetObjectTransform, 1),
+            (Id.SetObjectTransform, 1),
+            (Id.StartAnimation, 0),
+            (Id.SetObjectTransform, 2),
+        ]
+        sequences = [sequence for _, sequence, _, _ in commands]
+        assert sequences == sorted(sequences) and len(set(sequences)) == len(sequences)
+        latestCube = commands[3][3]
+
+        # Viewer の再起動後の再送は送った時の通し番号と版のまま
+        server.Stop()
+        server = RecordingServer(url)
+        assert WaitFor(lambda: latestCube in server.m_received)
+        assert WaitFor(lambda: len(server.GetCommands()) == 2)
+
+        # 再送後の更新は版を続きから振る
+        assert sender.SendCommand(Transform("Cube")).Wait(2.0) is not None
+        id, sequence, version, _ = server.GetCommands()[-1]
+        assert (id, version) == (Id.SetObjectTransform, 3)
+        assert sequence > sequences[-1]
+    finally:
+        sender.Stop()
+        server.Stop()
@@ -0,0 +1,58 @@
+import uuid
+
+import pytest
+
+pynng = pytest.importorskip("pynng")
+pytest.importorskip("flatbuffers")
+pytest.importorskip("mathutils")
+
+import IPC  # noqa: E402
+import IPCViewerCommand  # noqa: E402
+import Viewer  # noqa: E402
+
+from test_client_reconnect import WaitFor  # noqa: E402
+from test_handshake import HelloServer  # noqa: E402
+
+Feature = Viewer.HelloCommand.Feature
+
+
+@pytest.fixture
+def sender():
+    url = f"ipc:///tmp/srd_test_{uuid.uuid4().hex}"
+    server = HelloServer(url, Feature.Stream)
+    stream = pynng.Pull0(listen=f"{url}_stream", recv_timeout=1000)
+    sender = IPCViewerCommand.CommandSender(url)
+    sender.SetReplyDispatcher(IPC.ReplyDispatcher())
+    sender.m_client.GetMetrics().SetEnabled(True)
+    sender.Start()
+    assert sender.WaitForHandshake(5.0)
+    sender.Flush()
+    assert sender.m_streamClient.IsStarted()
+    assert WaitFor(lambda: len(stream.pipes) > 0)
+    yield sender, stream
+    sender.Stop()
+    stream.close()
+    server.Stop()
+
+
+def test_stream_send_records_metrics(sender):
+    sender, stream = sender
+    request = sender.SendStreamMessage(b"stream", tag=7)
+    assert request.result().GetErrorCode() == IPC.Client.ErrorCode.Success
+    assert stream.recv() == b"stream"
+
+    snapshot = sender.m_client.GetMetrics().Snapshot()[7]
+    assert snapshot["send_count"] == 1
+    assert snapshot["bytes_out"] == len(b"stream")
+    assert snapshot["in_flight"] == 0
+    assert snapshot["latency_count"] == 0
+
+
+def test_stream_send_is_shed_while_circuit_open(sender):
+    sender, stream = sender
+    sender.m_client.m_circuitBreaker.Trip()
+    assert sender.GetCircuitState() != IPC.CircuitBreaker.State.Closed
+
+    assert sender.SendStreamMessage(b"stream", tag=8) is None
+    assert 8 not in sender.m_client.GetMetrics().Snapshot()
+    assert sender.m_streamClient.GetSentCount() == 0
@@ -0,0 +1,86 @@
+import random
+import struct
+
+import pytest
+
+flatbuffers = pytest.importorskip("flatbuffers")
+mathutils = pytest.importorskip("mathutils")
+
+import fbs.Viewer.fbs.SetObjectTransformCommand as FbsSetObjectTransformCommand  # noqa: E402
+import fbs.Viewer.fbs.Transform as Transform  # noqa: E402
+import Viewer  # noqa: E402
+from Viewer.SetObjectTransformCommand import np  # noqa: E402
+
+
+def RandomMatrix(rng: random.Random) -> list[list[float]]:
+    # float32 で表せる値にしておく
+    return [
+        [struct.unpack("<f", struct.pack("<f", rng.uniform(-1e4, 1e4)))[0] for _ in range(4)]
+        for _ in range(4)
+    ]
+
+
+def EncodeWithBuilder(name: str, rows: list[list[float]]) -> bytes:
+    # 以前の 16 回の PrependFloat32 での Serialize()
+    builder = flatbuffers.Builder(0)
+    nameOffset = builder.CreateString(name, encoding="utf-8")
+    FbsSetObjectTransformCommand.Start(builder)
+    FbsSetObjectTransformCommand.AddName(builder, nameOffset)
+    mx = [rows[r][c] for c in range(4) for r in range(4)]
+    FbsSetObjectTransformCommand.AddTransform(builder, Transform.CreateTransform(builder, mx))
+    builder.Finish(FbsSetObjectTransformCommand.End(builder))
+    return bytes(builder.Output())
+
+
+def Encode(name: str, m) -> bytes:
+    cmd = Viewer.SetObjectTransformCommand(Viewer.Viewer())
+    cmd.SetTransformName(name)
+    cmd.SetTransform(m)
+    builder = flatbuffers.Builder(0)
+    cmd.Serialize(builder)
+    return bytes(builder.Output())
+
+
+def Decode(data: bytes) -> list[list[float]]:
+    cmd = Viewer.SetObjectTransformCommand(Viewer.Viewer())
+    cmd.Deserialize(data)
+    return [list(row) for row in cmd.m_transform.row]
+
+
+def Transposed(rows: list[list[float]]) -> list[list[float]]:
+    return [[rows[r][c] for r in range(4)] for c in range(4)]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matrix_matches_builder(seed):
+    rows = RandomMatrix(random.Random(seed))
+    expected = EncodeWithBuilder(f"obj{seed}", rows)
+    data = Encode(f"obj{seed}", mathutils.Matrix(rows))
+    assert data == expected
+    # 列の順に並べているので復元すると転置になる (以前と同じ)
+    assert Decode(data) == Transposed(rows)
+
+
+@pytest.mark.skipif(np is None, reason="numpy is not installed")
+@pytest.mark.parametrize("seed", range(20))
+def test_numpy_matches_builder(seed):
+    rows = RandomMatrix(random.Random(seed))
+    expected = EncodeWithBuilder(f"obj{seed}", rows)
+    for m in (np.array(rows, dtype=np.float64), np.asfortranarray(rows, dtype=np.float32)):
+        data = Encode(f"obj{seed}", m)
+        assert data == expected
+        assert Decode(data) == Transposed(rows)
+
+
+def test_unaligned_head():
+    # 先に書き込んだデータで head が 4 の倍数でない場合も同じバイト列になる
+    rows = RandomMatrix(random.Random(0))
+    expected = flatbuffers.Builder(0)
+    expected.CreateString("x")
+    Transform.CreateTransform(expected, [rows[r][c] for c in range(4) for r in range(4)])
+
+    builder = flatbuffers.Builder(0)
+    builder.CreateString("x")
+    Viewer.SetObjectTransformCommand.CreateTransform(builder, mathutils.Matrix(rows))
+    assert builder.Head() == expected.Head()
+    assert bytes(builder.Bytes[builder.Head() :]) == bytes(expected.Bytes[expected.Head() :])
@@ -0,0 +1,61 @@
+import pytest
+
+flatbuffers = pytest.importorskip("flatbuffers")
+
+import fbs.IPCViewerCommand.fbs.IPCMessage as FbsIPCMessage  # noqa: E402
+import fbs.IPCViewerCommand.fbs.ViewerCommand as FbsViewerCommand  # noqa: E402
+import fbs.Viewer.fbs.SetObjectTransformCommand as FbsSetObjectTransformCommand  # noqa: E402
+import fbs.Viewer.fbs.Transform as Transform  # noqa: E402
+from fbs.ZeroCopy import ZeroCopy  # noqa: E402
+from flatbuffers.compat import import_numpy  # noqa: E402
+
+np = import_numpy()
+
+MATRIX = [float(i) * 0.5 for i in range(16)]
+
+
+def EncodeTransform() -> bytes:
+    builder = flatbuffers.Builder(0)
+    name = builder.CreateString("obj")
+    FbsSetObjectTransformCommand.Start(builder)
+    FbsSetObjectTransformCommand.AddName(builder, name)
+    FbsSetObjectTransformCommand.AddTransform(builder, Transform.CreateTransform(builder, MATRIX))
+    builder.Finish(FbsSetObjectTransformCommand.End(builder))
+    return bytes(builder.Output())
+
+
+def GetTransform(data: bytes):
+    cmd = FbsSetObjectTransformCommand.SetObjectTransformCommand.GetRootAs(data)
+    return cmd.Transform()
+
+
+def test_matrix_as_memoryview():
+    transform = GetTransform(EncodeTransform())
+    view = ZeroCopy.MatrixAsMemoryview(transform)
+    assert view.shape == (4, 4)
+    # 生成コードの Matrix() と同じ並び
+    assert [v for row in view.tolist() for v in row] == transform.Matrix()
+
+
+@pytest.mark.skipif(np is None, reason="numpy is not installed")
+def test_matrix_as_numpy():
+    transform = GetTransform(EncodeTransform())
+    assert ZeroCopy.MatrixAsNumpy(transform).flatten().tolist() == transform.Matrix()
+
+
+def test_body_as_memoryview():
+    builder = flatbuffers.Builder(0)
+    body = builder.CreateByteVector(b"body")
+    FbsViewerCommand.Start(builder)
+    FbsViewerCommand.AddBody(builder, body)
+    builder.Finish(FbsViewerCommand.End(builder))
+    cmd = FbsViewerCommand.ViewerCommand.GetRootAs(bytes(builder.Output()))
+    assert bytes(ZeroCopy.BodyAsMemoryview(cmd)) == b"body"
+
+
+def test_missing_payload_is_empty():
+    builder = flatbuffers.Builder(0)
+    FbsIPCMessage.Start(builder)
+    builder.Finish(FbsIPCMessage.End(builder))
+    message = FbsIPCMessage.IPCMessage.GetRootAs(bytes(builder.Output()))
+    assert bytes(ZeroCopy.PayloadAsMemoryview(message)) == b""